@@ -0,0 +1,360 @@
+"""
+HTTP API - asyncio JSON service around query generation and scrape_smart.
+Connections are handled on one event loop; blocking searches run on a small
+bounded worker pool, so many clients can wait (or poll jobs) without a thread
+each. When the outbound search budget is exhausted, or too many searches are
+already queued, requests are refused early with 429/503 and Retry-After.
+
+    python api.py --port 8080 --workers 4
+
+Endpoints:
+    GET  /health            liveness
+    GET  /metrics           server, scheduler, cache, index and pipeline counters
+                            (?format=prometheus for the Prometheus text format)
+    POST /query             {role, location, ...} -> generated queries
+    POST /search            run a search and wait for the results
+    POST /jobs              queue a search -> 202 {"id": ...}
+    GET  /jobs/<id>         job status (and results once done)
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+import backends
+import batch
+import candidate_index
+import instrumentation
+import ratelimit
+import search_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 4
+# Searches admitted (running + waiting for a worker) before answering 503
+DEFAULT_MAX_PENDING = 32
+# Finished jobs are kept this long for polling (s)
+JOB_TTL = 3600
+MAX_BODY_BYTES = 64 * 1024
+KEEP_ALIVE_TIMEOUT = 15
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class HttpError(Exception):
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _request_params(method, query_string, body):
+    if method == "POST" and body:
+        try:
+            params = json.loads(body)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Body must be JSON")
+        if not isinstance(params, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+        return params
+    return dict(parse_qsl(query_string))
+
+
+def _job_from_params(params):
+    try:
+        return batch.normalize_job(params)
+    except (ValueError, TypeError) as e:
+        raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+
+
+class ApiServer:
+    """Routes requests, admits searches and tracks async jobs."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS,
+                 max_pending=DEFAULT_MAX_PENDING, backend=None, use_cache=True, use_index=True):
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.backend = backend
+        self.use_cache = use_cache
+        self.use_index = use_index
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-search")
+
+        self.jobs = {}
+        self._job_ids = itertools.count(1)
+        self._server = None
+        self.started_at = time.time()
+
+        # Metrics
+        self.requests = 0
+        self.pending = 0
+        self.rejected = 0
+        self.searches = 0
+        self.search_errors = 0
+
+    # --- Admission / execution ---
+
+    def _admit(self):
+        """Back-pressure: refuse before queueing work that cannot start soon."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, "Search queue is full", retry_after=5)
+
+        backend = self.backend or backends.get_default_backend()
+        if backend.rate_limited:
+            scheduler = ratelimit.get_scheduler()
+            wait = scheduler.retry_after()
+            if wait > scheduler.max_wait:
+                self.rejected += 1
+                raise HttpError(HTTPStatus.TOO_MANY_REQUESTS, "Search budget exhausted", retry_after=wait)
+        self.pending += 1
+
+    async def _run_search(self, job):
+        """Runs an admitted job on the worker pool."""
+        loop = asyncio.get_running_loop()
+        try:
+            queries, results = await loop.run_in_executor(
+                self.executor,
+                lambda: batch.run_job(job, use_cache=self.use_cache, use_index=self.use_index, backend=self.backend)
+            )
+            self.searches += 1
+            return {"queries": queries, "count": len(results), "results": results}
+        except ratelimit.SearchThrottledError as e:
+            self.search_errors += 1
+            raise HttpError(HTTPStatus.TOO_MANY_REQUESTS, str(e), retry_after=e.retry_after)
+        except Exception as e:
+            self.search_errors += 1
+            raise HttpError(HTTPStatus.BAD_GATEWAY, f"Search failed: {e}")
+        finally:
+            self.pending -= 1
+
+    async def _run_job(self, record):
+        record["status"] = "running"
+        record["started_at"] = time.time()
+        try:
+            record.update(await self._run_search(record["job"]))
+            record["status"] = "done"
+        except HttpError as e:
+            record["status"] = "failed"
+            record["error"] = str(e)
+            if e.retry_after is not None:
+                record["retry_after"] = e.retry_after
+        record["finished_at"] = time.time()
+
+    def _expire_jobs(self):
+        now = time.time()
+        for job_id in [k for k, r in self.jobs.items() if r.get("finished_at") and now - r["finished_at"] > JOB_TTL]:
+            del self.jobs[job_id]
+
+    # --- Routes ---
+
+    async def dispatch(self, method, path, query_string, body):
+        """Returns (status, payload)."""
+        if path == "/health" and method == "GET":
+            return HTTPStatus.OK, {"status": "ok"}
+
+        if path == "/metrics" and method == "GET":
+            if dict(parse_qsl(query_string)).get("format") == "prometheus":
+                return HTTPStatus.OK, self.prometheus_metrics()
+            return HTTPStatus.OK, self.metrics()
+
+        if path == "/query" and method in ("GET", "POST"):
+            job = _job_from_params(_request_params(method, query_string, body))
+            return HTTPStatus.OK, {"queries": batch.job_queries(job)}
+
+        if path == "/search" and method in ("GET", "POST"):
+            job = _job_from_params(_request_params(method, query_string, body))
+            self._admit()
+            return HTTPStatus.OK, await self._run_search(job)
+
+        if path == "/jobs" and method == "POST":
+            job = _job_from_params(_request_params(method, query_string, body))
+            self._admit()
+            self._expire_jobs()
+            job_id = str(next(self._job_ids))
+            record = {"id": job_id, "status": "queued", "job": job, "created_at": time.time()}
+            self.jobs[job_id] = record
+            record["task"] = asyncio.get_running_loop().create_task(self._run_job(record))
+            return HTTPStatus.ACCEPTED, {"id": job_id, "status": "queued", "poll": f"/jobs/{job_id}"}
+
+        if path.startswith("/jobs/") and method == "GET":
+            record = self.jobs.get(path[len("/jobs/"):])
+            if record is None:
+                raise HttpError(HTTPStatus.NOT_FOUND, "Unknown job")
+            return HTTPStatus.OK, {k: v for k, v in record.items() if k != "task"}
+
+        if path in ("/health", "/metrics", "/query", "/search", "/jobs"):
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, "Method not allowed")
+        raise HttpError(HTTPStatus.NOT_FOUND, "Not found")
+
+    def metrics(self):
+        statuses = {}
+        for record in self.jobs.values():
+            statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+
+        index = candidate_index.get_index() if self.use_index else None
+        backend = self.backend or backends.get_default_backend()
+        return {
+            "uptime": round(time.time() - self.started_at, 1),
+            "requests": self.requests,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "searches": self.searches,
+            "search_errors": self.search_errors,
+            "jobs": statuses,
+            "scheduler": ratelimit.get_scheduler().metrics(),
+            "cache": search_cache.get_cache().stats() if self.use_cache else None,
+            "index": index.stats() if index else None,
+            # Federated backends report hedges and per-engine wins
+            "backend": backend.metrics() if hasattr(backend, "metrics") else {"name": backend.name},
+            # Stage timers and rejection counters of every search in this process
+            "pipeline": instrumentation.get_metrics().snapshot(),
+        }
+
+    def prometheus_metrics(self):
+        """Pipeline metrics plus the server counters, in Prometheus text format."""
+        lines = [instrumentation.get_metrics().to_prometheus().rstrip("\n")]
+        for name, kind, value in [("api_requests_total", "counter", self.requests),
+                                  ("api_rejected_total", "counter", self.rejected),
+                                  ("api_searches_total", "counter", self.searches),
+                                  ("api_search_errors_total", "counter", self.search_errors),
+                                  ("api_pending", "gauge", self.pending)]:
+            lines += [f"# TYPE xray_{name} {kind}", f"xray_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    # --- HTTP plumbing ---
+
+    async def _read_request(self, reader):
+        line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body too large")
+        body = await reader.readexactly(length) if length else b""
+
+        keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+        return method.upper(), target, body, keep_alive
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive, retry_after=None):
+        """JSON for dicts; str payloads (Prometheus metrics) are sent as text."""
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), PROMETHEUS_CONTENT_TYPE
+        else:
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        status = HTTPStatus(status)
+        lines = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if retry_after is not None:
+            lines.append(f"Retry-After: {max(1, int(retry_after + 0.999))}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HttpError as e:
+                    self._write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, target, body, keep_alive = request
+                self.requests += 1
+                parts = urlsplit(target)
+                try:
+                    status, payload = await self.dispatch(method, parts.path.rstrip("/") or "/", parts.query, body)
+                    self._write_response(writer, status, payload, keep_alive)
+                except HttpError as e:
+                    self._write_response(writer, e.status, {"error": str(e)}, keep_alive, e.retry_after)
+                except Exception as e:
+                    logger.exception("[API] Unhandled error for %s %s: %s", method, target, e)
+                    self._write_response(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal error"}, False)
+                    keep_alive = False
+
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def start(self):
+        """Binds the socket; returns the actual port (useful with port=0)."""
+        self._server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("[API] Listening on http://%s:%d", self.host, self.port)
+        return self.port
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON API for X-Ray candidate searches")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent searches")
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING,
+                        help="Searches queued before answering 503")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the search cache")
+    parser.add_argument("--no-index", action="store_true", help="Do not answer from the local candidate index")
+    backends.add_backend_args(parser)
+    args = parser.parse_args(argv)
+    instrumentation.configure_logging()
+
+    server = ApiServer(args.host, args.port, workers=args.workers, max_pending=args.max_pending,
+                       backend=backends.backend_from_args(args), use_cache=not args.no_cache,
+                       use_index=not args.no_index)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,20 @@
+import time
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
+import cards
 import scraper
-import io
+import ratelimit
+import exports
+import documents
+import enrichment
+import geo
+import instrumentation
+import query_ast
+import ranking
+import spreadsheets
+
+instrumentation.configure_logging()
 
 # Page Config
 st.set_page_config(
@@ -40,57 +53,6 @@ st.markdown("""
         transform: translateY(0);
     }
     
-    /* Result Cards */
-    .candidate-card {
-        background-color: #FFFFFF;
-        padding: 1.5rem;
-        border-radius: 12px;
-        border: 1px solid #E2E8F0;
-        box-shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.05);
-        margin-bottom: 1rem;
-        transition: all 0.2s;
-        position: relative;
-        overflow: hidden;
-    }
-    .candidate-card:hover {
-        box-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.1);
-        border-color: #BFDBFE;
-        transform: translateY(-2px);
-    }
-    .candidate-card::before {
-        content: "";
-        position: absolute;
-        top: 0;
-        left: 0;
-        width: 4px;
-        height: 100%;
-        background-color: #2563EB;
-    }
-    .card-title {
-        font-size: 1.2rem;
-        font-weight: 700;
-        color: #1E293B;
-        text-decoration: none;
-        margin-bottom: 0.5rem;
-        display: block;
-    }
-    .card-title:hover {
-        color: #2563EB;
-    }
-    .card-url {
-        font-size: 0.85rem;
-        color: #64748B;
-        margin-bottom: 0.8rem;
-        white-space: nowrap;
-        overflow: hidden;
-        text-overflow: ellipsis;
-    }
-    .card-snippet {
-        font-size: 0.95rem;
-        color: #475569;
-        line-height: 1.5;
-    }
-    
     /* Metrics/Info Box */
     .metric-box {
         background: #EFF6FF;
@@ -105,6 +67,108 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def render_cards(items):
+    """All cards as one paginated HTML element (pages flip client-side, no rerun)."""
+    with instrumentation.stage("render"):
+        components.html(cards.render_cards_html(items), height=cards.frame_height(len(items)), scrolling=True)
+
+
+# Searches kept per session (params -> results) so reruns never re-search
+MAX_REMEMBERED_SEARCHES = 10
+# Minimum interval between card re-renders while results stream in (s)
+CARDS_REFRESH_SECONDS = 0.5
+
+
+@st.cache_data(show_spinner=False, max_entries=20)
+def build_dataframe(data):
+    return pd.DataFrame(data)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def export_file(fmt, data):
+    return exports.export_bytes(fmt, data)
+
+
+def render_query_header(queries, filters):
+    multi_source = len(queries) > 1
+    query_lines = "<br>".join(
+        f"<b>{mode}:</b> {q}" if multi_source else q for mode, q in queries.items()
+    )
+    st.markdown(f"""
+    <div style="background-color: #F1F5F9; padding: 1rem; border-radius: 8px; border-left: 4px solid #64748B; margin-bottom: 2rem;">
+        <code style="color: #475569; font-family: monospace;">{query_lines}</code>
+    </div>
+    """, unsafe_allow_html=True)
+
+    if filters:
+        st.caption("Filtros: " + "  •  ".join(filters))
+
+
+def render_final_metric(slot, data):
+    count = len(data)
+    new_count = sum(1 for item in data if item.get("Status") == "Novo")
+    known_note = f" ({new_count} novos, {count - new_count} já conhecidos)" if any("Status" in item for item in data) else ""
+    slot.markdown(f"""
+    <div class="metric-box">
+        ✅ {count} candidatos encontrados{known_note}
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def render_table(data):
+    with instrumentation.stage("render"):
+        df = build_dataframe(data)
+        st.dataframe(
+            df,
+            column_config={"Link Perfil": st.column_config.LinkColumn("URL")},
+            use_container_width=True,
+            hide_index=True
+        )
+
+    render_exports(data)
+
+
+def render_exports(data):
+    """Export files are only built when asked for (and then cached per format)."""
+    col_fmt, col_btn = st.columns([2, 1])
+    fmt = col_fmt.selectbox("Formato", exports.available_formats(), key="export_format",
+                            format_func=lambda f: f.upper())
+    if col_btn.button("⚙️ Gerar arquivo", key="export_prepare"):
+        st.session_state["export_ready"] = fmt
+
+    if st.session_state.get("export_ready") == fmt:
+        label, filename, mime, _ = exports.FORMATS[fmt]
+        with st.spinner("Gerando arquivo..."):
+            payload = export_file(fmt, data)
+        st.download_button(label, payload, filename, mime)
+
+
+def render_empty_results():
+    st.warning("⚠️ Nenhum resultado encontrado. Tente remover alguns filtros ou usar termos mais genéricos.")
+    st.markdown("💡 **Dica:** Desmarque 'Busca Exata' ou remova Skills obrigatórias.")
+
+
+def render_results(data):
+    """Renders a finished result list (no streaming)."""
+    if not data:
+        render_empty_results()
+        return
+
+    render_final_metric(st.empty(), data)
+    st.markdown("### 📋 Resultados")
+    tab_cards, tab_table = st.tabs(["📇 Visualização Cards", "📊 Tabela / Exportar"])
+    with tab_cards:
+        render_cards(data)
+    with tab_table:
+        render_table(data)
+
+
+def render_saved_search(search):
+    """Re-renders the last search from session state (downloads, tab switches, widget edits)."""
+    render_query_header(search["queries"], search["filters"])
+    render_results(search["data"])
+
+
 # Main Header
 col_logo, col_title = st.columns([1, 5])
 with col_logo:
@@ -121,7 +185,7 @@ with st.sidebar:
     
     search_mode = st.selectbox(
         "Modo de Busca",
-        ["LinkedIn", "Portais de Emprego", "PDF/DOCX - Currículos", "Redes Sociais", "Listas de RH"],
+        ["LinkedIn", "Portais de Emprego", "PDF/DOCX - Currículos", "Redes Sociais", "Listas de RH", scraper.ALL_SOURCES],
         index=0,
         help="Define a estratégia de X-Ray Search."
     )
@@ -135,6 +199,16 @@ with st.sidebar:
 
     st.markdown("### 🎛️ Preferências")
     num_results = st.slider("Resultados por busca", 10, 50, 15)
+    use_cache = st.checkbox("Usar cache de buscas", value=True, help="Reaproveita buscas idênticas feitas recentemente.")
+    use_index = st.checkbox("Consultar base local primeiro", value=True, help="Responde com candidatos já encontrados antes de buscar na web.")
+    enrich = st.checkbox("Enriquecer perfis", value=False, disabled=not enrichment.available(),
+                         help="Visita a página de cada resultado para completar nome, headline, email e telefone.")
+    read_docs = st.checkbox("Ler arquivos encontrados", value=False,
+                            help="Baixa currículos (PDF/DOCX) e planilhas: descarta o que não é currículo, "
+                                 "extrai contato e skills e importa uma linha por pessoa das listas. "
+                                 "PDF requer pypdf.")
+    rank = st.checkbox("Ordenar por relevância", value=True,
+                       help="Ordena os resultados pelo quanto citam o cargo, a senioridade e as skills.")
 
     with st.expander("🕵️ Filtros Avançados"):
         target_company = st.text_input("Empresa Alvo", placeholder="Ex: Nubank, Google")
@@ -142,6 +216,8 @@ with st.sidebar:
         open_to_work = st.checkbox("Apenas 'Open to Work'")
         use_intitle = st.checkbox("Forçar cargo no Título")
         exact_match = st.checkbox("Busca Exata (Aspas em tudo)")
+        radius_km = st.slider("📍 Incluir cidades vizinhas (km)", 0, 150, 0, step=10,
+                              help="Busca também nos municípios próximos, ordenando por distância. 0 desativa.")
 
     st.markdown("---")
     search_btn = st.button("� Buscar Candidatos")
@@ -151,87 +227,139 @@ if search_btn:
     if not role or not location:
         st.error("⚠️ Preencha **Cargo** e **Localidade** para iniciar.")
     else:
-        # 1. Generate Query
-        query = scraper.generate_search_query(
-            role, location, seniority, skills,
+        # 1. Generate Query (one per mode when searching all sources)
+        multi_source = source_website == scraper.ALL_SOURCES
+        query_kwargs = dict(
             exact_match=exact_match, exclude_terms=exclude_terms,
             target_company=target_company, use_intitle=use_intitle,
-            open_to_work=open_to_work, site=source_website
+            open_to_work=open_to_work
         )
+        if multi_source:
+            queries = scraper.generate_queries(role, location, seniority, skills, **query_kwargs)
+        else:
+            queries = {source_website: scraper.generate_search_query(
+                role, location, seniority, skills, site=source_website, **query_kwargs
+            )}
 
-        # 2. Results Header
-        st.markdown(f"""
-        <div style="background-color: #F1F5F9; padding: 1rem; border-radius: 8px; border-left: 4px solid #64748B; margin-bottom: 2rem;">
-            <code style="color: #475569; font-family: monospace;">{query}</code>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # 3. Active Filters Display
+        # 2. Active Filters Display
         filters = []
         if active := exclude_terms: filters.append(f"⛔ -{active}")
         if active := target_company: filters.append(f"� {active}")
         if open_to_work: filters.append("🟢 OpenToWork")
         if use_intitle: filters.append("🎯 inTitle")
-        
-        if filters:
-            st.caption("Filtros: " + "  •  ".join(filters))
-
-        # 4. Search Execution
-        with st.spinner("🤖 Varrendo a web em busca de talentos..."):
-            try:
-                data = scraper.scrape_smart(query, num_results=int(num_results), site=source_website, expected_location=location)
-                
-                if data:
-                    count = len(data)
-                    st.markdown(f"""
-                    <div class="metric-box">
-                        ✅ {count} candidatos encontrados
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    st.markdown("### 📋 Resultados")
-                    
-                    # Layout selection
-                    tab_cards, tab_table = st.tabs(["📇 Visualização Cards", "📊 Tabela / Exportar"])
-                    
-                    with tab_cards:
-                        for item in data:
-                            title = item.get('Nome/Titulo', 'Sem Título')
-                            link = item.get('Link Perfil', '#')
-                            snippet = item.get('Resumo', 'Clique para ver o perfil completo.')
-                            
-                            st.markdown(f"""
-                            <div class="candidate-card">
-                                <a href="{link}" target="_blank" class="card-title">{title} ↗</a>
-                                <div class="card-url">{link}</div>
-                                <div class="card-snippet">{snippet}</div>
-                            </div>
-                            """, unsafe_allow_html=True)
-
-                    with tab_table:
-                        df = pd.DataFrame(data)
-                        st.dataframe(
-                            df,
-                            column_config={"Link Perfil": st.column_config.LinkColumn("URL")},
-                            use_container_width=True,
-                            hide_index=True
-                        )
-                        
-                        col1, col2 = st.columns(2)
-                        csv = df.to_csv(index=False).encode('utf-8-sig')
-                        col1.download_button("📥 Baixar CSV", csv, "candidatos.csv", "text/csv")
-                        
-                        buffer = io.BytesIO()
-                        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                            df.to_excel(writer, index=False)
-                        col2.download_button("📥 Baixar Excel", buffer.getvalue(), "candidatos.xlsx")
-
-                else:
-                    st.warning("⚠️ Nenhum resultado encontrado. Tente remover alguns filtros ou usar termos mais genéricos.")
-                    st.markdown("💡 **Dica:** Desmarque 'Busca Exata' ou remova Skills obrigatórias.")
-
-            except Exception as e:
-                st.error(f"❌ Erro na busca: {e}")
+        if radius_km and not multi_source:
+            cities = scraper.expand_location(location, radius_km)
+            if len(cities) > 1:
+                filters.append(f"📍 +{len(cities) - 1} cidades em {radius_km} km")
+            elif geo.get_index().find(location) is None:
+                filters.append("📍 Cidade fora da tabela de municípios: sem vizinhas")
+
+        # 3. Results Header
+        render_query_header(queries, filters)
+
+        # Equivalent search (same canonical queries) already run in this session: answer from memory
+        search_key = (
+            tuple(sorted((mode, query_ast.cache_key(q)) for mode, q in queries.items())),
+            source_website, int(num_results), radius_km, use_index, enrich, read_docs, rank
+        )
+        remembered = st.session_state.setdefault("remembered_searches", {})
+        data = remembered.get(search_key) if use_cache else None
+
+        if data is not None:
+            st.session_state["search"] = {"queries": queries, "filters": filters, "data": data}
+            st.session_state.pop("export_ready", None)
+            render_results(data)
+        else:
+            # 4. Search Execution (streamed: cards are appended as hits are accepted)
+            metric_slot = st.empty()
+            data = []
+            tab_cards = tab_table = cards_slot = None
+            last_render = 0.0
+
+            with st.spinner("🤖 Varrendo a web em busca de talentos..."):
+                try:
+                    if radius_km and not multi_source:
+                        stream = iter(scraper.scrape_nearby(
+                            role, location, seniority, skills, site=source_website, radius_km=radius_km,
+                            num_results=int(num_results), use_cache=use_cache, use_index=use_index, **query_kwargs
+                        ))
+                    elif multi_source:
+                        stream = scraper.iter_scrape_multi(queries, num_results=int(num_results), expected_location=location, use_cache=use_cache, use_index=use_index)
+                    else:
+                        query = queries[source_website]
+                        query_params = dict(role=role, location=location, seniority=seniority, skills=skills, **query_kwargs)
+                        stream = scraper.iter_scrape_smart(query, num_results=int(num_results), site=source_website, expected_location=location, use_cache=use_cache, use_index=use_index, query_params=query_params)
+
+                    for item in stream:
+                        if tab_cards is None:
+                            st.markdown("### 📋 Resultados")
+
+                            # Layout selection
+                            tab_cards, tab_table = st.tabs(["📇 Visualização Cards", "📊 Tabela / Exportar"])
+                            with tab_cards:
+                                cards_slot = st.empty()
+
+                        data.append(item)
+                        metric_slot.markdown(f"""
+                        <div class="metric-box">
+                            ⏳ {len(data)} candidatos encontrados até agora...
+                        </div>
+                        """, unsafe_allow_html=True)
+
+                        # One element replaced in place, throttled, instead of one element per card
+                        if time.monotonic() - last_render >= CARDS_REFRESH_SECONDS:
+                            with cards_slot:
+                                render_cards(data)
+                            last_render = time.monotonic()
+
+                    if enrich and data:
+                        progress = st.progress(0.0, text="🔎 Enriquecendo perfis...")
+                        for done, total, _ in enrichment.iter_enrich(data):
+                            progress.progress(done / total, text=f"🔎 Enriquecendo perfis... {done}/{total}")
+                        progress.empty()
+
+                    if read_docs and any(documents.is_document(item) for item in data):
+                        progress = st.progress(0.0, text="📄 Lendo currículos...")
+                        for done, total, _ in documents.iter_documents(data):
+                            progress.progress(done / total, text=f"📄 Lendo currículos... {done}/{total}")
+                        progress.empty()
+                        data = documents.drop_non_resumes(data)
+
+                    if read_docs and any(spreadsheets.is_spreadsheet(item) for item in data):
+                        progress = st.progress(0.0, text="📊 Importando planilhas...")
+                        people = {}
+                        for done, total, item, rows in spreadsheets.iter_ingest(data, expected_location=location):
+                            people[item["Link Perfil"]] = rows
+                            progress.progress(done / total, text=f"📊 Importando planilhas... {done}/{total}")
+                        progress.empty()
+                        data = spreadsheets.expand(data, people)
+
+                    if rank and data:
+                        data = ranking.rank(data, role, seniority, skills)
+
+                    # Completed searches survive reruns (downloads, tabs, other widgets)
+                    st.session_state["search"] = {"queries": queries, "filters": filters, "data": data}
+                    st.session_state.pop("export_ready", None)
+                    remembered[search_key] = data
+                    while len(remembered) > MAX_REMEMBERED_SEARCHES:
+                        remembered.pop(next(iter(remembered)))
+
+                    if data:
+                        render_final_metric(metric_slot, data)
+                        with cards_slot:
+                            render_cards(data)
+                        with tab_table:
+                            render_table(data)
+                    else:
+                        render_empty_results()
+
+                except ratelimit.SearchThrottledError as e:
+                    wait = f" em ~{int(e.retry_after) + 1}s" if e.retry_after else " em instantes"
+                    st.warning(f"⏳ O buscador está limitando nossas requisições. Tente novamente{wait}.")
+                except Exception as e:
+                    st.error(f"❌ Erro na busca: {e}")
+elif "search" in st.session_state:
+    render_saved_search(st.session_state["search"])
 else:
     # Empty State - Welcome Screen
     st.markdown("""
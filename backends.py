@@ -0,0 +1,420 @@
+"""
+Search Backends - pluggable sources of raw {href, title, body} hits.
+DDGS is the default; the recorder/replay pair lets the whole pipeline run
+offline (profiling, load tests, reproducing captures like debug_output.txt).
+SearxngBackend queries a SearXNG-compatible JSON endpoint and
+FederatedBackend races several engines with hedged requests.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import dedupe
+import query_ast
+import ratelimit
+
+logger = logging.getLogger(__name__)
+
+# Seconds without a first hit before the federation fires the next engine
+DEFAULT_HEDGE_AFTER = float(os.environ.get("XRAY_HEDGE_AFTER", 1.5))
+
+
+class SearchBackend:
+    """
+    Backend protocol: text(query, max_results) yields raw result dicts
+    with at least "href", "title" and "body".
+    """
+    name = "base"
+    # Dork dialect the engine understands; text() adapts queries itself (see adapt_query)
+    dialect = "ddg"
+    # Only live backends should populate the persistent query cache
+    cacheable = False
+    # Outbound calls go through the shared ratelimit.SearchScheduler
+    rate_limited = False
+
+    def text(self, query, max_results=10):
+        raise NotImplementedError
+
+
+class DDGSBackend(SearchBackend):
+    """Live DuckDuckGo search (duckduckgo_search.DDGS)."""
+    name = "ddgs"
+    cacheable = True
+    rate_limited = True
+
+    def __init__(self, engine=None):
+        # Optional DDGS engine name ("html", "lite", ...); None uses the library default
+        self.engine = engine
+        if engine:
+            self.name = f"ddgs:{engine}"
+
+    def text(self, query, max_results=10):
+        # Imported lazily so offline backends work without the library installed
+        from duckduckgo_search import DDGS
+
+        kwargs = {"max_results": max_results}
+        if self.engine:
+            kwargs["backend"] = self.engine
+        with DDGS() as ddgs:
+            yield from ddgs.text(query, **kwargs)
+
+
+class SearxngBackend(SearchBackend):
+    """SearXNG-compatible JSON endpoint (GET <base_url>/search?q=...&format=json)."""
+    name = "searxng"
+    dialect = "searxng"
+    cacheable = True
+
+    # SearXNG answers ~10-20 hits per page
+    MAX_PAGES = 3
+
+    def __init__(self, base_url, engines=None, timeout=10.0, language="pt-BR"):
+        self.base_url = base_url.rstrip("/")
+        self.engines = engines
+        self.timeout = timeout
+        self.language = language
+
+    def _page(self, query, pageno):
+        params = {"q": query, "format": "json", "pageno": pageno}
+        if self.engines:
+            params["engines"] = self.engines
+        if self.language:
+            params["language"] = self.language
+        url = f"{self.base_url}/search?{urllib.parse.urlencode(params)}"
+        request = urllib.request.Request(url, headers={"Accept": "application/json", "User-Agent": "xray-search"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode("utf-8")).get("results", [])
+
+    def text(self, query, max_results=10):
+        query = adapt_query(query, self.dialect)
+        count = 0
+        for pageno in range(1, self.MAX_PAGES + 1):
+            results = self._page(query, pageno)
+            if not results:
+                return
+            for result in results:
+                yield {"href": result.get("url", ""), "title": result.get("title", ""), "body": result.get("content", "")}
+                count += 1
+                if count >= max_results:
+                    return
+
+
+# --- Dork dialects ---
+
+def adapt_query(query, dialect):
+    """Rewrites an X-Ray query (XRAY_MODES syntax) for an engine's dialect, within its budget."""
+    if dialect == "ddg":
+        return query
+    return query_ast.adapt(query, dialect, query_ast.BUDGETS.get(dialect))
+
+
+class FederatedBackend(SearchBackend):
+    """
+    Hedged federation over several engines, in preference order.
+    The first engine starts immediately; the next one is fired when no hit
+    arrived within hedge_after seconds, or when the running engines failed or
+    came back empty. Hits are merged (by canonical URL) in arrival order, so
+    the consumer stops as soon as it has enough valid candidates and the
+    remaining engines are abandoned (their streams are closed).
+    The caller's scheduler slot covers the first engine only: every later
+    rate-limited engine takes its own slot before it fires (and is skipped
+    when none is free), then reports its outcome to the scheduler.
+    """
+    name = "federated"
+
+    def __init__(self, engines, hedge_after=DEFAULT_HEDGE_AFTER):
+        if not engines:
+            raise ValueError("federation needs at least one engine")
+        self.engines = list(engines)
+        self.hedge_after = hedge_after
+        self.cacheable = any(e.cacheable for e in self.engines)
+        self.rate_limited = self.engines[0].rate_limited
+        self.name = "federated(" + ",".join(e.name for e in self.engines) + ")"
+
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.hedged = 0
+        self.wins = {}
+
+    def _run(self, engine, query, max_results, out, stop, scheduler):
+        stream = None
+        try:
+            stream = iter(engine.text(query, max_results=max_results))
+            for item in stream:
+                if stop.is_set():
+                    break
+                out.put(("item", engine, item))
+            if scheduler:
+                scheduler.report_success()
+            out.put(("done", engine, None))
+        except Exception as e:
+            if scheduler:
+                if ratelimit.is_rate_limit_error(e):
+                    scheduler.report_rate_limited()
+                else:
+                    scheduler.report_error()
+            out.put(("error", engine, e))
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+
+    def text(self, query, max_results=10):
+        out = queue.Queue()
+        stop = threading.Event()
+        started = []
+        position = [0]
+
+        def launch():
+            """Fires the next engine allowed to run now. Returns False when none is left."""
+            while position[0] < len(self.engines):
+                index = position[0]
+                position[0] += 1
+                engine = self.engines[index]
+                scheduler = None
+                if index and engine.rate_limited:
+                    scheduler = ratelimit.get_scheduler()
+                    if not scheduler.try_acquire():
+                        logger.info("[Federation] No search slot free for %s, skipping it", engine.name)
+                        continue
+                started.append(engine)
+                threading.Thread(target=self._run, args=(engine, query, max_results, out, stop, scheduler),
+                                 daemon=True).start()
+                return True
+            return False
+
+        with self._lock:
+            self.searches += 1
+        launch()
+        running = 1
+        errors = []
+        seen = set()
+        yielded = 0
+        deadline = time.monotonic() + self.hedge_after
+
+        try:
+            while running:
+                can_hedge = not yielded and position[0] < len(self.engines)
+                timeout = max(deadline - time.monotonic(), 0.0) if can_hedge else None
+                try:
+                    kind, engine, payload = out.get(timeout=timeout)
+                except queue.Empty:
+                    # Slow engine: hedge with the next one
+                    logger.info("[Federation] No hit after %.1fs, hedging", self.hedge_after)
+                    if launch():
+                        with self._lock:
+                            self.hedged += 1
+                        running += 1
+                    deadline = time.monotonic() + self.hedge_after
+                    continue
+
+                if kind != "item":
+                    running -= 1
+                    if kind == "error":
+                        errors.append(payload)
+                        logger.warning("[Federation] %s failed: %s", engine.name, payload)
+                    # Nothing yet and nobody left running: fall through to the next engine
+                    if not yielded and not running and launch():
+                        running += 1
+                        deadline = time.monotonic() + self.hedge_after
+                    continue
+
+                key = dedupe.canonicalize_url(payload.get("href", ""))
+                if key in seen:
+                    continue
+                seen.add(key)
+                if not yielded:
+                    with self._lock:
+                        self.wins[engine.name] = self.wins.get(engine.name, 0) + 1
+                yielded += 1
+                yield dict(payload, engine=engine.name)
+                if yielded >= max_results:
+                    return
+        finally:
+            stop.set()
+
+        # Every engine failed: surface the throttling error if there was one
+        if not yielded and errors and len(errors) == len(started):
+            throttled = [e for e in errors if ratelimit.is_rate_limit_error(e)]
+            raise (throttled or errors)[0]
+
+    def metrics(self):
+        with self._lock:
+            return {"searches": self.searches, "hedged": self.hedged, "wins": dict(self.wins)}
+
+
+class RecordingBackend(SearchBackend):
+    """Wraps another backend and appends every raw hit to a JSONL capture."""
+    name = "record"
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = path
+        self.cacheable = inner.cacheable
+        self.rate_limited = inner.rate_limited
+        self._lock = threading.Lock()
+
+    def text(self, query, max_results=10):
+        for item in self.inner.text(query, max_results=max_results):
+            record = {"query": query}
+            record.update(item)
+            line = json.dumps(record, ensure_ascii=False)
+            with self._lock:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            yield item
+
+
+class ReplayError(Exception):
+    """Injected failure raised by ReplayBackend."""
+
+
+class ReplayBackend(SearchBackend):
+    """
+    Serves captured hits back by query, with simulated latency and errors.
+    latency: seconds before the first hit; item_latency: seconds per hit.
+    error_rate: probability (0-1) that a call raises ReplayError.
+    Unknown queries return nothing unless fallback_all is True.
+    rate_limited=True routes calls through the shared scheduler (load tests).
+    """
+    name = "replay"
+
+    def __init__(self, records, latency=0.0, item_latency=0.0, error_rate=0.0,
+                 error_message="Simulated search error", fallback_all=False, seed=None,
+                 rate_limited=False):
+        self.by_query = {}
+        self.records = []
+        for rec in records:
+            item = {k: v for k, v in rec.items() if k != "query"}
+            self.records.append(item)
+            self.by_query.setdefault(rec.get("query", ""), []).append(item)
+
+        self.latency = latency
+        self.item_latency = item_latency
+        self.error_rate = error_rate
+        self.error_message = error_message
+        self.fallback_all = fallback_all
+        self.rate_limited = rate_limited
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_jsonl(cls, path, **kwargs):
+        records = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+        return cls(records, **kwargs)
+
+    @classmethod
+    def from_debug_output(cls, path, **kwargs):
+        """Parses a debug_output.txt capture (Query/[n] title/URL blocks)."""
+        records = []
+        query = ""
+        title = None
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if line.startswith("Query: "):
+                    query = line[len("Query: "):]
+                elif re.match(r"^\[\d+\] ", line):
+                    title = line.split("] ", 1)[1]
+                elif line.startswith("URL: ") and title is not None:
+                    records.append({"query": query, "href": line[len("URL: "):], "title": title, "body": ""})
+                    title = None
+        return cls(records, **kwargs)
+
+    def text(self, query, max_results=10):
+        with self._lock:
+            fail = self.error_rate and self._random.random() < self.error_rate
+
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ReplayError(self.error_message)
+
+        items = self.by_query.get(query)
+        if items is None:
+            items = self.records if self.fallback_all else []
+
+        for item in items[:max_results]:
+            if self.item_latency:
+                time.sleep(self.item_latency)
+            yield dict(item)
+
+
+def get_backend(spec=None, latency=0.0, error_rate=0.0):
+    """
+    Builds a backend from a spec string:
+      "ddgs[:engine]"      live search (default), optionally a specific DDGS engine
+      "searxng:<url>"      SearXNG-compatible JSON endpoint
+      "federated:<a>,<b>"  hedged federation over comma-separated specs
+      "record:<path>"      live search, capturing raw hits to JSONL
+      "replay:<path>"      offline replay of a JSONL (or debug_output.txt) capture
+    """
+    spec = spec or "ddgs"
+    kind, _, path = spec.partition(":")
+
+    if kind == "ddgs":
+        return DDGSBackend(engine=path or None)
+    if kind == "searxng":
+        if not path:
+            raise ValueError("searxng backend needs a base URL (searxng:<url>)")
+        return SearxngBackend(path)
+    if kind == "federated":
+        specs = [part.strip() for part in path.split(",") if part.strip()]
+        return FederatedBackend([get_backend(part, latency, error_rate) for part in specs or ["ddgs"]])
+    if kind == "record":
+        return RecordingBackend(DDGSBackend(), path or "capture.jsonl")
+    if kind == "replay":
+        if not path:
+            raise ValueError("replay backend needs a capture path (replay:<path>)")
+        if path.endswith(".txt"):
+            return ReplayBackend.from_debug_output(path, latency=latency, error_rate=error_rate)
+        return ReplayBackend.from_jsonl(path, latency=latency, error_rate=error_rate)
+
+    raise ValueError(f"Unknown search backend: {spec}")
+
+
+_default_backend = None
+_default_lock = threading.Lock()
+
+
+def get_default_backend():
+    """Process-wide backend, configurable with XRAY_BACKEND (same spec as get_backend)."""
+    global _default_backend
+    with _default_lock:
+        if _default_backend is None:
+            _default_backend = get_backend(os.environ.get("XRAY_BACKEND"))
+    return _default_backend
+
+
+def set_default_backend(backend):
+    global _default_backend
+    with _default_lock:
+        _default_backend = backend
+
+
+def add_backend_args(parser):
+    """Adds the --backend/--latency/--error-rate switches to an argparse parser."""
+    parser.add_argument("--backend", default=os.environ.get("XRAY_BACKEND", "ddgs"),
+                        help='ddgs[:engine] | searxng:<url> | federated:<a>,<b> (e.g. federated:ddgs,searxng:<url>) | '
+                             'record:<capture.jsonl> | replay:<capture.jsonl|debug_output.txt>')
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated latency per replayed search (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an injected replay error")
+    return parser
+
+
+def backend_from_args(args):
+    backend = get_backend(args.backend, latency=args.latency, error_rate=args.error_rate)
+    set_default_backend(backend)
+    return backend
@@ -0,0 +1,330 @@
+"""
+Batch Runner - headless sourcing for many positions at once.
+Reads jobs from a CSV/JSONL file (role, location, seniority, skills, mode,
+num_results), runs them on a bounded worker pool (searches still go through
+the shared rate limiter) and streams results to CSV/JSONL/Parquet as each
+job finishes. A checkpoint file lets an interrupted batch resume.
+
+    python batch.py vagas.csv -o resultados.csv --workers 4
+    python batch.py vagas.csv -o resultados.csv --resume
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import backends
+import documents
+import enrichment
+import instrumentation
+import ranking
+import ratelimit
+import scraper
+import spreadsheets
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_NUM_RESULTS = 10
+
+# Job columns (optional ones may be omitted)
+JOB_FIELDS = ["role", "location", "seniority", "skills", "mode", "num_results"]
+QUERY_OPTIONS = ["exact_match", "exclude_terms", "target_company", "use_intitle", "open_to_work"]
+BOOL_OPTIONS = {"exact_match", "use_intitle", "open_to_work"}
+TEXT_FIELDS = ["role", "location", "seniority", "skills", "mode", "exclude_terms", "target_company"]
+
+# Output columns: job identification followed by the result fields
+OUTPUT_FIELDS = [
+    "job_id", "role", "location", "mode", "query",
+    "Nome/Titulo", "Link Perfil", "Resumo", "Email", "Fonte", "Fontes", "Status", "Estrategia", "Relevancia", "Termos",
+    "Nome Completo", "Headline", "Telefone", "WhatsApp", "LinkedIn", "Enriquecimento", "Curriculo",
+    "Skills", "Documento", "Origem",
+]
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in ("1", "true", "yes", "sim", "s", "x")
+
+
+def job_id(job):
+    """Explicit 'id' column, or a stable hash of the job fields (reordering the file is safe)."""
+    if job.get("id"):
+        return str(job["id"])
+    key = json.dumps({k: job.get(k) for k in JOB_FIELDS + QUERY_OPTIONS}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def normalize_job(raw):
+    job = {k: (v.strip() if isinstance(v, str) else v) for k, v in raw.items() if k}
+    for field in TEXT_FIELDS:
+        if job.get(field) is not None and not isinstance(job[field], str):
+            raise TypeError(f"Field '{field}' must be text, got {type(job[field]).__name__}")
+    if not job.get("role") or not job.get("location"):
+        raise ValueError(f"Job without role/location: {raw}")
+    job["mode"] = job.get("mode") or "LinkedIn"
+    job["num_results"] = int(job.get("num_results") or DEFAULT_NUM_RESULTS)
+    for option in BOOL_OPTIONS:
+        if option in job:
+            job[option] = _parse_bool(job[option])
+    job["id"] = job_id(job)
+    return job
+
+
+def read_jobs(path):
+    """Loads jobs from a .csv (header row) or .jsonl file."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".json")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    return [normalize_job(row) for row in rows]
+
+
+def job_query_params(job):
+    """generate_search_query keyword arguments for a normalized job (without site)."""
+    params = {"role": job["role"], "location": job["location"],
+              "seniority": job.get("seniority", ""), "skills": job.get("skills", "")}
+    params.update({k: job[k] for k in QUERY_OPTIONS if job.get(k) not in (None, "")})
+    return params
+
+
+def job_queries(job):
+    """{mode: query} for a normalized job (every mode for 'Todas as fontes')."""
+    params = job_query_params(job)
+    if job["mode"] == scraper.ALL_SOURCES:
+        return scraper.generate_queries(**params)
+    return {job["mode"]: scraper.generate_search_query(site=job["mode"], **params)}
+
+
+def run_job(job, use_cache=True, use_index=True, backend=None, enrich=False, read_docs=False, rank=False):
+    """
+    Runs one job and returns (queries, results). enrich visits each result page
+    (see enrichment); read_docs reads PDF/DOCX results (dropping non-résumés)
+    and replaces spreadsheet results by one row per person; rank sorts by
+    relevance to the job's role, seniority and skills (see ranking).
+    """
+    queries = job_queries(job)
+    if job["mode"] == scraper.ALL_SOURCES:
+        results = scraper.scrape_multi(queries, num_results=job["num_results"], expected_location=job["location"],
+                                       use_cache=use_cache, backend=backend, use_index=use_index)
+    else:
+        results = scraper.scrape_smart(queries[job["mode"]], num_results=job["num_results"], site=job["mode"],
+                                       expected_location=job["location"], use_cache=use_cache,
+                                       backend=backend, use_index=use_index, query_params=job_query_params(job))
+    if enrich:
+        enrichment.enrich(results)
+    if read_docs:
+        results = documents.drop_non_resumes(documents.read_documents(results))
+        results = spreadsheets.ingest(results, expected_location=job["location"])
+    if rank:
+        results = ranking.rank(results, job["role"], job.get("seniority", ""), job.get("skills", ""))
+    return queries, results
+
+
+# --- Output sinks ---
+
+class CsvSink:
+    def __init__(self, path, append=False):
+        write_header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+        self.file = open(path, "a" if append else "w", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=OUTPUT_FIELDS, extrasaction="ignore")
+        if write_header:
+            self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlSink:
+    def __init__(self, path, append=False):
+        self.file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """One row group per job. Parquet files cannot be appended to, so a resume writes a new part file."""
+
+    def __init__(self, path, append=False):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow)")
+
+        if append and os.path.exists(path):
+            stem, ext = os.path.splitext(path)
+            part = 1
+            while os.path.exists(f"{stem}.part{part}{ext}"):
+                part += 1
+            path = f"{stem}.part{part}{ext}"
+            logger.info("[Batch] Resuming into %s", path)
+
+        self.pa = pa
+        self.schema = pa.schema([(name, pa.string()) for name in OUTPUT_FIELDS])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        if not rows:
+            return
+        columns = {name: [None if row.get(name) is None else str(row.get(name)) for row in rows]
+                   for name in OUTPUT_FIELDS}
+        self.writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def open_sink(path, append=False):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        return ParquetSink(path, append)
+    if ext in (".jsonl", ".json"):
+        return JsonlSink(path, append)
+    return CsvSink(path, append)
+
+
+# --- Checkpoint ---
+
+def load_checkpoint(path):
+    """Ids of the jobs already written by a previous run."""
+    done = set()
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    done.add(json.loads(line)["job"])
+    return done
+
+
+def _mark_done(path, job, count):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"job": job["id"], "results": count, "finished_at": time.time()}) + "\n")
+
+
+def _rows(job, queries, results):
+    query_text = " | ".join(queries.values())
+    rows = []
+    for item in results:
+        row = {"job_id": job["id"], "role": job["role"], "location": job["location"],
+               "mode": item.get("Fonte", job["mode"]), "query": query_text}
+        row.update(item)
+        rows.append(row)
+    return rows
+
+
+def run_batch(jobs, sink, checkpoint=None, workers=DEFAULT_WORKERS, use_cache=True, use_index=True, backend=None,
+              enrich=False, read_docs=False, rank=False):
+    """
+    Runs every job not yet in the checkpoint. Results are written by this
+    thread only, as each job completes; at most 2 x workers jobs are queued.
+    Returns {"done", "skipped", "failed", "results"}.
+    """
+    done_ids = load_checkpoint(checkpoint)
+    pending = [job for job in jobs if job["id"] not in done_ids]
+    summary = {"done": 0, "skipped": len(jobs) - len(pending), "failed": 0, "results": 0}
+    if summary["skipped"]:
+        logger.info("[Batch] Skipping %d jobs already in the checkpoint", summary["skipped"])
+
+    total = len(pending)
+    queue = iter(pending)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+
+        def submit_next():
+            job = next(queue, None)
+            if job is not None:
+                future = pool.submit(run_job, job, use_cache=use_cache, use_index=use_index, backend=backend,
+                                     enrich=enrich, read_docs=read_docs, rank=rank)
+                in_flight[future] = job
+
+        for _ in range(workers * 2):
+            submit_next()
+
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = in_flight.pop(future)
+                submit_next()
+                try:
+                    queries, results = future.result()
+                except ratelimit.SearchThrottledError as e:
+                    summary["failed"] += 1
+                    logger.warning("[Batch] Job %s throttled (retry after %.0fs), left for --resume", job["id"], e.retry_after or 0)
+                    continue
+                except Exception as e:
+                    summary["failed"] += 1
+                    logger.error("[Batch] Job %s failed: %s", job["id"], e)
+                    continue
+
+                sink.write(_rows(job, queries, results))
+                if checkpoint:
+                    _mark_done(checkpoint, job, len(results))
+                summary["done"] += 1
+                summary["results"] += len(results)
+                logger.info("[Batch] %d/%d %s @ %s: %d results", summary["done"] + summary["failed"], total,
+                            job["role"], job["location"], len(results))
+
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many X-Ray searches from a CSV/JSONL job file")
+    parser.add_argument("jobs", help="CSV/JSONL with role, location[, seniority, skills, mode, num_results]")
+    parser.add_argument("-o", "--output", default="resultados.csv", help="Output file (.csv, .jsonl or .parquet)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent jobs")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="Skip jobs finished by a previous run and append")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the search cache")
+    parser.add_argument("--no-index", action="store_true", help="Do not answer from the local candidate index")
+    parser.add_argument("--enrich", action="store_true",
+                        help="Visit each result page for name, headline, email and phone")
+    parser.add_argument("--read-docs", action="store_true",
+                        help="Read PDF/DOCX results (dropping non-resumes) and import spreadsheet rows "
+                             "(PDF needs pypdf)")
+    parser.add_argument("--rank", action="store_true",
+                        help="Sort each job's results by relevance to its role, seniority and skills")
+    backends.add_backend_args(parser)
+    args = parser.parse_args(argv)
+    instrumentation.configure_logging()
+    if args.enrich and not enrichment.available():
+        raise SystemExit("--enrich needs beautifulsoup4 (pip install beautifulsoup4)")
+
+    backend = backends.backend_from_args(args)
+    jobs = read_jobs(args.jobs)
+    checkpoint = args.checkpoint or args.output + ".checkpoint"
+    if not args.resume and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    sink = open_sink(args.output, append=args.resume)
+    try:
+        summary = run_batch(jobs, sink, checkpoint=checkpoint, workers=args.workers,
+                            use_cache=not args.no_cache, use_index=not args.no_index, backend=backend,
+                            enrich=args.enrich, read_docs=args.read_docs, rank=args.rank)
+    finally:
+        sink.close()
+
+    logger.info("[Batch] %d jobs done, %d skipped, %d failed, %d results -> %s", summary["done"],
+                summary["skipped"], summary["failed"], summary["results"], args.output)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
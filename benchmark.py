@@ -0,0 +1,221 @@
+"""
+Benchmark Suite - query -> fetch -> filter -> dedupe pipeline.
+Micro-benchmarks for the hot helpers plus end-to-end scrape_smart runs over
+synthetic corpora served by an offline backend. Writes JSON so runs from
+different commits can be compared (--compare baseline.json).
+
+    python benchmark.py --sizes 1000,10000 --output bench.json
+    python benchmark.py --compare bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import timeit
+
+import backends
+import locations
+import ranking
+import scraper
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+# Regression threshold used by --compare (relative slowdown)
+REGRESSION_THRESHOLD = 0.10
+
+
+# --- Synthetic corpus ---
+
+_FIRST = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fabio", "Gabriela", "Heitor", "Iara", "Joao"]
+_LAST = ["Silva", "Souza", "Oliveira", "Santos", "Lima", "Pereira", "Costa", "Almeida"]
+_ROLES = ["Desenvolvedor Python", "Analista de Dados", "Vendedor", "Engenheiro de Software", "Designer"]
+_CITIES = ["São Paulo", "São José do Rio Preto", "Campinas", "Curitiba", "Rio de Janeiro"]
+
+
+def synthetic_item(i, rng):
+    """One raw hit; roughly 60% candidates, the rest job posts/noise/duplicates."""
+    name = f"{rng.choice(_FIRST)} {rng.choice(_LAST)}"
+    role = rng.choice(_ROLES)
+    city = rng.choice(_CITIES)
+    kind = rng.random()
+
+    if kind < 0.6:
+        slug = f"{name.lower().replace(' ', '-')}-{i}"
+        return {
+            "href": f"https://www.linkedin.com/in/{slug}",
+            "title": f"{name} - {role} - {city} | LinkedIn",
+            "body": f"{role} em {city}. Contato: {slug}@example.com",
+        }
+    if kind < 0.75:
+        return {
+            "href": f"https://www.linkedin.com/jobs/view/{i}",
+            "title": f"Vaga de {role} em {city}",
+            "body": f"Oportunidade para {role}",
+        }
+    if kind < 0.9:
+        return {
+            "href": f"https://www.example.com/blog/{i}",
+            "title": f"Como criar currículo de {role}",
+            "body": "Dicas de carreira",
+        }
+    # Duplicate of an earlier profile (exercises dedupe)
+    j = rng.randrange(max(i, 1))
+    return {
+        "href": f"https://www.linkedin.com/in/dup-{j}",
+        "title": f"{name} - {role} | LinkedIn",
+        "body": f"{role} em {city}",
+    }
+
+
+class SyntheticBackend(backends.SearchBackend):
+    """
+    Generates `size` raw hits lazily (constant memory even at 1M).
+    Ignores max_results so the whole corpus flows through the pipeline.
+    """
+    name = "synthetic"
+
+    def __init__(self, size, seed=42):
+        self.size = size
+        self.seed = seed
+
+    def text(self, query, max_results=10):
+        rng = random.Random(self.seed)
+        for i in range(self.size):
+            yield synthetic_item(i, rng)
+
+
+# --- Benchmarks ---
+
+def _time_micro(func, number):
+    """Best-of-5 per-call time in microseconds."""
+    timer = timeit.Timer(func)
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / number * 1e6
+
+
+def run_micro(number=20_000):
+    rng = random.Random(7)
+    sample = [synthetic_item(i, rng) for i in range(1_000)]
+    merged = [{"Link Perfil": item["href"]} for item in sample] * 10
+    url, title, body = sample[0]["href"], sample[0]["title"], sample[0]["body"]
+    matcher = locations.get_matcher()
+    candidates = [{"Nome/Titulo": item["title"], "Resumo": item["body"]} for item in sample] * 3
+
+    cases = {
+        "generate_search_query": (lambda: scraper.generate_search_query(
+            "Desenvolvedor Python", "São Paulo", "Senior", "Django, AWS, Docker",
+            exclude_terms="estagio", site="LinkedIn"), number),
+        "_is_valid_result": (lambda: scraper._is_valid_result(url, "LinkedIn"), number),
+        "_is_job_posting": (lambda: scraper._is_job_posting(url, title, "LinkedIn"), number),
+        "_clean_title": (lambda: scraper._clean_title(title, "LinkedIn"), number),
+        "_extract_email": (lambda: scraper._extract_email(body), number),
+        "location_match": (lambda: matcher.match("São José do Rio Preto", title, body), number),
+        "deduplicate_results[10k]": (lambda: scraper.deduplicate_results(merged), max(number // 1000, 5)),
+        "rank[3k]": (lambda: ranking.rank(candidates, "Desenvolvedor Python", "Senior", "Django, AWS, Docker"),
+                     max(number // 4000, 5)),
+    }
+
+    results = {}
+    for name, (func, n) in cases.items():
+        results[name] = {"us_per_call": round(_time_micro(func, n), 3)}
+        print(f"[Bench] {name:<28} {results[name]['us_per_call']:>12.3f} us/call")
+    return results
+
+
+def run_end_to_end(sizes):
+    results = {}
+    for size in sizes:
+        backend = SyntheticBackend(size)
+        # Silence the pipeline's progress prints while timing
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            # No fallback ladder: every rung would replay the same synthetic corpus
+            data = scraper.scrape_smart("bench", num_results=size, site="LinkedIn",
+                                        expected_location=None, use_cache=False, backend=backend, ladder=[])
+            elapsed = time.perf_counter() - start
+
+        results[str(size)] = {
+            "seconds": round(elapsed, 4),
+            "raw_per_second": round(size / elapsed, 1) if elapsed else None,
+            "accepted": len(data),
+        }
+        print(f"[Bench] scrape_smart[{size:>9}] {elapsed:>8.3f} s  ({results[str(size)]['raw_per_second']} raw/s, {len(data)} accepted)")
+    return results
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(sizes=DEFAULT_SIZES, micro_number=20_000):
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "micro": run_micro(micro_number),
+        "end_to_end": run_end_to_end(sizes),
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """Returns a list of (name, baseline, current, change) rows for timings present in both."""
+    rows = []
+    for name, cur in current.get("micro", {}).items():
+        base = baseline.get("micro", {}).get(name)
+        if base:
+            rows.append((f"micro:{name}", base["us_per_call"], cur["us_per_call"]))
+    for size, cur in current.get("end_to_end", {}).items():
+        base = baseline.get("end_to_end", {}).get(size)
+        if base:
+            rows.append((f"e2e:{size}", base["seconds"], cur["seconds"]))
+
+    report = []
+    for name, base, cur in rows:
+        change = (cur - base) / base if base else 0.0
+        report.append((name, base, cur, change))
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"[Compare] {name:<34} {base:>12.4f} -> {cur:>12.4f} ({change:+.1%}) {flag}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the X-Ray search pipeline")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated corpus sizes for end-to-end runs")
+    parser.add_argument("--micro-number", type=int, default=20_000, help="Calls per micro-benchmark repeat")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = run(sizes, args.micro_number)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[Bench] Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report = compare(results, baseline)
+        if any(change > REGRESSION_THRESHOLD for *_, change in report):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
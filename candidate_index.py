@@ -0,0 +1,264 @@
+"""
+Local Candidate Index - every accepted result ever seen, in SQLite + FTS5.
+Upserts by canonical URL (first/last seen, originating query and mode) and
+answers new searches locally before going to the network.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import dedupe
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.environ.get("XRAY_INDEX_PATH", os.path.join(BASE_DIR, ".cache", "candidates.sqlite3"))
+INDEX_ENABLED = os.environ.get("XRAY_INDEX_DISABLED", "").lower() not in ("1", "true", "yes")
+
+# Status flag added to every result
+STATUS_NEW = "Novo"
+STATUS_KNOWN = "Conhecido"
+
+# Result keys stored in dedicated columns; anything else goes to `extra`
+_COLUMNS = {
+    "Nome/Titulo": "title",
+    "Link Perfil": "link",
+    "Resumo": "summary",
+    "Email": "email",
+    "Fonte": "source",
+}
+# Per-search annotations, not properties of the candidate
+_TRANSIENT_KEYS = {"Status", "Cidade", "Distancia (km)", "Estrategia", "Relevancia", "Termos"}
+
+# Query tokenizer: groups, OR, quoted phrases, operators and bare words
+_QUERY_TOKEN_RE = re.compile(r'\(|\)|-?[a-zA-Z]+:"[^"]*"|-?[a-zA-Z]+:[^\s()]+|-?"[^"]*"|[^\s()"]+')
+_SKIP_OPERATORS = ("site:", "filetype:", "inurl:", "-")
+
+
+def _fts_phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def fts_query_from_search(query):
+    """
+    Translates an X-Ray query into an FTS5 MATCH expression over title/summary.
+    Phrases and words become AND clauses, (A OR B) groups become OR clauses;
+    site:/filetype:/inurl: operators and -exclusions are dropped.
+    Returns None when nothing searchable is left.
+    """
+    clauses = []
+    group = None
+
+    for token in _QUERY_TOKEN_RE.findall(query or ""):
+        if token == "(":
+            if group is None:
+                group = []
+            continue
+        if token == ")":
+            if group:
+                clauses.append("(" + " OR ".join(group) + ")" if len(group) > 1 else group[0])
+            group = None
+            continue
+        if token == "OR":
+            continue
+
+        if token.lower().startswith("intitle:"):
+            token = token[len("intitle:"):]
+        elif token.lower().startswith(_SKIP_OPERATORS):
+            continue
+
+        text = token.strip('"').strip()
+        if not text:
+            continue
+
+        phrase = _fts_phrase(text)
+        if group is not None:
+            group.append(phrase)
+        else:
+            clauses.append(phrase)
+
+    return " AND ".join(clauses) if clauses else None
+
+
+class CandidateIndex:
+    """Persistent candidate store. Thread-safe; one connection guarded by a lock."""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.fts = True
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is not None:
+            return self._conn
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS candidates (
+                id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                link TEXT,
+                title TEXT,
+                summary TEXT,
+                email TEXT,
+                source TEXT,
+                query TEXT,
+                extra TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                seen_count INTEGER NOT NULL DEFAULT 1
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_source ON candidates (source)")
+
+        try:
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS candidates_fts USING fts5(
+                    title, summary, content='candidates', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+            conn.executescript("""
+                CREATE TRIGGER IF NOT EXISTS candidates_ai AFTER INSERT ON candidates BEGIN
+                    INSERT INTO candidates_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+                END;
+                CREATE TRIGGER IF NOT EXISTS candidates_ad AFTER DELETE ON candidates BEGIN
+                    INSERT INTO candidates_fts(candidates_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+                END;
+                CREATE TRIGGER IF NOT EXISTS candidates_au AFTER UPDATE OF title, summary ON candidates BEGIN
+                    INSERT INTO candidates_fts(candidates_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+                    INSERT INTO candidates_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+                END;
+            """)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: fall back to LIKE scans
+            logger.warning("[Index] FTS5 not available, using LIKE search")
+            self.fts = False
+
+        conn.commit()
+        self._conn = conn
+        return conn
+
+    def upsert(self, item, query=""):
+        """
+        Stores/refreshes one result. Returns STATUS_NEW if the canonical URL
+        was never seen before, STATUS_KNOWN otherwise.
+        """
+        url = dedupe.canonicalize_url(item.get("Link Perfil", ""))
+        if not url:
+            return STATUS_NEW
+
+        now = time.time()
+        values = {col: item.get(key) for key, col in _COLUMNS.items()}
+        extra = {k: v for k, v in item.items() if k not in _COLUMNS and k not in _TRANSIENT_KEYS}
+        extra_json = json.dumps(extra, ensure_ascii=False, default=str) if extra else None
+
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT id FROM candidates WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO candidates (url, link, title, summary, email, source, query, extra, first_seen, last_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, values["link"], values["title"], values["summary"], values["email"],
+                     values["source"], query, extra_json, now, now)
+                )
+                status = STATUS_NEW
+            else:
+                conn.execute(
+                    "UPDATE candidates SET link = ?, title = ?, summary = ?, email = COALESCE(NULLIF(?, 'N/A'), email), "
+                    "source = ?, query = ?, extra = COALESCE(?, extra), last_seen = ?, seen_count = seen_count + 1 "
+                    "WHERE id = ?",
+                    (values["link"], values["title"], values["summary"], values["email"],
+                     values["source"], query, extra_json, now, row[0])
+                )
+                status = STATUS_KNOWN
+            conn.commit()
+        return status
+
+    def search(self, query, site=None, limit=10):
+        """
+        Answers an X-Ray query from the local store (best matches first).
+        Returns result dicts flagged as STATUS_KNOWN.
+        """
+        match = fts_query_from_search(query)
+        if not match:
+            return []
+
+        with self._lock:
+            conn = self._connect()
+            if self.fts:
+                sql = (
+                    "SELECT c.link, c.title, c.summary, c.email, c.source, c.extra, c.first_seen "
+                    "FROM candidates_fts f JOIN candidates c ON c.id = f.rowid "
+                    "WHERE candidates_fts MATCH ?"
+                )
+                params = [match]
+                if site:
+                    sql += " AND c.source = ?"
+                    params.append(site)
+                sql += " ORDER BY bm25(candidates_fts), c.last_seen DESC LIMIT ?"
+                params.append(int(limit))
+            else:
+                phrases = re.findall(r'"((?:[^"]|"")*)"', match)
+                sql = "SELECT link, title, summary, email, source, extra, first_seen FROM candidates WHERE 1 = 1"
+                params = []
+                for phrase in phrases:
+                    sql += " AND (COALESCE(title, '') || ' ' || COALESCE(summary, '')) LIKE ?"
+                    params.append(f"%{phrase.replace(chr(34) * 2, chr(34))}%")
+                if site:
+                    sql += " AND source = ?"
+                    params.append(site)
+                sql += " ORDER BY last_seen DESC LIMIT ?"
+                params.append(int(limit))
+
+            try:
+                rows = conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                logger.error("[Index] Local search failed: %s", e)
+                return []
+
+        results = []
+        for link, title, summary, email, source, extra, first_seen in rows:
+            item = {
+                "Nome/Titulo": title,
+                "Link Perfil": link,
+                "Resumo": summary,
+                "Email": email,
+                "Fonte": source,
+            }
+            if extra:
+                item.update(json.loads(extra))
+            item["Status"] = STATUS_KNOWN
+            results.append(item)
+        return results
+
+    def stats(self):
+        with self._lock:
+            conn = self._connect()
+            total, sources = conn.execute("SELECT COUNT(*), COUNT(DISTINCT source) FROM candidates").fetchone()
+        return {"candidates": total, "sources": sources, "fts": self.fts}
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_index():
+    """Process-wide index (None when disabled through XRAY_INDEX_DISABLED)."""
+    global _default_index
+    if not INDEX_ENABLED:
+        return None
+    with _default_lock:
+        if _default_index is None:
+            _default_index = CandidateIndex()
+    return _default_index
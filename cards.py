@@ -0,0 +1,192 @@
+"""
+Candidate Cards - renders a whole result list as one self-contained HTML block.
+Pagination and the page-size control run client-side, so flipping pages does
+not rerun the Streamlit script, and the page is sent to the browser as a single
+element however many results there are. Every value is HTML-escaped.
+"""
+import html
+
+PAGE_SIZES = [10, 25, 50, 100]
+DEFAULT_PAGE_SIZE = 10
+
+# Approximate rendered heights (px) used to size the iframe
+CARD_HEIGHT = 150
+CONTROLS_HEIGHT = 70
+
+CARDS_CSS = """
+    body { margin: 0; font-family: 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; }
+    .candidate-card {
+        background-color: #FFFFFF;
+        padding: 1.5rem;
+        border-radius: 12px;
+        border: 1px solid #E2E8F0;
+        box-shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.05);
+        margin: 0 4px 1rem 4px;
+        transition: all 0.2s;
+        position: relative;
+        overflow: hidden;
+    }
+    .candidate-card:hover {
+        box-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.1);
+        border-color: #BFDBFE;
+    }
+    .candidate-card::before {
+        content: "";
+        position: absolute;
+        top: 0;
+        left: 0;
+        width: 4px;
+        height: 100%;
+        background-color: #2563EB;
+    }
+    .card-title {
+        font-size: 1.2rem;
+        font-weight: 700;
+        color: #1E293B;
+        text-decoration: none;
+        margin-bottom: 0.5rem;
+        display: block;
+    }
+    .card-title:hover { color: #2563EB; }
+    .card-url {
+        font-size: 0.85rem;
+        color: #64748B;
+        margin-bottom: 0.8rem;
+        white-space: nowrap;
+        overflow: hidden;
+        text-overflow: ellipsis;
+    }
+    .card-snippet { font-size: 0.95rem; color: #475569; line-height: 1.5; }
+    .card-meta { margin-top: 0.6rem; }
+    .card-badge {
+        display: inline-block;
+        font-size: 0.75rem;
+        color: #1E40AF;
+        background: #EFF6FF;
+        border-radius: 6px;
+        padding: 2px 8px;
+        margin-right: 4px;
+    }
+    .cards-pager {
+        display: flex;
+        align-items: center;
+        gap: 0.6rem;
+        padding: 0.5rem 4px 1rem 4px;
+        color: #475569;
+        font-size: 0.9rem;
+    }
+    .cards-pager button {
+        background-color: #2563EB;
+        color: white;
+        border: none;
+        border-radius: 8px;
+        padding: 0.35rem 0.9rem;
+        font-weight: 600;
+        cursor: pointer;
+    }
+    .cards-pager button:disabled { background-color: #94A3B8; cursor: default; }
+    .cards-pager select { padding: 0.25rem; border-radius: 6px; border: 1px solid #CBD5E1; }
+"""
+
+PAGER_JS = """
+    (function () {
+        var cards = document.querySelectorAll(".candidate-card");
+        var sizeSelect = document.getElementById("page-size");
+        var info = document.getElementById("page-info");
+        var prev = document.getElementById("page-prev");
+        var next = document.getElementById("page-next");
+        var page = 0;
+
+        function pageSize() {
+            var value = parseInt(sizeSelect.value, 10);
+            return value > 0 ? value : cards.length || 1;
+        }
+
+        function show() {
+            var size = pageSize();
+            var pages = Math.max(1, Math.ceil(cards.length / size));
+            page = Math.min(page, pages - 1);
+            for (var i = 0; i < cards.length; i++) {
+                cards[i].style.display = (Math.floor(i / size) === page) ? "" : "none";
+            }
+            info.textContent = "Página " + (page + 1) + " de " + pages + " (" + cards.length + " candidatos)";
+            prev.disabled = page === 0;
+            next.disabled = page >= pages - 1;
+        }
+
+        prev.onclick = function () { page -= 1; show(); window.scrollTo(0, 0); };
+        next.onclick = function () { page += 1; show(); window.scrollTo(0, 0); };
+        sizeSelect.onchange = function () { page = 0; show(); };
+        show();
+    })();
+"""
+
+
+def _safe_href(url):
+    """Only http(s) links are rendered as links."""
+    url = (url or "").strip()
+    return url if url.lower().startswith(("http://", "https://")) else "#"
+
+
+def card_html(item):
+    """One candidate card (all values escaped)."""
+    title = html.escape(item.get("Nome/Titulo") or "Sem Título")
+    link = item.get("Link Perfil") or ""
+    snippet = html.escape(item.get("Resumo") or "Clique para ver o perfil completo.")
+
+    badges = [item.get("Fontes") or item.get("Fonte"), item.get("Status")]
+    if item.get("Estrategia") and item["Estrategia"] != "Original":
+        badges.append(f"🔁 {item['Estrategia']}")
+    if item.get("Cidade"):
+        distance = item.get("Distancia (km)")
+        badges.append(f"📍 {item['Cidade']}" + (f" ({distance:.0f} km)" if distance else ""))
+    if item.get("Email") and item.get("Email") != "N/A":
+        badges.append(f"✉️ {item['Email']}")
+    if item.get("Telefone"):
+        badges.append(f"📞 {item['Telefone']}")
+    if item.get("WhatsApp"):
+        badges.append(f"💬 {item['WhatsApp']}")
+    if item.get("Curriculo") == "Sim":
+        badges.append("📄 Currículo")
+    if item.get("Termos"):
+        badges.append(f"⭐ {item['Termos']}")
+    if item.get("Skills"):
+        badges.append(f"🛠️ {item['Skills'][:80]}")
+    meta = "".join(f'<span class="card-badge">{html.escape(str(b))}</span>' for b in badges if b)
+
+    return (
+        '<div class="candidate-card">'
+        f'<a href="{html.escape(_safe_href(link), quote=True)}" target="_blank" rel="noopener noreferrer" '
+        f'class="card-title">{title} ↗</a>'
+        f'<div class="card-url">{html.escape(link)}</div>'
+        f'<div class="card-snippet">{snippet}</div>'
+        + (f'<div class="card-meta">{meta}</div>' if meta else "")
+        + "</div>"
+    )
+
+
+def render_cards_html(items, page_size=DEFAULT_PAGE_SIZE):
+    """Full HTML document: pager controls + every card (one page visible at a time)."""
+    options = "".join(
+        f'<option value="{size}"{" selected" if size == page_size else ""}>{size} por página</option>'
+        for size in PAGE_SIZES
+    ) + '<option value="0">Todos</option>'
+
+    cards = "".join(card_html(item) for item in items)
+    return (
+        f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><style>{CARDS_CSS}</style></head><body>"
+        '<div class="cards-pager">'
+        '<button id="page-prev">‹ Anterior</button>'
+        '<span id="page-info"></span>'
+        '<button id="page-next">Próxima ›</button>'
+        f'<select id="page-size">{options}</select>'
+        "</div>"
+        f"{cards}"
+        f"<script>{PAGER_JS}</script>"
+        "</body></html>"
+    )
+
+
+def frame_height(count, page_size=DEFAULT_PAGE_SIZE):
+    """Iframe height that fits one page (the frame scrolls for larger pages)."""
+    return CONTROLS_HEIGHT + CARD_HEIGHT * max(1, min(count, page_size))
@@ -0,0 +1,206 @@
+"""
+Candidate Classifier - table-driven accept/reject rules per X-Ray mode.
+All patterns are compiled once at import; classify() labels a whole batch
+of raw {href, title, body} hits in a single pass with a reason code.
+"""
+import re
+from functools import lru_cache
+
+import locations
+
+# Reason codes
+ACCEPTED = "ok"
+INVALID_URL = "invalid_url"
+JOB_POSTING = "job_posting"
+BAD_TITLE = "bad_title"
+WRONG_LOCATION = "wrong_location"
+
+# Rule families (each X-Ray mode maps to one of these)
+KIND_LINKEDIN = "linkedin"
+KIND_FILES = "files"
+KIND_PORTALS = "portals"
+KIND_SOCIAL = "social"
+KIND_ANY = "any"
+
+
+def _alternation(terms):
+    return "|".join(re.escape(t) for t in terms)
+
+
+# --- URL rules ---
+
+FILE_EXTENSIONS = ['.pdf', '.doc', '.docx', '.txt', '.rtf', '.xls', '.xlsx', '.csv']
+
+# Strict Paths for Portals, in priority order.
+# If url doesn't match one of these specific "candidate" patterns, kill it.
+# (key found in the URL, candidate path pattern)
+PORTAL_PATTERNS = [
+    ('trabalhabrasil', r'trabalhabrasil\.com\.br/curriculo'),
+    ('bne', r'bne\.com\.br/(curriculo|vagas-de-emprego)'),  # BNE sometimes puts resumes under odd paths
+    ('catho', r'catho\.com\.br/(perfil|curriculo|profissional)'),
+    ('infojobs', r'infojobs\.com\.br/(candidato|cv|curriculo)'),
+    ('vagas', r'vagas\.com\.br/(perfil-de|curriculo/|profissionais)'),
+]
+
+_LINKEDIN_RE = re.compile(r'linkedin\.com/in/')
+_FILES_RE = re.compile(r'(?:' + _alternation(FILE_EXTENSIONS) + r')$')
+_SOCIAL_RE = re.compile(r'instagram\.com|facebook\.com')
+_PORTAL_KEYS_RE = re.compile(_alternation([key for key, _ in PORTAL_PATTERNS]))
+_PORTAL_RULES = [(key, re.compile(pat)) for key, pat in PORTAL_PATTERNS]
+
+# --- Job posting rules (shared by every mode) ---
+
+JOB_PATHS = [
+    "/vaga/", "/vagas/", "/job/", "/jobs/", "/oportunidade/", "/oportunidades/",
+    "/empresa/", "/empresas/", "/company/", "/companies/",
+    "/login", "/signin", "/cadastro", "/home", "/search", "/busca",
+    "/trabalhe-conosco", "/carreiras", "/blog/", "/artigo/", "/noticia/"
+]
+
+# Exclude specific non-candidate subdomains/paths (checked on the raw URL)
+JOB_HOSTS = ["profissoes.vagas.com.br", "blog."]
+
+# Generic non-candidate titles
+BAD_TITLE_STARTS = [
+    "vaga de", "vagas de", "oportunidade de", "estágio em", "trabalhe conosco",
+    "como criar", "modelo de", "dicas para", "o que faz", "quanto ganha"
+]
+
+# Non-resume document titles (file modes only)
+BAD_DOCUMENT_TITLES = [
+    "relatório", "report", "ata de", "diário oficial", "edital", "manual",
+    "preço", "cotação", "boleto", "invoice", "nota fiscal"
+]
+
+_JOB_PATHS_RE = re.compile(_alternation(JOB_PATHS))
+_JOB_HOSTS_RE = re.compile(_alternation(JOB_HOSTS))
+_BAD_STARTS_RE = re.compile(r'(?:' + _alternation(BAD_TITLE_STARTS) + r')')
+_VAGAS_SUFFIX_RE = re.compile(r'[|-] vagas\.com')
+_VAGAS_JOB_WORDS_RE = re.compile(r'vaga de|oportunidade')
+_BAD_DOCUMENT_RE = re.compile(_alternation(BAD_DOCUMENT_TITLES))
+
+
+def _portal_url_ok(url):
+    # Special BNE case: must be /curriculo/ or /vip/
+    if "bne.com.br" in url:
+        return "/curriculo/" in url or "/vip/" in url
+
+    keys = set(_PORTAL_KEYS_RE.findall(url))
+    if not keys:
+        # Domain not in our specific list, default to False to be safe
+        return False
+
+    for key, pattern in _PORTAL_RULES:
+        if key in keys:
+            if pattern.search(url):
+                # Extra check for Vagas: 'curriculo' must be folder, not part of slug
+                # Reject 'curriculo-de-vendedor' (article) but accept 'curriculo/id'
+                if "vagas.com.br" in url and "curriculo" in url and "/curriculo/" not in url:
+                    return False
+                return True
+            return False  # Domain matched but path didn't -> Job posting or home page
+
+    return False
+
+
+_URL_RULES = {
+    KIND_LINKEDIN: lambda url: _LINKEDIN_RE.search(url) is not None,
+    KIND_FILES: lambda url: _FILES_RE.search(url) is not None,
+    KIND_PORTALS: _portal_url_ok,
+    KIND_SOCIAL: lambda url: _SOCIAL_RE.search(url) is not None,
+    KIND_ANY: lambda url: True,
+}
+
+
+class ModeRules:
+    """Precompiled rule set for one rule family."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.url_ok = _URL_RULES[kind]
+        self.check_document_title = kind == KIND_FILES
+
+    def valid_url(self, url):
+        """Expects a lowercased URL."""
+        return bool(url) and self.url_ok(url)
+
+    def job_posting(self, url, title_lower):
+        if _JOB_HOSTS_RE.search(url):
+            return True
+        if _JOB_PATHS_RE.search(url.lower()):
+            return True
+
+        # Jobs usually start with "Vaga de..." or similar
+        if _BAD_STARTS_RE.match(title_lower):
+            return True
+
+        if "vagas.com.br" in url and _VAGAS_SUFFIX_RE.search(title_lower):
+            if _VAGAS_JOB_WORDS_RE.search(title_lower):
+                return True
+
+        return False
+
+    def bad_title(self, title_lower):
+        return self.check_document_title and _BAD_DOCUMENT_RE.search(title_lower) is not None
+
+    def reason(self, url, title, body="", expected_location=None):
+        """Returns the reason code for one raw hit (ACCEPTED if it is a candidate)."""
+        url = url or ""
+        title_lower = (title or "").lower()
+
+        if not self.valid_url(url.lower()):
+            return INVALID_URL
+        if self.job_posting(url, title_lower):
+            return JOB_POSTING
+        if self.bad_title(title_lower):
+            return BAD_TITLE
+
+        # Location check: accents, abbreviations and aliases ("SJRP", "Rio Preto - SP") all count
+        if expected_location and not location_matches(expected_location, title, body):
+            return WRONG_LOCATION
+
+        return ACCEPTED
+
+
+_RULES = {kind: ModeRules(kind) for kind in _URL_RULES}
+
+
+@lru_cache(maxsize=64)
+def mode_kind(site):
+    """Maps an X-Ray mode name to its rule family."""
+    if site == "LinkedIn":
+        return KIND_LINKEDIN
+    if "PDF" in site or "Lista" in site:
+        return KIND_FILES
+    if "Portais" in site:
+        return KIND_PORTALS
+    if "Redes" in site:
+        return KIND_SOCIAL
+    return KIND_ANY
+
+
+def get_rules(site="LinkedIn"):
+    return _RULES[mode_kind(site)]
+
+
+def location_matches(expected_location, title, body=""):
+    """True if the title/snippet mentions the expected location (the last check of reason)."""
+    return locations.get_matcher().match(expected_location, title, body) is not None
+
+
+def classify_one(url, title, body="", site="LinkedIn", expected_location=None):
+    return get_rules(site).reason(url, title, body, expected_location)
+
+
+def classify(results, site="LinkedIn", expected_location=None):
+    """
+    Classifies a batch of raw {href, title, body} dicts.
+    Returns a list of (accepted, reason) tuples aligned with the input.
+    """
+    rules = get_rules(site)
+    out = []
+    append = out.append
+    for item in results:
+        reason = rules.reason(item.get("href", ""), item.get("title", ""), item.get("body", ""), expected_location)
+        append((reason == ACCEPTED, reason))
+    return out
@@ -0,0 +1,65 @@
+import http.server
+import threading
+from urllib.parse import urlsplit
+
+import pytest
+
+
+class _RouteHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answers GETs from the server's route table, keyed by path (query string
+    ignored). A route is either (body, content_type[, status[, headers]]) or a
+    callable(handler) that writes the response itself; other paths get a 404.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.hits.append(self.path)
+        route = self.server.routes.get(urlsplit(self.path).path)
+        if route is None:
+            self.send(b"not found", "text/plain", 404)
+        elif callable(route):
+            route(self)
+        else:
+            self.send(*route)
+
+    def send(self, body, content_type="application/octet-stream", status=200, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _StubServer(http.server.ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Size caps hang up in the middle of large bodies
+        pass
+
+
+@pytest.fixture
+def http_stub():
+    """
+    Starts local HTTP servers: http_stub(routes) returns the server, with its
+    base URL in .url and the requested paths in .hits. All are shut down after the test.
+    """
+    servers = []
+
+    def serve(routes):
+        server = _StubServer(("127.0.0.1", 0), _RouteHandler)
+        server.routes = routes
+        server.hits = []
+        server.url = f"http://127.0.0.1:{server.server_address[1]}"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
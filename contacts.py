@@ -0,0 +1,237 @@
+"""
+Contact Extraction - emails, Brazilian phones, WhatsApp numbers and LinkedIn
+handles from titles/snippets.
+One set of precompiled patterns serves two paths: extract() for a single hit
+(inline in search_candidates) and extract_frame() for whole columns at once
+with pandas string operations and NumPy masks (re-processing archives).
+Outputs are normalized: lowercased, deobfuscated emails ("nome [at] gmail
+[dot] com"), E.164 phones (+5517991234567) and lowercased handles.
+These are the patterns and the "Telefone" format every other source
+(enrichment, documents, spreadsheets) uses as well.
+
+    python contacts.py resultados.jsonl -o contatos.jsonl
+"""
+import argparse
+import logging
+import re
+import sys
+from collections import namedtuple
+from urllib.parse import unquote
+
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+Contacts = namedtuple("Contacts", "emails phones whatsapp linkedin")
+
+# Obfuscations undone before matching emails (order matters: brackets first).
+# A bare " at " is left alone: "trabalha at Google dot com" is prose, not an address
+DEOBFUSCATIONS = [
+    (re.compile(r"\s*[\[({<]\s*(?:at|arroba)\s*[\])}>]\s*", re.I), "@"),
+    (re.compile(r"\s*[\[({<]\s*(?:dot|ponto)\s*[\])}>]\s*", re.I), "."),
+    (re.compile(r"(?<=\w)\s+arroba\s+(?=\w)", re.I), "@"),
+]
+# " dot "/" ponto " after an @domain; listed twice for two-level domains (empresa ponto com ponto br)
+_SPELLED_DOT = (re.compile(r"(@[\w-]+(?:\.[\w-]+)*)\s+(?:dot|ponto)\s+(?=\w)", re.I), r"\1.")
+DEOBFUSCATIONS += [_SPELLED_DOT, _SPELLED_DOT]
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}", re.I)
+# Phone-looking runs not glued to other digits (CPF/CNPJ/dates are rejected by the normalizer)
+PHONE_RE = re.compile(r"(?<![\d/])(?:\+?55[\s.-]?)?(?:\(?0?[1-9]{2}\)?[\s.-]?)(?:9[\s.-]?)?\d{4}[\s.-]?\d{4}(?![\d/])")
+WHATSAPP_RE = re.compile(
+    r"(?:wa\.me/|whatsapp\.com/send/?\?phone=|(?:whats\s?app|whats|zap|wpp)\W{0,3})(\+?\d[\d\s().-]{8,18}\d)", re.I
+)
+LINKEDIN_RE = re.compile(r"linkedin\.com/in/([\w%-]{3,100})", re.I)
+
+# Image names such as logo@2x.png look like emails
+NOT_EMAIL_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp")
+# Trunk "0" and optional carrier code ("0 15 17 ...") before a 10/11-digit national number
+_TRUNK_RE = re.compile(r"^0(?:\d{2}(?=\d{10,11}$))?")
+_NON_DIGIT_RE = re.compile(r"\D")
+# Cheap pre-checks for extract()
+_OBFUSCATION_HINT_RE = re.compile(r"arroba|[\[({<]\s*at\s*[\])}>]")
+_DIGIT_RUN_RE = re.compile(r"\d{4}")
+
+# Result-dict fields written by apply()
+FIELDS = ["Email", "Telefone", "WhatsApp", "LinkedIn"]
+
+
+def deobfuscate(text):
+    for pattern, repl in DEOBFUSCATIONS:
+        text = pattern.sub(repl, text)
+    return text
+
+
+def normalize_phone(raw):
+    """E.164 for a Brazilian landline/mobile number, or None."""
+    digits = _TRUNK_RE.sub("", _NON_DIGIT_RE.sub("", raw or ""))
+    if len(digits) in (12, 13) and digits.startswith("55"):
+        digits = digits[2:]
+    if len(digits) == 11 and digits[2] != "9":
+        return None
+    if len(digits) == 10 and digits[2] not in "2345":
+        return None
+    if len(digits) not in (10, 11) or "0" in digits[:2]:
+        return None
+    return "+55" + digits
+
+
+def _unique(values):
+    return list(dict.fromkeys(v for v in values if v))
+
+
+def extract(text, url=""):
+    """
+    Contacts found in one text (title + snippet); url adds its LinkedIn handle.
+    Non-string values (None, NaN cells from a sheet) count as empty.
+    """
+    text = text if isinstance(text, str) else ""
+    url = url if isinstance(url, str) else ""
+    # Most snippets carry no contact at all: skip each pattern whose trigger is absent
+    lowered = text.lower()
+    emails = phones = whatsapp = []
+    if "@" in text or _OBFUSCATION_HINT_RE.search(lowered):
+        clean = deobfuscate(text)
+        emails = _unique(e.lower() for e in EMAIL_RE.findall(clean) if not e.lower().endswith(NOT_EMAIL_SUFFIXES))
+    if _DIGIT_RUN_RE.search(text):
+        phones = _unique(normalize_phone(m) for m in PHONE_RE.findall(text))
+        whatsapp = _unique(normalize_phone(m) for m in WHATSAPP_RE.findall(text))
+    linked = f"{url.lower()} {lowered}"
+    linkedin = _unique(unquote(h).lower() for h in LINKEDIN_RE.findall(linked)) if "linkedin.com/in/" in linked else []
+    return Contacts(emails, phones, whatsapp, linkedin)
+
+
+def first_email(text):
+    emails = extract(text).emails
+    return emails[0] if emails else None
+
+
+def first_phone(text):
+    phones = extract(text).phones
+    return phones[0] if phones else None
+
+
+def merge_phones(item, phones):
+    """Adds E.164 numbers to the item's "Telefone" (comma-separated, existing ones first)."""
+    current = [p for p in (item.get("Telefone") or "").split(", ") if p]
+    merged = _unique(current + list(phones))
+    if merged:
+        item["Telefone"] = ", ".join(merged)
+    return item
+
+
+def apply(item, contacts):
+    """Writes contacts into a result dict ("Email" keeps its single-value/N/A shape)."""
+    if item.get("Email") in (None, "", "N/A"):
+        item["Email"] = contacts.emails[0] if contacts.emails else "N/A"
+    merge_phones(item, contacts.phones)
+    for field, values in (("WhatsApp", contacts.whatsapp), ("LinkedIn", contacts.linkedin)):
+        if values:
+            item[field] = ", ".join(values)
+    return item
+
+
+# --- Bulk (pandas) ---
+
+def _grouped(values, index):
+    """Exploded matches -> one de-duplicated list per original row."""
+    values = values.dropna()
+    values = values[values != ""]
+    lists = values.groupby(level=0, sort=False).agg(lambda s: list(dict.fromkeys(s)))
+    return lists.reindex(index).map(lambda v: v if isinstance(v, list) else [])
+
+
+def _phones_e164(raw):
+    """Vectorized normalize_phone over a Series of matched strings."""
+    import numpy as np
+
+    digits = raw.str.replace(_NON_DIGIT_RE, "", regex=True).str.replace(_TRUNK_RE, "", regex=True)
+    country = digits.str.len().isin([12, 13]) & digits.str.startswith("55")
+    digits = digits.where(~country, digits.str[2:])
+    length = digits.str.len()
+    third = digits.str[2]
+    valid = (
+        ((length == 11) & (third == "9")) | ((length == 10) & third.isin(list("2345")))
+    ) & ~digits.str[:2].str.contains("0", regex=False)
+    return ("+55" + digits).where(np.asarray(valid, dtype=bool))
+
+
+def extract_frame(frame, text_columns=("Nome/Titulo", "Resumo"), url_column="Link Perfil"):
+    """
+    Contacts for every row of a DataFrame at once. Returns a DataFrame aligned
+    with `frame` with list columns emails, phones, whatsapp and linkedin.
+    """
+    import pandas as pd
+
+    text = pd.Series("", index=frame.index)
+    for column in text_columns:
+        if column in frame:
+            text = text + " " + frame[column].fillna("").astype(str)
+
+    clean = text
+    for pattern, repl in DEOBFUSCATIONS:
+        clean = clean.str.replace(pattern, repl, regex=True)
+
+    emails = clean.str.findall(EMAIL_RE).explode().str.lower()
+    emails = emails[~emails.fillna("").str.endswith(NOT_EMAIL_SUFFIXES)]
+    phones = _phones_e164(text.str.findall(PHONE_RE).explode().dropna())
+    whatsapp = _phones_e164(text.str.findall(WHATSAPP_RE).explode().dropna())
+
+    links = text
+    if url_column in frame:
+        links = frame[url_column].fillna("").astype(str) + " " + text
+    handles = links.str.findall(LINKEDIN_RE).explode().dropna().map(unquote).str.lower()
+
+    return pd.DataFrame({
+        "emails": _grouped(emails, frame.index),
+        "phones": _grouped(phones, frame.index),
+        "whatsapp": _grouped(whatsapp, frame.index),
+        "linkedin": _grouped(handles, frame.index),
+    }, index=frame.index)
+
+
+def extract_many(items):
+    """Contacts for a list of result dicts: vectorized with pandas, per item without it."""
+    try:
+        import pandas as pd
+    except ImportError:
+        return [extract(f"{i.get('Nome/Titulo', '')} {i.get('Resumo', '')}", i.get("Link Perfil", "")) for i in items]
+    found = extract_frame(pd.DataFrame(items, columns=["Nome/Titulo", "Resumo", "Link Perfil"]))
+    return [Contacts(*row) for row in found.itertuples(index=False, name=None)]
+
+
+def apply_many(items):
+    """Bulk apply(): fills the contact fields of every result dict in place."""
+    for item, found in zip(items, extract_many(items)):
+        apply(item, found)
+    return items
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-extract contacts from archived results (JSONL)")
+    parser.add_argument("input", help="JSONL with Nome/Titulo, Resumo and Link Perfil")
+    parser.add_argument("-o", "--output", required=True, help="JSONL written with the contact fields")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="Rows per vectorized batch")
+    args = parser.parse_args(argv)
+    instrumentation.configure_logging()
+
+    try:
+        import pandas as pd
+    except ImportError:
+        raise SystemExit("Bulk extraction needs pandas (pip install pandas)")
+
+    total = 0
+    with open(args.output, "w", encoding="utf-8") as out:
+        for chunk in pd.read_json(args.input, lines=True, chunksize=args.chunksize, dtype=False):
+            found = extract_frame(chunk)
+            chunk = chunk.copy()
+            chunk["Email"] = found["emails"].map(lambda v: v[0] if v else "N/A")
+            for column, field in (("phones", "Telefone"), ("whatsapp", "WhatsApp"), ("linkedin", "LinkedIn")):
+                chunk[field] = found[column].map(", ".join)
+            chunk.to_json(out, orient="records", lines=True, force_ascii=False)
+            total += len(chunk)
+    logger.info("[Contacts] %d rows -> %s", total, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,7 @@
 
+import argparse
+import backends
+import instrumentation
 import scraper
 import json
 
@@ -36,6 +39,10 @@ def test_live_search(site):
         print(f"❌ CRITICAL ERROR: {e}")
 
 if __name__ == "__main__":
+    instrumentation.configure_logging()
+    parser = backends.add_backend_args(argparse.ArgumentParser(description="Live search smoke test"))
+    backends.backend_from_args(parser.parse_args())
+
     test_live_search("Vagas.com")
     test_live_search("InfoJobs")
     test_live_search("Catho")
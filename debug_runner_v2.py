@@ -1,6 +1,9 @@
 
 import sys
 import io
+import argparse
+import backends
+import instrumentation
 import scraper
 import json
 import time
@@ -26,15 +29,13 @@ def test_live_search(site):
         print(f"🔎 Generated Query: {query}")
         
         # Search with debug prints inside scraper
-        # We need to monkey-patch or modify scraper to see raw results, 
-        # or just use DDGS directly here to see what's coming back.
-        from ddgs import DDGS
-        print(f"--- Inspecting Raw URLs for {site} ---")
-        with DDGS() as ddgs:
-             raw = list(ddgs.text(query, max_results=5))
-             for r in raw:
-                 print(f"RAW URL: {r.get('href', 'No URL')}")
-                 print(f"   Title: {r.get('title', 'No Title')}")
+        # Inspect the raw backend output first to see what's coming back.
+        backend = backends.get_default_backend()
+        print(f"--- Inspecting Raw URLs for {site} ({backend.name}) ---")
+        raw = list(backend.text(query, max_results=5))
+        for r in raw:
+            print(f"RAW URL: {r.get('href', 'No URL')}")
+            print(f"   Title: {r.get('title', 'No Title')}")
 
         results = scraper.scrape_smart(query, num_results=5, site=site)
         
@@ -61,6 +62,11 @@ def test_live_search(site):
         traceback.print_exc()
 
 if __name__ == "__main__":
+    # Per-hit rejection reasons are logged at DEBUG
+    instrumentation.configure_logging('DEBUG')
+    parser = backends.add_backend_args(argparse.ArgumentParser(description="X-Ray modes debug runner"))
+    backends.backend_from_args(parser.parse_args())
+
     # Test new X-Ray Modes
     modes = ["Portais de Emprego", "PDF/DOCX - Currículos"]
     for m in modes:
@@ -0,0 +1,275 @@
+"""
+Result Deduplication - URL canonicalization + near-duplicate index.
+canonicalize_url() maps the many spellings of one profile URL (country
+subdomains, tracking params, trailing slashes, Bing/DDG/Google redirect
+wrappers) to a single key. NearDuplicateIndex (MinHash + LSH banding)
+collapses the same person found through different sources/URLs by the
+similarity of title + snippet, in near-linear time. Two profile URLs on the
+same host are distinct people (templated snippets look alike) unless their
+email or handle match.
+"""
+import base64
+import hashlib
+import re
+import struct
+from functools import lru_cache
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+
+# --- URL canonicalization ---
+
+# Query parameters that never identify a page
+TRACKING_PARAMS = {
+    "trk", "trkinfo", "originalsubdomain", "original_referer", "lipi", "midtoken", "midsig",
+    "gclid", "fbclid", "msclkid", "igshid", "igsh", "si", "ref", "refid", "ref_src",
+    "mc_cid", "mc_eid", "_hsenc", "_hsmi", "spm", "src", "source",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+# Hosts whose paths are case-insensitive (safe to lowercase)
+CASE_INSENSITIVE_HOSTS = ("linkedin.com", "instagram.com", "facebook.com")
+
+# Country/language subdomains collapse to the bare domain (br.linkedin.com -> linkedin.com)
+_LOCALE_SUBDOMAIN_RE = re.compile(r"^(?:www\.|m\.|mobile\.|[a-z]{2}(?:-[a-z]{2})?\.)(?=(?:linkedin|facebook|instagram)\.com$)")
+_WWW_RE = re.compile(r"^(?:www\d?|m)\.")
+
+MAX_REDIRECT_DEPTH = 3
+
+# Cheap pre-check so ordinary URLs skip query parsing entirely
+_REDIRECT_HINT_RE = re.compile(r"bing\.com/(?:aclick|ck/a)|duckduckgo\.com/l/|google\.[a-z.]+/url\?")
+
+
+def _b64_url(value):
+    """Decodes Bing's base64 'u' parameter (optionally prefixed with 'a1')."""
+    if value.startswith("a1"):
+        value = value[2:]
+    value += "=" * (-len(value) % 4)
+    try:
+        decoded = base64.urlsafe_b64decode(value).decode("utf-8", errors="strict")
+    except Exception:
+        return None
+    decoded = unquote(decoded)
+    return decoded if decoded.startswith(("http://", "https://")) else None
+
+
+def unwrap_redirect(url):
+    """Follows known redirect wrappers (Bing aclick/ck, DDG /l/, Google /url) to the target URL."""
+    for _ in range(MAX_REDIRECT_DEPTH):
+        if not url or not _REDIRECT_HINT_RE.search(url):
+            return url
+        parts = urlsplit(url.strip())
+        host = parts.netloc.lower()
+        params = dict(parse_qsl(parts.query, keep_blank_values=True))
+        target = None
+
+        if host.endswith("bing.com") and parts.path in ("/aclick", "/ck/a") and params.get("u"):
+            target = _b64_url(params["u"])
+        elif host.endswith("duckduckgo.com") and parts.path.startswith("/l/") and params.get("uddg"):
+            target = params["uddg"]
+        elif host.split(":")[0].startswith(("google.", "www.google.")) and parts.path == "/url":
+            target = params.get("q") or params.get("url")
+
+        if not target or target == url:
+            return url
+        url = target
+    return url
+
+
+# scheme, host[:port], path, query (fragment dropped)
+_URL_RE = re.compile(r"^(?:[a-zA-Z][a-zA-Z0-9+.-]*://)?([^/?#]*)([^?#]*)(?:\?([^#]*))?")
+
+
+@lru_cache(maxsize=65536)
+def canonicalize_url(url):
+    """Canonical key for a result URL (not meant for display)."""
+    if not url:
+        return ""
+    url = unwrap_redirect(url.strip())
+    host, path, query = _URL_RE.match(url).groups()
+
+    host = host.rsplit("@", 1)[-1].split(":", 1)[0].lower()
+    host = _LOCALE_SUBDOMAIN_RE.sub("", host)
+    host = _WWW_RE.sub("", host)
+
+    if "//" in path:
+        path = re.sub(r"/{2,}", "/", path)
+    if "%" in path:
+        path = unquote(path)
+    path = path.rstrip("/")
+    if host.endswith(CASE_INSENSITIVE_HOSTS):
+        path = path.lower()
+
+    if query:
+        query = urlencode(sorted(
+            (k, v) for k, v in parse_qsl(query, keep_blank_values=True)
+            if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+        ))
+        if query:
+            return f"https://{host}{path}?{query}"
+    return f"https://{host}{path}"
+
+
+# --- Near-duplicate detection (MinHash + LSH) ---
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Each 64-byte blake2b digest yields 32 independent 16-bit hash functions
+_HASHES_PER_DIGEST = 32
+_UNPACK_DIGEST = struct.Struct("<32H").unpack
+
+
+def _shingles(text, size):
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """
+    Incremental MinHash/LSH index over title + snippet.
+    add() returns the index of the earlier near-duplicate item, or None;
+    an `accept(index)` predicate can veto candidates.
+    With the defaults (64 permutations, 16 bands x 4 rows) pairs around
+    0.5 Jaccard become LSH candidates; they are confirmed against the
+    exact shingle Jaccard `threshold`. At most `max_checks` exact
+    comparisons are made per item (most recent bucket entries first), which
+    keeps the cost linear even when many snippets share a template.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=64, bands=16, shingle_size=3, min_shingles=5,
+                 max_checks=16, seed=1):
+        assert num_perm % bands == 0, "num_perm must be divisible by bands"
+        assert num_perm % _HASHES_PER_DIGEST == 0, "num_perm must be a multiple of 32"
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+        self.max_checks = max_checks
+        # One salted digest per group of 32 hash functions
+        self._salts = [struct.pack("<QQ", seed, i) for i in range(num_perm // _HASHES_PER_DIGEST)]
+
+        self._buckets = [dict() for _ in range(bands)]
+        self._shingle_sets = []
+
+    def _signature(self, shingles):
+        rows = []
+        for shingle in shingles:
+            data = shingle.encode("utf-8")
+            row = ()
+            for salt in self._salts:
+                row += _UNPACK_DIGEST(hashlib.blake2b(data, digest_size=64, salt=salt).digest())
+            rows.append(row)
+        # Column-wise minimum = one MinHash value per hash function
+        return tuple(map(min, zip(*rows)))
+
+    def add(self, text, accept=None):
+        shingles = _shingles(text or "", self.shingle_size)
+        doc_id = len(self._shingle_sets)
+        self._shingle_sets.append(shingles)
+
+        # Too little text to judge similarity reliably
+        if len(shingles) < self.min_shingles:
+            return None
+
+        sig = self._signature(shingles)
+        keys = [sig[i * self.rows:(i + 1) * self.rows] for i in range(self.bands)]
+
+        checked = set()
+        for band, key in enumerate(keys):
+            for other in reversed(self._buckets[band].get(key, ())):
+                if other in checked:
+                    continue
+                if len(checked) >= self.max_checks:
+                    break
+                checked.add(other)
+                other_shingles = self._shingle_sets[other]
+                common = len(shingles & other_shingles)
+                union = len(shingles) + len(other_shingles) - common
+                if union and common / union >= self.threshold and (accept is None or accept(other)):
+                    return other
+
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(doc_id)
+        return None
+
+
+def _item_text(item):
+    return f"{item.get('Nome/Titulo', '')} {item.get('Resumo', '')}"
+
+
+# Fields that identify a person on their own (empty and "N/A" never match)
+STRONG_KEYS = ("Email", "LinkedIn")
+
+
+def _host(key):
+    return urlsplit(key).hostname or ""
+
+
+def same_person(kept, item):
+    """
+    Whether a near-duplicate snippet may be collapsed into `kept`: a strong
+    key (email, handle) matches, or the two come from different hosts.
+    """
+    for field in STRONG_KEYS:
+        value = (kept.get(field) or "").strip().lower()
+        if value and value != "n/a" and value == (item.get(field) or "").strip().lower():
+            return True
+    kept_host = _host(canonicalize_url(kept.get("Link Perfil", "")))
+    return kept_host != _host(canonicalize_url(item.get("Link Perfil", "")))
+
+
+class ResultDeduper:
+    """
+    Streaming deduper: exact canonical-URL matches first, then near-duplicate
+    title + snippet (see same_person). Collapsed items add their source to the
+    kept item's "Fontes".
+    """
+
+    def __init__(self, near_duplicates=True, **index_kwargs):
+        self.seen_urls = {}
+        self.kept = []
+        self.index = NearDuplicateIndex(**index_kwargs) if near_duplicates else None
+        self._index_to_kept = []
+
+    def add(self, item):
+        """Returns True if the item is new (and was kept)."""
+        key = canonicalize_url(item.get("Link Perfil", ""))
+        if key in self.seen_urls:
+            self._merge_source(self.seen_urls[key], item)
+            return False
+
+        if self.index is not None:
+            dup_of = self.index.add(_item_text(item), accept=lambda other: self._index_to_kept[other] is not None
+                                    and same_person(self._index_to_kept[other], item))
+            if dup_of is not None:
+                kept = self._index_to_kept[dup_of]
+                self._index_to_kept.append(None)
+                self.seen_urls[key] = kept
+                self._merge_source(kept, item)
+                return False
+            self._index_to_kept.append(item)
+
+        self.seen_urls[key] = item
+        self.kept.append(item)
+        return True
+
+    @staticmethod
+    def _merge_source(kept, dup):
+        source = dup.get("Fonte")
+        if not source or source == kept.get("Fonte"):
+            return
+        sources = kept.get("Fontes") or kept.get("Fonte", "")
+        names = [s for s in sources.split(", ") if s]
+        if source not in names:
+            names.append(source)
+            kept["Fontes"] = ", ".join(names)
+
+
+def deduplicate(results, near_duplicates=True, **index_kwargs):
+    deduper = ResultDeduper(near_duplicates=near_duplicates, **index_kwargs)
+    for item in results:
+        deduper.add(item)
+    return deduper.kept
@@ -0,0 +1,463 @@
+"""
+Resume Documents - downloads and reads PDF/DOC/DOCX hits found in the
+"PDF/DOCX - Currículos" mode, so price lists and reports that slip past the
+title filters can be told apart from real résumés.
+Downloads reuse the enrichment Fetcher (pooled, robots-aware, size-capped);
+text extraction runs in a process pool so it never blocks the UI thread or an
+event loop. Extracted text is cached in SQLite by content hash (and URL ->
+hash), so each document is downloaded and parsed once.
+
+PDF needs pypdf (requirements.txt); DOCX is read with the standard library.
+Without pypdf, .pdf links are not downloaded and such failures are not cached.
+"""
+import hashlib
+import importlib.util
+import io
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit
+from xml.etree import ElementTree
+
+import contacts
+import enrichment
+import geo
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCS_PATH = os.environ.get("XRAY_DOCS_PATH", os.path.join(BASE_DIR, ".cache", "documents.sqlite3"))
+
+MAX_DOCUMENT_BYTES = 8 * 1024 * 1024
+# Uncompressed size allowed for word/document.xml (zip bomb guard)
+MAX_DOCX_XML_BYTES = 32 * 1024 * 1024
+MAX_PDF_PAGES = 15
+MAX_TEXT_CHARS = 200_000
+PARSE_TIMEOUT = 30.0
+PARSE_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+KIND_PDF = "pdf"
+KIND_DOCX = "docx"
+KIND_DOC = "doc"
+
+# "Documento" values besides the shared enrichment.STATUS_* ones
+STATUS_UNKNOWN = "Formato desconhecido"
+STATUS_NO_PYPDF = "Leitura de PDF requer pypdf"
+
+# Normalized (geo.normalize_name) terms that point to / away from a résumé
+RESUME_TERMS = [
+    "curriculo", "curriculum vitae", "experiencia profissional", "formacao academica", "objetivo profissional",
+    "objetivo", "habilidades", "competencias", "idiomas", "escolaridade", "dados pessoais",
+    "cursos complementares", "qualificacoes", "resumo profissional", "estado civil", "nacionalidade",
+]
+NON_RESUME_TERMS = [
+    "tabela de precos", "preco unitario", "valor total", "relatorio", "edital", "ata da", "orcamento",
+    "nota fiscal", "manual", "licitacao", "ementa", "diario oficial", "cnpj", "clausula",
+]
+SKILL_HEADINGS = ["habilidades", "competencias", "conhecimentos", "conhecimentos tecnicos", "skills",
+                  "qualificacoes", "ferramentas", "tecnologias"]
+# Headings that end a skills section
+SECTION_HEADINGS = SKILL_HEADINGS + [
+    "experiencia", "experiencia profissional", "formacao", "formacao academica", "escolaridade", "idiomas",
+    "cursos", "cursos complementares", "objetivo", "dados pessoais", "informacoes adicionais", "referencias",
+]
+MAX_SKILLS = 15
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_UTF16_RUN_RE = re.compile(rb"(?:[\x20-\x7e\xc0-\xff]\x00){4,}")
+_SKILL_SPLIT_RE = re.compile(r"[,;•·|\n\t]+|\s-\s")
+
+
+class DocumentError(Exception):
+    """Document could not be read."""
+
+
+class MissingDependencyError(DocumentError):
+    """The reader for this format is not installed (never cached: installing it fixes the document)."""
+
+
+def pdf_available():
+    return importlib.util.find_spec("pypdf") is not None
+
+
+# --- Extraction (runs in worker processes) ---
+
+def detect_kind(data):
+    """File type from magic bytes (links often lie about the extension)."""
+    if data.startswith(b"%PDF"):
+        return KIND_PDF
+    if data.startswith(b"PK\x03\x04"):
+        return KIND_DOCX
+    if data.startswith(b"\xd0\xcf\x11\xe0"):
+        return KIND_DOC
+    return None
+
+
+def _docx_text(data):
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+        info = archive.getinfo("word/document.xml")
+    except (zipfile.BadZipFile, KeyError):
+        raise DocumentError("DOCX inválido")
+    if info.file_size > MAX_DOCX_XML_BYTES:
+        raise DocumentError("DOCX grande demais")
+
+    paragraphs = []
+    current = []
+    with archive.open(info) as xml:
+        for event, element in ElementTree.iterparse(xml, events=("end",)):
+            tag = element.tag
+            if tag == _W_NS + "t":
+                current.append(element.text or "")
+            elif tag == _W_NS + "tab":
+                current.append("\t")
+            elif tag in (_W_NS + "br", _W_NS + "cr"):
+                current.append("\n")
+            elif tag == _W_NS + "p":
+                paragraphs.append("".join(current))
+                current = []
+                element.clear()
+    return "\n".join(paragraphs)
+
+
+def _pdf_text(data):
+    if not pdf_available():
+        raise MissingDependencyError(STATUS_NO_PYPDF)
+    from pypdf import PdfReader
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        return "\n".join((page.extract_text() or "") for page in reader.pages[:MAX_PDF_PAGES])
+    except Exception as e:
+        raise DocumentError(f"PDF inválido: {e}")
+
+
+def _doc_text(data):
+    # Legacy Word stores text runs as UTF-16LE: keep the printable ones
+    return "\n".join(run.decode("utf-16-le") for run in _UTF16_RUN_RE.findall(data))
+
+
+def extract_text(data, kind):
+    """Plain text of a document (top-level so it can run in a ProcessPoolExecutor)."""
+    if kind == KIND_PDF:
+        text = _pdf_text(data)
+    elif kind == KIND_DOCX:
+        text = _docx_text(data)
+    elif kind == KIND_DOC:
+        text = _doc_text(data)
+    else:
+        raise DocumentError(STATUS_UNKNOWN)
+    return text[:MAX_TEXT_CHARS]
+
+
+# --- Classification ---
+
+def _heading(line):
+    """(normalized heading, rest of line) if the line starts a section, else None."""
+    head, _, rest = line.partition(":")
+    if len(head) > 40:
+        return None
+    title = geo.normalize_name(head)
+    return (title, rest) if title in SECTION_HEADINGS else None
+
+
+def extract_skills(text):
+    """Items listed under a skills-like heading ("Habilidades:", "Conhecimentos", ...)."""
+    skills = []
+    seen = set()
+    in_section = False
+    for line in text.splitlines():
+        heading = _heading(line)
+        if heading:
+            in_section = heading[0] in SKILL_HEADINGS
+            line = heading[1]
+        if not in_section:
+            continue
+        for skill in _SKILL_SPLIT_RE.split(line):
+            skill = skill.strip(" .-:")
+            key = skill.lower()
+            if 2 <= len(skill) <= 40 and key not in seen:
+                seen.add(key)
+                skills.append(skill)
+                if len(skills) >= MAX_SKILLS:
+                    return skills
+    return skills
+
+
+def classify_text(text):
+    """(is_resume, score): résumé section terms and contact data against report/price-list terms."""
+    normalized = f" {geo.normalize_name(text[:20_000])} "
+    positive = sum(1 for term in RESUME_TERMS if f" {term} " in normalized)
+    negative = sum(1 for term in NON_RESUME_TERMS if f" {term} " in normalized)
+    if contacts.EMAIL_RE.search(text):
+        positive += 1
+    if contacts.PHONE_RE.search(text):
+        positive += 1
+    return positive >= 3 and positive > 2 * negative, positive - negative
+
+
+def document_fields(text):
+    """Result fields for an extracted document."""
+    is_resume, _ = classify_text(text)
+    fields = {"Documento": enrichment.STATUS_OK, "Curriculo": "Sim" if is_resume else "Não"}
+    found = contacts.extract(text)
+    if found.emails:
+        fields["Email"] = found.emails[0]
+    if found.phones:
+        fields["Telefone"] = found.phones[0]
+    skills = extract_skills(text) if is_resume else []
+    if skills:
+        fields["Skills"] = ", ".join(skills)
+    return fields
+
+
+# --- Cache ---
+
+class DocumentCache:
+    """Extracted text by sha256 of the file, plus the URL -> sha256 it was downloaded from."""
+
+    def __init__(self, path=DOCS_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    sha256 TEXT PRIMARY KEY,
+                    kind TEXT,
+                    text TEXT NOT NULL,
+                    error TEXT,
+                    parsed_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS document_urls (
+                    url TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                );
+            """)
+            self._conn = conn
+        return self._conn
+
+    def _row(self, sql, key):
+        with self._lock:
+            row = self._connect().execute(sql, (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return row
+
+    def by_url(self, url):
+        """(text, error) for a URL downloaded before, or None."""
+        return self._row("SELECT d.text, d.error FROM document_urls u JOIN documents d ON d.sha256 = u.sha256 "
+                         "WHERE u.url = ?", url)
+
+    def by_hash(self, digest):
+        return self._row("SELECT text, error FROM documents WHERE sha256 = ?", digest)
+
+    def put(self, url, digest, kind, text, error=None):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO documents (sha256, kind, text, error, parsed_at) VALUES (?, ?, ?, ?, ?)",
+                         (digest, kind, text, error, now))
+            conn.execute("INSERT OR REPLACE INTO document_urls (url, sha256, fetched_at) VALUES (?, ?, ?)",
+                         (url, digest, now))
+            conn.commit()
+
+    def link(self, url, digest):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO document_urls (url, sha256, fetched_at) VALUES (?, ?, ?)",
+                         (url, digest, time.time()))
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            count = self._connect().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {"documents": count, "hits": self.hits, "misses": self.misses}
+
+
+_cache = None
+_pool = None
+_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide DocumentCache (lazy)."""
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = DocumentCache()
+    return _cache
+
+
+def set_cache(cache):
+    global _cache
+    _cache = cache
+
+
+def get_pool():
+    """Shared process pool for text extraction (lazy; recreated if a worker died)."""
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    return _pool
+
+
+def _reset_pool(pool):
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Pipeline ---
+
+def is_document(item):
+    return enrichment.is_document_url(item.get("Link Perfil"))
+
+
+def read_document(url, fetcher, cache, pool=None, until=None):
+    """Downloads (once) and reads one document; returns the fields to merge into the result."""
+    cached = _usable(cache.by_url(url))
+    if cached is None:
+        if urlsplit(url).path.lower().endswith(".pdf") and not pdf_available():
+            return {"Documento": STATUS_NO_PYPDF}
+        if not fetcher.allowed(url, until):
+            return {"Documento": enrichment.STATUS_ROBOTS}
+        try:
+            result = fetcher.fetch(url, max_bytes=MAX_DOCUMENT_BYTES, until=until)
+        except enrichment.HostBusyError as e:
+            logger.debug("[Docs] %s: %s", url, e)
+            return {"Documento": enrichment.STATUS_BUSY}
+        except enrichment.FetchError as e:
+            logger.debug("[Docs] %s: %s", url, e)
+            return {"Documento": enrichment.STATUS_ERROR}
+        if result.status >= 400:
+            return {"Documento": f"{enrichment.STATUS_ERROR} HTTP {result.status}"}
+        if result.truncated:
+            return {"Documento": enrichment.STATUS_TOO_LARGE}
+
+        digest = hashlib.sha256(result.body).hexdigest()
+        cached = _usable(cache.by_hash(digest))
+        if cached is not None:
+            # Same file under another URL
+            cache.link(url, digest)
+        else:
+            cached = _parse(url, digest, result.body, cache, pool)
+            if cached is None:
+                return {"Documento": enrichment.STATUS_TIMEOUT}
+
+    text, error = cached
+    if error:
+        return {"Documento": error}
+    return document_fields(text)
+
+
+def _usable(cached):
+    """Drops a cached "needs pypdf" failure (written by older versions) once pypdf is installed."""
+    if cached is not None and cached[1] == STATUS_NO_PYPDF and pdf_available():
+        return None
+    return cached
+
+
+def _parse(url, digest, data, cache, pool):
+    kind = detect_kind(data)
+    if kind is None:
+        cache.put(url, digest, None, "", STATUS_UNKNOWN)
+        return "", STATUS_UNKNOWN
+
+    pool = pool or get_pool()
+    start = time.perf_counter()
+    try:
+        text, error = pool.submit(extract_text, data, kind).result(timeout=PARSE_TIMEOUT), None
+    except MissingDependencyError as e:
+        return "", str(e)
+    except DocumentError as e:
+        text, error = "", str(e)
+    except FuturesTimeout:
+        # Not cached: a slow parse may succeed next time
+        logger.warning("[Docs] Parsing %s took over %.0fs", url, PARSE_TIMEOUT)
+        return None
+    except BrokenProcessPool:
+        logger.error("[Docs] Parser process died on %s", url)
+        _reset_pool(pool)
+        return "", enrichment.STATUS_ERROR
+    finally:
+        instrumentation.get_metrics().observe("document_parse", time.perf_counter() - start)
+
+    cache.put(url, digest, kind, text, error)
+    return text, error
+
+
+def merge_document(item, fields):
+    """Adds document fields; contact data from the snippet or enrichment wins."""
+    email = fields.pop("Email", None)
+    if email and item.get("Email") in (None, "", "N/A"):
+        item["Email"] = email
+    contacts.merge_phones(item, [p for p in [fields.pop("Telefone", None)] if p])
+    item.update(fields)
+    instrumentation.get_metrics().inc("documents_total", status=fields.get("Documento", ""),
+                                      resume=fields.get("Curriculo", ""))
+    return item
+
+
+def iter_documents(items, fetcher=None, cache=None, pool=None, workers=enrichment.FILE_WORKERS,
+                   deadline=enrichment.FILE_DEADLINE):
+    """
+    Reads every PDF/DOC/DOCX result in place, yielding (done, total, item) as
+    each document finishes. Each one gets "Documento" and, once read,
+    "Curriculo" (Sim/Não) plus any email, phone and skills found.
+    """
+    items = [item for item in items if is_document(item)]
+    total = len(items)
+    if not total:
+        return
+
+    own_fetcher = fetcher is None
+    fetcher = fetcher or enrichment.Fetcher(max_bytes=MAX_DOCUMENT_BYTES, timeout=15.0)
+    cache = cache or get_cache()
+    until = time.monotonic() + deadline
+    completed = enrichment.iter_completed(items, lambda url: read_document(url, fetcher, cache, pool, until), workers,
+                                          deadline, {"Documento": enrichment.STATUS_ERROR},
+                                          {"Documento": enrichment.STATUS_TIMEOUT},
+                                          name="docs")
+    try:
+        for done, (item, fields) in enumerate(completed, 1):
+            yield done, total, merge_document(item, fields)
+    finally:
+        completed.close()
+        if own_fetcher:
+            fetcher.close()
+
+
+def read_documents(items, **kwargs):
+    """Blocking form of iter_documents; returns the same list."""
+    enrichment.drain(iter_documents(items, **kwargs))
+    return items
+
+
+def drop_non_resumes(items):
+    """Removes documents read and classified as not a résumé (unread ones are kept)."""
+    return [item for item in items if item.get("Curriculo") != "Não"]
@@ -0,0 +1,435 @@
+"""
+Profile Enrichment - visits accepted candidate pages to fill what the search
+snippet lacks (full name, headline, email, phone).
+Pages are fetched concurrently through a pooled http.client with a per-host
+concurrency cap, timeouts, a size cap and robots.txt checks, then parsed with
+BeautifulSoup (lxml when installed). iter_enrich reports progress as each page
+finishes and gives up on whatever is still pending after `deadline` seconds.
+
+    for done, total, item in enrichment.iter_enrich(results):
+        ...
+"""
+import http.client
+import importlib.util
+import logging
+import re
+import threading
+import time
+import urllib.robotparser
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
+from urllib.parse import urljoin, urlsplit
+
+import contacts
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (compatible; XRayEnricher/1.0)"
+DEFAULT_WORKERS = 8
+MAX_PER_HOST = 2
+DEFAULT_TIMEOUT = 6.0
+# Whole enrichment pass (s): pages still pending are left as they are
+DEFAULT_DEADLINE = 20.0
+# Document/spreadsheet passes: bigger files, fewer workers and a longer deadline
+FILE_WORKERS = 4
+FILE_DEADLINE = 60.0
+MAX_PAGE_BYTES = 512 * 1024
+MAX_ROBOTS_BYTES = 128 * 1024
+MAX_REDIRECTS = 3
+IDLE_PER_HOST = 2
+CHUNK_SIZE = 64 * 1024
+DOCUMENT_EXTENSIONS = (".pdf", ".doc", ".docx")
+
+# Statuses shared by every fetch pass ("Enriquecimento", "Documento", "Planilha")
+STATUS_OK = "OK"
+STATUS_ROBOTS = "Bloqueado (robots.txt)"
+STATUS_ERROR = "Erro"
+STATUS_TIMEOUT = "Tempo esgotado"
+STATUS_BUSY = "Fila do host esgotada"
+STATUS_TOO_LARGE = "Arquivo grande demais"
+# "Enriquecimento" only
+STATUS_EMPTY = "Sem dados"
+STATUS_NOT_HTML = "Não é HTML"
+
+# Fields written into the result dict
+ENRICHED_FIELDS = ["Nome Completo", "Headline", "Telefone", "Enriquecimento"]
+
+_TITLE_SEPARATORS = re.compile(r"\s+[|\-–—]\s+")
+
+FetchResult = namedtuple("FetchResult", "url status content_type body truncated")
+
+
+class FetchError(Exception):
+    """Page could not be fetched (network error, bad status or redirect loop)."""
+
+
+class HostBusyError(FetchError):
+    """No host slot freed up in time: the page was never requested."""
+
+
+class ConnectionPool:
+    """Keep-alive http.client connections per (scheme, host, port), at most max_per_host in use."""
+
+    def __init__(self, max_per_host=MAX_PER_HOST, timeout=DEFAULT_TIMEOUT):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._idle = {}
+        self._slots = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    def _slot(self, key):
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def acquire(self, key, until=None):
+        """
+        Blocks for a host slot until `until` (time.monotonic() value; the
+        connection timeout when None). Returns (connection, reused).
+        """
+        wait = self.timeout if until is None else max(until - time.monotonic(), 0.0)
+        if not self._slot(key).acquire(timeout=wait):
+            raise HostBusyError(f"Host busy: {key[1]}")
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.reused += 1
+                return idle.pop(), True
+            self.opened += 1
+        scheme, host, port = key
+        conn_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return conn_class(host, port, timeout=self.timeout), False
+
+    def release(self, key, conn, reuse):
+        if reuse:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < IDLE_PER_HOST:
+                    idle.append(conn)
+                    conn = None
+        if conn is not None:
+            conn.close()
+        self._slots[key].release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+class Fetcher:
+    """GETs pages through a ConnectionPool, honouring robots.txt and a size cap."""
+
+    def __init__(self, max_per_host=MAX_PER_HOST, timeout=DEFAULT_TIMEOUT, max_bytes=MAX_PAGE_BYTES,
+                 user_agent=USER_AGENT, respect_robots=True):
+        self.pool = ConnectionPool(max_per_host, timeout)
+        self.max_bytes = max_bytes
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self._robots = {}
+        self._robots_lock = threading.Lock()
+
+    def allowed(self, url, until=None):
+        """robots.txt check; unreachable or missing robots.txt allows everything."""
+        if not self.respect_robots:
+            return True
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._robots_lock:
+            entry = self._robots.get(origin)
+            if entry is None:
+                entry = self._robots[origin] = [threading.Lock(), None]
+        lock, parser = entry
+        if parser is None:
+            with lock:
+                if entry[1] is None:
+                    entry[1] = self._load_robots(origin, until)
+                parser = entry[1]
+        return parser.can_fetch(self.user_agent, url)
+
+    def _load_robots(self, origin, until=None):
+        parser = urllib.robotparser.RobotFileParser(origin + "/robots.txt")
+        try:
+            result = self._get(origin + "/robots.txt", MAX_ROBOTS_BYTES, until=until)
+        except FetchError:
+            parser.allow_all = True
+            return parser
+        # Same rules as RobotFileParser.read: 401/403 forbid everything, other errors allow it
+        if result.status in (401, 403):
+            parser.disallow_all = True
+        elif result.status >= 400:
+            parser.allow_all = True
+        else:
+            parser.parse(result.body.decode("utf-8", "replace").splitlines())
+        return parser
+
+    def fetch(self, url, max_bytes=None, sink=None, until=None):
+        """
+        FetchResult for url (after redirects); raises FetchError. With a sink
+        (binary file object) the body is streamed into it instead of returned.
+        until (time.monotonic() value) bounds the wait for a host slot.
+        """
+        return self._get(url, max_bytes or self.max_bytes, sink, until)
+
+    def _get(self, url, max_bytes, sink=None, until=None):
+        for _ in range(MAX_REDIRECTS + 1):
+            result, location = self._request(url, max_bytes, sink, until)
+            if location is None:
+                return result
+            url = urljoin(url, location)
+        raise FetchError(f"Too many redirects: {url}")
+
+    def _request(self, url, max_bytes, sink=None, until=None):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise FetchError(f"Unsupported URL: {url}")
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        headers = {"User-Agent": self.user_agent, "Accept": "text/html,application/xhtml+xml,*/*;q=0.8",
+                   "Accept-Encoding": "identity", "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.5"}
+
+        conn, reused = self.pool.acquire(key, until)
+        reuse = False
+        try:
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection: retry once on a fresh one
+                conn.close()
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+
+            status = response.status
+            if 300 <= status < 400 and response.getheader("Location"):
+                response.read(CHUNK_SIZE)
+                reuse = not response.will_close and response.isclosed()
+                return None, response.getheader("Location")
+
+            length = response.getheader("Content-Length")
+            if length and length.isdigit() and int(length) > max_bytes:
+                # Larger than the cap: keep the head only, never the whole transfer
+                truncated = True
+                body = b"" if sink else response.read(max_bytes)
+            else:
+                chunks = []
+                size = 0
+                while size <= max_bytes:
+                    chunk = response.read(min(CHUNK_SIZE, max_bytes + 1 - size))
+                    if not chunk:
+                        break
+                    if sink:
+                        sink.write(chunk)
+                    else:
+                        chunks.append(chunk)
+                    size += len(chunk)
+                body = b"".join(chunks)
+                truncated = size > max_bytes
+                body = body[:max_bytes]
+            reuse = not truncated and not response.will_close and response.isclosed()
+            return FetchResult(url, status, response.getheader("Content-Type", ""), body, truncated), None
+        except (OSError, http.client.HTTPException) as e:
+            raise FetchError(f"{type(e).__name__}: {e}") from e
+        finally:
+            self.pool.release(key, conn, reuse)
+
+    def close(self):
+        self.pool.close()
+
+
+# --- Parsing ---
+
+def available():
+    """Enrichment needs beautifulsoup4 (requirements.txt); lxml is optional."""
+    return importlib.util.find_spec("bs4") is not None
+
+
+def _html_parser():
+    return "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+
+def _meta(soup, *names):
+    for name in names:
+        tag = soup.find("meta", attrs={"property": name}) or soup.find("meta", attrs={"name": name})
+        if tag and tag.get("content", "").strip():
+            return tag["content"].strip()
+    return ""
+
+
+def _first_email(soup, text):
+    for link in soup.select('a[href^="mailto:"]'):
+        email = link["href"][len("mailto:"):].split("?")[0].strip()
+        if contacts.EMAIL_RE.fullmatch(email):
+            return email.lower()
+    return contacts.first_email(text) or ""
+
+
+def _first_phone(soup, text):
+    """E.164 number from a tel: link or the page text."""
+    for link in soup.select('a[href^="tel:"]'):
+        phone = contacts.normalize_phone(link["href"][len("tel:"):])
+        if phone:
+            return phone
+    return contacts.first_phone(text) or ""
+
+
+def parse_profile(html):
+    """{"name", "headline", "email", "phone"} from a profile page (missing values are "")."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, _html_parser())
+    for tag in soup(["script", "style", "noscript", "template"]):
+        tag.decompose()
+
+    h1 = soup.find("h1")
+    title = _meta(soup, "og:title", "profile:username") or (h1.get_text(" ", strip=True) if h1 else "")
+    if not title and soup.title:
+        title = soup.title.get_text(" ", strip=True)
+    # "Name - Headline | Site": a two-part title is usually "Name | Site"
+    name_parts = _TITLE_SEPARATORS.split(title) if title else [""]
+
+    headline = name_parts[1] if len(name_parts) > 2 else ""
+    if not headline:
+        h2 = soup.find("h2")
+        headline = h2.get_text(" ", strip=True) if h2 else _meta(soup, "og:description", "description")
+
+    text = soup.get_text(" ", strip=True)
+    return {
+        "name": name_parts[0].strip(),
+        "headline": headline[:200].strip(),
+        "email": _first_email(soup, text),
+        "phone": _first_phone(soup, text),
+    }
+
+
+def _decode(result):
+    charset = re.search(r"charset=([\w-]+)", result.content_type or "")
+    try:
+        return result.body.decode(charset.group(1) if charset else "utf-8", "replace")
+    except LookupError:
+        return result.body.decode("utf-8", "replace")
+
+
+def fetch_profile(url, fetcher, until=None):
+    """Fetches and parses one page. Returns the fields to merge into the result dict."""
+    start = time.perf_counter()
+    try:
+        if not fetcher.allowed(url, until):
+            return {"Enriquecimento": STATUS_ROBOTS}
+        result = fetcher.fetch(url, until=until)
+        if result.status >= 400:
+            return {"Enriquecimento": f"{STATUS_ERROR} HTTP {result.status}"}
+        if "html" not in result.content_type.lower():
+            return {"Enriquecimento": STATUS_NOT_HTML}
+        profile = parse_profile(_decode(result))
+    except HostBusyError as e:
+        # Starved behind other pages of the same host, not a failed fetch
+        logger.debug("[Enrich] %s: %s", url, e)
+        return {"Enriquecimento": STATUS_BUSY}
+    except FetchError as e:
+        logger.debug("[Enrich] %s: %s", url, e)
+        return {"Enriquecimento": STATUS_ERROR}
+    finally:
+        instrumentation.get_metrics().observe("enrich", time.perf_counter() - start)
+
+    fields = {"Nome Completo": profile["name"], "Headline": profile["headline"],
+              "Telefone": profile["phone"], "Email": profile["email"]}
+    fields = {k: v for k, v in fields.items() if v}
+    fields["Enriquecimento"] = STATUS_OK if fields else STATUS_EMPTY
+    return fields
+
+
+def merge_profile(item, fields):
+    """Adds enriched fields; a snippet email is kept over the page's, phones are merged."""
+    email = fields.pop("Email", None)
+    if email and item.get("Email") in (None, "", "N/A"):
+        item["Email"] = email
+    contacts.merge_phones(item, [p for p in [fields.pop("Telefone", None)] if p])
+    item.update(fields)
+    instrumentation.get_metrics().inc("enriched_total", status=fields.get("Enriquecimento", ""))
+    return item
+
+
+def iter_completed(items, task, workers, deadline, error_fields, timeout_fields, name="enrich"):
+    """
+    Runs task(url) for every item on a thread pool and yields (item, fields) as
+    each finishes: error_fields when the task raised, timeout_fields for items
+    still pending at the deadline.
+    """
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(items))), thread_name_prefix=f"xray-{name}")
+    futures = {pool.submit(task, item["Link Perfil"]): item for item in items}
+    try:
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                item = futures.pop(future)
+                try:
+                    fields = future.result()
+                except Exception as e:
+                    # Failures on odd pages must not end the whole pass
+                    logger.warning("[%s] %s: %s", name.capitalize(), item["Link Perfil"], e)
+                    fields = dict(error_fields)
+                yield item, fields
+        except FuturesTimeout:
+            logger.info("[%s] Deadline of %.0fs reached with %d pending", name.capitalize(), deadline, len(futures))
+            for future, item in list(futures.items()):
+                future.cancel()
+                yield item, dict(timeout_fields)
+            futures.clear()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def drain(progress):
+    """Runs an iter_* pass to the end (their blocking forms)."""
+    for _ in progress:
+        pass
+
+
+def is_document_url(url):
+    """PDF/DOC/DOCX links are read by documents.py, not parsed as HTML."""
+    return urlsplit(url or "").path.lower().endswith(DOCUMENT_EXTENSIONS)
+
+
+def iter_enrich(items, fetcher=None, workers=DEFAULT_WORKERS, deadline=DEFAULT_DEADLINE):
+    """
+    Enriches items in place, yielding (done, total, item) as each page finishes.
+    Items still pending at the deadline are yielded with "Tempo esgotado".
+    Fields are merged on the calling thread, so a late worker never touches an item.
+    Workers queued behind a busy host wait for a slot up to the deadline.
+    Document links (PDF/DOC/DOCX) are skipped.
+    """
+    if not available():
+        raise ImportError("Profile enrichment needs beautifulsoup4 (pip install beautifulsoup4)")
+    items = [item for item in items if item.get("Link Perfil") and not is_document_url(item["Link Perfil"])]
+    total = len(items)
+    if not total:
+        return
+
+    own_fetcher = fetcher is None
+    fetcher = fetcher or Fetcher()
+    until = time.monotonic() + deadline
+    completed = iter_completed(items, lambda url: fetch_profile(url, fetcher, until), workers, deadline,
+                               {"Enriquecimento": STATUS_ERROR}, {"Enriquecimento": STATUS_TIMEOUT})
+    try:
+        for done, (item, fields) in enumerate(completed, 1):
+            yield done, total, merge_profile(item, fields)
+    finally:
+        completed.close()
+        if own_fetcher:
+            fetcher.close()
+
+
+def enrich(items, fetcher=None, workers=DEFAULT_WORKERS, deadline=DEFAULT_DEADLINE):
+    """Blocking form of iter_enrich; returns the same list."""
+    drain(iter_enrich(items, fetcher=fetcher, workers=workers, deadline=deadline))
+    return items
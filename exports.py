@@ -0,0 +1,102 @@
+"""
+Result Exports - CSV, Excel, JSONL and Parquet, written on demand.
+Every writer streams rows into a binary file object: Excel uses openpyxl's
+write-only mode (rows go straight to the zip stream instead of a cell tree),
+Parquet needs pyarrow. Optional libraries are only imported when their
+format is requested.
+"""
+import csv
+import importlib.util
+import io
+import json
+
+# Leading columns, in this order; any other keys follow in first-seen order
+PREFERRED_COLUMNS = ["Nome/Titulo", "Nome Completo", "Headline", "Link Perfil", "Resumo", "Email", "Telefone",
+                     "WhatsApp", "LinkedIn", "Skills", "Fonte", "Fontes", "Status", "Relevancia", "Termos"]
+
+# format -> (button label, file name, mime type, required module)
+FORMATS = {
+    "csv": ("📥 Baixar CSV", "candidatos.csv", "text/csv", None),
+    "xlsx": ("📥 Baixar Excel", "candidatos.xlsx",
+             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "openpyxl"),
+    "jsonl": ("📥 Baixar JSONL", "candidatos.jsonl", "application/x-ndjson", None),
+    "parquet": ("📥 Baixar Parquet", "candidatos.parquet", "application/vnd.apache.parquet", "pyarrow"),
+}
+
+
+def available_formats():
+    """Formats whose optional dependency is installed."""
+    return [fmt for fmt, (*_, module) in FORMATS.items()
+            if module is None or importlib.util.find_spec(module) is not None]
+
+
+def columns(results):
+    seen = dict.fromkeys(PREFERRED_COLUMNS)
+    present = set()
+    for item in results:
+        for key in item:
+            present.add(key)
+            seen.setdefault(key)
+    return [key for key in seen if key in present]
+
+
+def _cell(value):
+    return "" if value is None else value
+
+
+def write_csv(results, fileobj):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="", write_through=True)
+    try:
+        writer = csv.DictWriter(text, fieldnames=columns(results), restval="", extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+    finally:
+        # Keep the caller's file object open
+        text.detach()
+
+
+def write_jsonl(results, fileobj):
+    for item in results:
+        fileobj.write(json.dumps(item, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+
+
+def write_excel(results, fileobj):
+    from openpyxl import Workbook
+
+    header = columns(results)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Candidatos")
+    sheet.append(header)
+    for item in results:
+        sheet.append([_cell(item.get(key)) for key in header])
+    workbook.save(fileobj)
+
+
+def write_parquet(results, fileobj):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    header = columns(results)
+    table = pa.Table.from_pylist([{key: item.get(key) for key in header} for item in results])
+    pq.write_table(table, fileobj)
+
+
+WRITERS = {
+    "csv": write_csv,
+    "xlsx": write_excel,
+    "jsonl": write_jsonl,
+    "parquet": write_parquet,
+}
+
+
+def write(fmt, results, fileobj):
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    WRITERS[fmt](results, fileobj)
+
+
+def export_bytes(fmt, results):
+    """Builds one export in memory (for download buttons)."""
+    buffer = io.BytesIO()
+    write(fmt, results, buffer)
+    return buffer.getvalue()
@@ -0,0 +1,137 @@
+"""
+Geographic Expansion - offline municipality table with a spatial index.
+Expands a location to the surrounding municipalities within a radius so the
+search can run one query per nearby city.
+
+The bundled data/municipios.csv (nome, uf, lat, lon) covers the São José do
+Rio Preto region, the main SP cities and all state capitals; a full IBGE
+export with the same columns can be dropped in its place.
+"""
+import csv
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import namedtuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MUNICIPALITIES_PATH = os.path.join(BASE_DIR, "data", "municipios.csv")
+
+EARTH_RADIUS_KM = 6371.0
+
+# Spatial index cell size in degrees (~55 km at the equator)
+GRID_CELL_DEG = 0.5
+
+Municipality = namedtuple("Municipality", ["name", "uf", "lat", "lon"])
+
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+# Combining diacritical mark blocks (what NFKD splits accents into)
+_COMBINING_RE = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]+")
+_UF_SUFFIX_RE = re.compile(r"^(.*?)\s*[-,/]\s*([A-Za-z]{2})\s*$")
+
+
+def normalize_name(text):
+    """Accent/case/punctuation-insensitive key: 'São José do Rio Preto' -> 'sao jose do rio preto'."""
+    text = text or ""
+    if not text.isascii():
+        text = _COMBINING_RE.sub("", unicodedata.normalize("NFKD", text))
+    return _NON_ALNUM_RE.sub(" ", text.lower()).strip()
+
+
+def split_uf(location):
+    """'Cidade - UF', 'Cidade, UF' or 'Cidade/UF' -> ('Cidade', 'UF'); no suffix -> (location, None)."""
+    location = (location or "").strip()
+    match = _UF_SUFFIX_RE.match(location)
+    if match:
+        return match.group(1), match.group(2).upper()
+    return location, None
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class MunicipalityIndex:
+    """Uniform-grid spatial index over municipalities plus a name lookup."""
+
+    def __init__(self, municipalities, cell_deg=GRID_CELL_DEG):
+        self.municipalities = list(municipalities)
+        self.cell_deg = cell_deg
+        self.cells = {}
+        self.by_name = {}
+
+        for m in self.municipalities:
+            self.cells.setdefault(self._cell(m.lat, m.lon), []).append(m)
+            self.by_name.setdefault(normalize_name(m.name), []).append(m)
+
+    @classmethod
+    def from_csv(cls, path=MUNICIPALITIES_PATH):
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = [
+                Municipality(r["nome"], r["uf"], float(r["lat"]), float(r["lon"]))
+                for r in csv.DictReader(f)
+            ]
+        return cls(rows)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def find(self, location):
+        """
+        Resolves 'Cidade', 'Cidade - UF' or 'Cidade, UF' to a Municipality (or None).
+        Without a UF, the first entry with that name wins.
+        """
+        if not location:
+            return None
+
+        location, uf = split_uf(location)
+        candidates = self.by_name.get(normalize_name(location), [])
+        if uf:
+            candidates = [m for m in candidates if m.uf == uf] or candidates
+        return candidates[0] if candidates else None
+
+    def within(self, lat, lon, radius_km):
+        """Returns [(Municipality, distance_km)] within the radius, nearest first."""
+        dlat = radius_km / 111.0
+        dlon = radius_km / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+        lat_min, lon_min = self._cell(lat - dlat, lon - dlon)
+        lat_max, lon_max = self._cell(lat + dlat, lon + dlon)
+
+        found = []
+        for i in range(lat_min, lat_max + 1):
+            for j in range(lon_min, lon_max + 1):
+                for m in self.cells.get((i, j), ()):
+                    d = haversine_km(lat, lon, m.lat, m.lon)
+                    if d <= radius_km:
+                        found.append((m, d))
+
+        found.sort(key=lambda pair: pair[1])
+        return found
+
+    def nearby(self, location, radius_km, limit=None):
+        """
+        Expands a location to itself plus surrounding municipalities.
+        Returns [] when the location is not in the table.
+        """
+        origin = self.find(location)
+        if origin is None:
+            return []
+        found = self.within(origin.lat, origin.lon, radius_km)
+        return found[:limit] if limit else found
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Process-wide index, built once from the bundled table."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = MunicipalityIndex.from_csv()
+    return _index
@@ -0,0 +1,292 @@
+"""
+Pipeline Instrumentation - stage timers, rejection counters and profiling hooks.
+Every search records how long each stage took (query build, fetch, classify,
+location filter, dedupe, render) and why raw hits were rejected. Hot loops
+accumulate into a per-search SearchTrace (no locking) that is merged into the
+process-wide Metrics once, when the search ends.
+
+Snapshots are exported as JSON (Metrics.snapshot) or Prometheus text format
+(Metrics.to_prometheus); api.py serves both under /metrics.
+
+Opt-in profiling per search:
+    XRAY_PROFILE=cprofile|tracemalloc|all   (XRAY_PROFILE_DIR, default .cache/profiles)
+"""
+import contextlib
+import cProfile
+import functools
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STAGES = ["query_build", "fetch", "classify", "location_filter", "dedupe", "rank", "render"]
+
+PROFILE_MODES = {"cprofile", "tracemalloc", "all"}
+PROFILE_DIR = os.environ.get("XRAY_PROFILE_DIR", os.path.join(BASE_DIR, ".cache", "profiles"))
+# Lines kept in the tracemalloc report
+TRACEMALLOC_TOP = 25
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+class Metrics:
+    """Thread-safe stage timers ({stage: [count, seconds, max]}) and labelled counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+
+    def observe(self, stage, seconds, count=1):
+        with self._lock:
+            self._observe(stage, seconds, count)
+
+    def _observe(self, stage, seconds, count):
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = self.stages[stage] = [0, 0.0, 0.0]
+        entry[0] += count
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds / count if count else seconds)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def merge(self, trace):
+        """Adds a finished SearchTrace in one locked step."""
+        with self._lock:
+            for stage, (count, seconds) in trace.stages.items():
+                self._observe(stage, seconds, count)
+            for key, value in trace.counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+
+    def snapshot(self):
+        """JSON-friendly view: per-stage count/seconds/avg/max and counters by label."""
+        with self._lock:
+            stages = {name: list(entry) for name, entry in self.stages.items()}
+            counters = dict(self.counters)
+
+        out = {"stages": {}, "counters": {}}
+        for name, (count, seconds, longest) in stages.items():
+            out["stages"][name] = {
+                "count": count,
+                "seconds": round(seconds, 6),
+                "avg_ms": round(seconds / count * 1000, 3) if count else 0.0,
+                "max_ms": round(longest * 1000, 3),
+            }
+        for (name, labels), value in sorted(counters.items()):
+            if labels:
+                out["counters"].setdefault(name, {})[",".join(f"{k}={v}" for k, v in labels)] = value
+            else:
+                out["counters"][name] = value
+        return out
+
+    def to_prometheus(self, prefix="xray"):
+        """Prometheus text exposition format (stage timers as summaries)."""
+        with self._lock:
+            stages = sorted((name, list(entry)) for name, entry in self.stages.items())
+            counters = sorted(self.counters.items())
+
+        lines = [f"# HELP {prefix}_stage_seconds Time spent per pipeline stage",
+                 f"# TYPE {prefix}_stage_seconds summary"]
+        for name, (count, seconds, _) in stages:
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {seconds:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {count}')
+        lines += [f"# HELP {prefix}_stage_seconds_max Longest single observation per stage",
+                  f"# TYPE {prefix}_stage_seconds_max gauge"]
+        for name, (_, _, longest) in stages:
+            lines.append(f'{prefix}_stage_seconds_max{{stage="{name}"}} {longest:.6f}')
+
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"{prefix}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels)
+            lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class SearchTrace:
+    """Per-search accumulator used from a single thread; flush() merges it into Metrics."""
+
+    __slots__ = ("stages", "counters")
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+
+    def add(self, stage, seconds, count=1):
+        entry = self.stages.get(stage)
+        if entry is None:
+            self.stages[stage] = [count, seconds]
+        else:
+            entry[0] += count
+            entry[1] += seconds
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def reject(self, reason):
+        self.inc("rejections_total", reason=reason)
+
+    def flush(self, metrics=None):
+        if self.stages or self.counters:
+            (metrics or get_metrics()).merge(self)
+            self.stages = {}
+            self.counters = {}
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Process-wide Metrics (lazy)."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
+
+
+def set_metrics(metrics):
+    global _metrics
+    _metrics = metrics
+
+
+@contextlib.contextmanager
+def stage(name, metrics=None):
+    """Times the enclosed block as one observation of `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        (metrics or get_metrics()).observe(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                get_metrics().observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+# --- Profiling ---
+
+_profiling = threading.local()
+# tracemalloc is process-wide: concurrent profiled searches share one tracing session
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+# Report stems stay unique across concurrent searches started in the same second
+_report_ids = itertools.count(1)
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if not _tracing_users:
+            # Tracing someone else started is left running
+            _tracing_owned = not tracemalloc.is_tracing()
+            if _tracing_owned:
+                tracemalloc.start()
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    """(snapshot, peak bytes) for the ending search; the last one out stops tracing."""
+    global _tracing_users
+    with _tracing_lock:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        _tracing_users -= 1
+        if not _tracing_users and _tracing_owned:
+            tracemalloc.stop()
+    return snapshot, peak
+
+
+def profile_mode():
+    mode = os.environ.get("XRAY_PROFILE", "").strip().lower()
+    return mode if mode in PROFILE_MODES else ""
+
+
+@contextlib.contextmanager
+def profile(label, mode=None, directory=None):
+    """
+    Captures a cProfile and/or tracemalloc report for the enclosed search when
+    XRAY_PROFILE (or `mode`) asks for it; a no-op otherwise. cProfile covers the
+    calling thread only; tracemalloc sees every thread (concurrent searches share
+    one tracing session, so their peaks overlap). Nested calls do nothing.
+    """
+    mode = profile_mode() if mode is None else mode
+    if not mode or getattr(_profiling, "active", False):
+        yield
+        return
+
+    directory = directory or PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    safe_label = re.sub(r"[^\w.-]+", "_", label)[:60]
+    run_id = f"{os.getpid()}-{next(_report_ids)}"
+    stem = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_label}-{run_id}")
+
+    profiler = cProfile.Profile() if mode in ("cprofile", "all") else None
+    trace_memory = mode in ("tracemalloc", "all")
+    if trace_memory:
+        _start_tracing()
+
+    _profiling.active = True
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(stem + ".prof")
+            logger.info("[Profile] cProfile stats written to %s.prof", stem)
+        if trace_memory:
+            snapshot, peak = _stop_tracing()
+            with open(stem + ".tracemalloc.txt", "w", encoding="utf-8") as f:
+                f.write(f"peak: {peak / 1024:.1f} KiB\n")
+                for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+                    f.write(f"{stat}\n")
+            logger.info("[Profile] tracemalloc report written to %s.tracemalloc.txt", stem)
+        _profiling.active = False
+
+
+def configure_logging(level=None):
+    """Console logging for the CLIs and the UI (XRAY_LOG_LEVEL, default INFO)."""
+    level = level or os.environ.get("XRAY_LOG_LEVEL", "INFO")
+    root = logging.getLogger()
+    if not root.handlers:
+        logging.basicConfig(format=LOG_FORMAT)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
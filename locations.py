@@ -0,0 +1,140 @@
+"""
+Location Matching - accent/alias-insensitive detection of known municipalities.
+Names from data/municipios.csv plus data/location_aliases.csv ("SJRP",
+"S.J. do Rio Preto", "Rio Preto - SP"...) are compiled once into a token trie;
+find() scans a normalized title + snippet in a single pass and reports every
+known location it mentions (longest match wins).
+"""
+import csv
+import os
+import threading
+from collections import namedtuple
+
+import geo
+
+ALIASES_PATH = os.path.join(geo.BASE_DIR, "data", "location_aliases.csv")
+
+# text: normalized words that matched; municipalities: every place they name
+LocationMatch = namedtuple("LocationMatch", ["text", "municipalities"])
+
+# Trie key marking the end of a name
+_END = ""
+
+
+def load_aliases(path, municipalities):
+    """Reads alias,nome,uf rows into [(alias, Municipality)]; unknown targets are skipped."""
+    by_key = {(geo.normalize_name(m.name), m.uf): m for m in municipalities}
+    aliases = []
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            target = by_key.get((geo.normalize_name(row["nome"]), row["uf"].strip().upper()))
+            if target:
+                aliases.append((row["alias"], target))
+    return aliases
+
+
+class LocationMatcher:
+    """Word-level trie over every municipality name and alias."""
+
+    def __init__(self, municipalities, aliases=()):
+        self.trie = {}
+        self.by_name = {}
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+        for m in municipalities:
+            self._add(m.name, m)
+        for alias, m in aliases:
+            self._add(alias, m)
+
+    def _add(self, name, municipality):
+        key = geo.normalize_name(name)
+        if not key:
+            return
+        node = self.trie
+        for token in key.split():
+            node = node.setdefault(token, {})
+        places = node.setdefault(_END, [])
+        if municipality not in places:
+            places.append(municipality)
+        self.by_name[key] = places
+
+    def find(self, text):
+        """Returns a LocationMatch for every known location mentioned in the text."""
+        tokens = geo.normalize_name(text).split()
+        trie = self.trie
+        found = []
+        i, n = 0, len(tokens)
+        while i < n:
+            node = trie.get(tokens[i])
+            if node is None:
+                i += 1
+                continue
+
+            best_end = i + 1 if _END in node else None
+            best = node.get(_END)
+            j = i + 1
+            while j < n:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node:
+                    best_end, best = j, node[_END]
+
+            if best_end is None:
+                i += 1
+                continue
+            found.append(LocationMatch(" ".join(tokens[i:best_end]), tuple(best)))
+            i = best_end
+        return found
+
+    def resolve(self, location):
+        """Municipalities a typed location refers to ('Rio Preto - SP', 'SJRP'...); () if unknown."""
+        with self._lock:
+            if location in self._resolved:
+                return self._resolved[location]
+
+        name, uf = geo.split_uf(location)
+        places = self.by_name.get(geo.normalize_name(name), ())
+        if uf:
+            places = [m for m in places if m.uf == uf] or places
+        places = tuple(places)
+
+        with self._lock:
+            self._resolved[location] = places
+        return places
+
+    def match(self, expected_location, title, body=""):
+        """
+        Returns the LocationMatch that satisfies expected_location in title + body,
+        or None. Locations outside the table fall back to an accent-insensitive
+        whole-word search.
+        """
+        text = f"{title or ''} {body or ''}"
+        targets = self.resolve(expected_location)
+        if not targets:
+            key = geo.normalize_name(expected_location)
+            if f" {key} " in f" {geo.normalize_name(text)} ":
+                return LocationMatch(key, ())
+            return None
+
+        for found in self.find(text):
+            if any(m in targets for m in found.municipalities):
+                return found
+        return None
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher():
+    """Process-wide matcher, compiled once from the bundled tables."""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            municipalities = geo.get_index().municipalities
+            aliases = load_aliases(ALIASES_PATH, municipalities) if os.path.exists(ALIASES_PATH) else []
+            _matcher = LocationMatcher(municipalities, aliases)
+    return _matcher
@@ -0,0 +1,280 @@
+"""
+Query AST - structured form of the X-Ray dorks built by generate_search_query.
+A Query is an ordered list of clauses (role, location, skills, exclusions...),
+each a run of nodes (words, phrases, field operators such as site:, OR/AND
+groups and exclusions) with a priority. From it:
+- serialize() writes a dialect's syntax, optionally fitted to a length /
+  operator budget by dropping the lowest-priority clauses first;
+- canonical() / key() give an order-, case- and spacing-insensitive form and
+  its hash, so equivalent searches share cache entries.
+"""
+import functools
+import hashlib
+import logging
+import re
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Node kinds
+WORD = "word"
+PHRASE = "phrase"
+FIELD = "field"
+NOT = "not"
+OR = "or"
+AND = "and"
+
+# text: word/phrase text or field name; children: field value, negated node or group members
+Node = namedtuple("Node", "kind text children parens", defaults=("", (), False))
+Clause = namedtuple("Clause", "label nodes priority")
+# Limits an engine honours: query length (chars) and operator count (fields, ORs, exclusions)
+Budget = namedtuple("Budget", "max_length max_operators")
+
+FIELD_OPERATORS = {"site", "filetype", "inurl", "intitle", "intext", "ext"}
+# Clause priorities (higher survives longer); REQUIRED clauses are never dropped
+REQUIRED = 100
+PRIORITIES = {
+    "base": REQUIRED, "role": REQUIRED, "location": REQUIRED,
+    "resume_keywords": 70, "company": 50, "seniority": 40, "skills": 30, "exclude": 20, "open_to_work": 10,
+}
+# User-typed lists: a budget trims their last members before dropping the clause
+TRIMMABLE = {"skills", "company"}
+BUDGETS = {
+    "ddg": Budget(max_length=500, max_operators=40),
+    "searxng": Budget(max_length=500, max_operators=40),
+}
+
+_TOKEN_RE = re.compile(r'\(|\)|-?[a-zA-Z]+:"[^"]*"|-?[a-zA-Z]+:[^\s()"]+|-?"[^"]*"|[^\s()"]+|"')
+
+
+# --- Parsing ---
+
+def _leaf(token):
+    if len(token) > 1 and token.startswith("-"):
+        return Node(NOT, children=(_leaf(token[1:]),))
+    if len(token) > 1 and token.startswith('"') and token.endswith('"'):
+        return Node(PHRASE, token[1:-1])
+    name, sep, value = token.partition(":")
+    if sep and value and name.lower() in FIELD_OPERATORS:
+        return Node(FIELD, name, (_leaf(value),))
+    return Node(WORD, token)
+
+
+def _sequence(tokens, pos, nested):
+    """Nodes up to the matching ")" (nested) or the end; "a OR b" runs become OR groups."""
+    items = []
+    pending_or = False
+    while pos < len(tokens):
+        token = tokens[pos]
+        pos += 1
+        if token == ")" and nested:
+            break
+        if token == "OR" and items and not pending_or:
+            pending_or = True
+            continue
+        if token == "(":
+            children, pos = _sequence(tokens, pos, True)
+            if len(children) == 1 and children[0].kind == OR and not children[0].parens:
+                node = children[0]._replace(parens=True)
+            else:
+                node = Node(AND, children=tuple(children), parens=True)
+        else:
+            node = _leaf(token)
+        if pending_or:
+            previous = items.pop()
+            if previous.kind == OR and not previous.parens:
+                node = previous._replace(children=previous.children + (node,))
+            else:
+                node = Node(OR, children=(previous, node))
+            pending_or = False
+        items.append(node)
+    if pending_or:
+        items.append(Node(WORD, "OR"))
+    return items, pos
+
+
+@functools.lru_cache(maxsize=1024)
+def parse(text):
+    """Top-level nodes of a dork string (cached: base dorks and roles repeat across a batch)."""
+    nodes, _ = _sequence(_TOKEN_RE.findall(text or ""), 0, False)
+    return tuple(nodes)
+
+
+# --- Serialization ---
+
+def _render(node):
+    kind = node.kind
+    if kind == WORD:
+        return node.text
+    if kind == PHRASE:
+        return f'"{node.text}"'
+    if kind == FIELD:
+        return f"{node.text}:{_render(node.children[0])}"
+    if kind == NOT:
+        return "-" + _render(node.children[0])
+    text = (" OR " if kind == OR else " ").join(_render(child) for child in node.children)
+    return f"({text})" if node.parens else text
+
+
+def _searxng_node(node):
+    """SearXNG forwards to engines that ignore intitle:/inurl: or read them as words."""
+    kind = node.kind
+    if kind == FIELD:
+        name = node.text.lower()
+        if name == "intitle":
+            return node.children[0]
+        return None if name == "inurl" else node
+    if kind == NOT:
+        child = _searxng_node(node.children[0])
+        return node._replace(children=(child,)) if child is not None else None
+    if kind in (OR, AND):
+        children = tuple(c for c in map(_searxng_node, node.children) if c is not None)
+        return node._replace(children=children) if children else None
+    return node
+
+
+# dialect -> node rewrite (None drops the node)
+DIALECTS = {
+    "ddg": lambda node: node,
+    "searxng": _searxng_node,
+}
+
+
+def count_operators(node):
+    kind = node.kind
+    if kind in (FIELD, NOT):
+        return 1 + count_operators(node.children[0])
+    if kind in (OR, AND):
+        own = len(node.children) - 1 if kind == OR else 0
+        return own + sum(count_operators(child) for child in node.children)
+    return 0
+
+
+# --- Canonical form ---
+
+def _canonical(node):
+    kind = node.kind
+    if kind == WORD:
+        return node.text.casefold()
+    if kind == PHRASE:
+        return '"' + " ".join(node.text.casefold().split()) + '"'
+    if kind == FIELD:
+        return f"{node.text.lower()}:{_canonical(node.children[0])}"
+    if kind == NOT:
+        return "-" + _canonical(node.children[0])
+    members = sorted({_canonical(child) for child in node.children})
+    if len(members) == 1:
+        return members[0]
+    return "(" + (" OR " if kind == OR else " ").join(members) + ")"
+
+
+def _flatten(nodes):
+    """Top-level AND groups are the same as their members written inline."""
+    for node in nodes:
+        if node.kind == AND:
+            yield from _flatten(node.children)
+        else:
+            yield node
+
+
+class Query:
+    """Ordered clauses of one dork. Immutable: fit() returns a new Query."""
+
+    __slots__ = ("clauses", "dropped")
+
+    def __init__(self, clauses=(), dropped=()):
+        self.clauses = tuple(c for c in clauses if c.nodes)
+        self.dropped = tuple(dropped)
+
+    @classmethod
+    def from_string(cls, text, label="query", priority=REQUIRED):
+        return cls([Clause(label, parse(text), priority)])
+
+    def add(self, label, nodes, priority=None):
+        priority = PRIORITIES.get(label, REQUIRED) if priority is None else priority
+        return Query(self.clauses + (Clause(label, tuple(nodes), priority),), self.dropped)
+
+    def nodes(self, dialect="ddg"):
+        rewrite = DIALECTS.get(dialect, DIALECTS["ddg"])
+        for clause in self.clauses:
+            for node in clause.nodes:
+                node = rewrite(node)
+                if node is not None:
+                    yield node
+
+    def serialize(self, dialect="ddg", budget=None):
+        query = self.fit(budget, dialect) if budget else self
+        return " ".join(_render(node) for node in query.nodes(dialect))
+
+    def operators(self, dialect="ddg"):
+        return sum(count_operators(node) for node in self.nodes(dialect))
+
+    def _within(self, budget, dialect):
+        text = " ".join(_render(node) for node in self.nodes(dialect))
+        if budget.max_length and len(text) > budget.max_length:
+            return False
+        return not budget.max_operators or self.operators(dialect) <= budget.max_operators
+
+    def fit(self, budget, dialect="ddg"):
+        """
+        Drops the lowest-priority clauses (later ones first on ties) until the
+        serialized query fits the budget; TRIMMABLE OR groups of 3+ members lose
+        their last member before the whole clause goes. Required clauses are kept.
+        """
+        query = self
+        while not query._within(budget, dialect):
+            droppable = [(c.priority, -i) for i, c in enumerate(query.clauses) if c.priority < REQUIRED]
+            if not droppable:
+                break
+            i = -min(droppable)[1]
+            clause = query.clauses[i]
+            clauses = list(query.clauses)
+            dropped = query.dropped
+            node = clause.nodes[0]
+            if clause.label in TRIMMABLE and node.kind == OR and len(node.children) > 2:
+                clauses[i] = clause._replace(nodes=(node._replace(children=node.children[:-1]),))
+                dropped += (f"{clause.label}:{_render(node.children[-1])}",)
+            else:
+                del clauses[i]
+                dropped += (clause.label,)
+            query = Query(clauses, dropped)
+        if query.dropped != self.dropped:
+            logger.info("[Query] Dropped %s to fit %s budget", ", ".join(query.dropped[len(self.dropped):]), dialect)
+        return query
+
+    def canonical(self):
+        """Order/case/spacing-insensitive text: two equivalent searches give the same string."""
+        nodes = _flatten(node for clause in self.clauses for node in clause.nodes)
+        return " ".join(sorted({_canonical(node) for node in nodes}))
+
+    def key(self):
+        return canonical_hash(self.canonical())
+
+    def __str__(self):
+        return self.serialize()
+
+    def __repr__(self):
+        return f"Query({self.serialize()!r})"
+
+
+def canonical_hash(canonical):
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=4096)
+def cache_key(text):
+    """Canonical hash of a dork string, used to key the search cache."""
+    return Query.from_string(text).key()
+
+
+def adapt(text, dialect, budget=None):
+    """Rewrites a dork string (XRAY_MODES syntax) for an engine's dialect."""
+    return Query.from_string(text).serialize(dialect, budget)
+
+
+def phrase(text):
+    return Node(PHRASE, text)
+
+
+def any_of(texts):
+    return Node(OR, children=tuple(phrase(t) for t in texts), parens=True)
@@ -0,0 +1,177 @@
+"""
+Relevance Ranking - BM25 scores of each result's title + snippet against the
+search's role, seniority and skills, computed over the whole merged batch.
+Every result gets "Relevancia" (score) and "Termos" (the role words, seniority
+and skills it mentions) and the list is sorted best first.
+With NumPy the batch is tokenized once into a term-frequency matrix and scored
+with array operations; without it the same formula runs per result.
+"""
+import math
+import re
+import unicodedata
+from collections import namedtuple
+
+import instrumentation
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Weight of each part of the search in the final score
+WEIGHTS = {"role": 1.0, "seniority": 0.6, "skill": 1.2}
+# Seniority option that adds nothing to the search
+ANY_SENIORITY = "Qualquer"
+# Alternative spellings per seniority option (normalized)
+SENIORITY_SYNONYMS = {
+    "junior": ["junior", "jr", "trainee", "estagiario"],
+    "pleno": ["pleno", "pl", "mid level", "mid"],
+    "senior": ["senior", "sr"],
+    "especialista": ["especialista", "specialist", "principal", "staff"],
+    "manager": ["manager", "gerente", "coordenador", "head", "lider", "tech lead"],
+}
+ROLE_STOPWORDS = {"de", "da", "do", "das", "dos", "e", "em", "para", "com", "a", "o", "the", "of", "and"}
+
+# Keeps c++, c#, node.js and 3.11 whole
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+_COMBINING_RE = re.compile(r"[\u0300-\u036f]")
+# Feminine/plural role forms share the masculine token (desenvolvedora -> desenvolvedor)
+_GENDER_RE = re.compile(r"(?<=\w{4}or)(?:a|as|es)\b")
+
+# label: shown in "Termos"; alternatives: token tuples, any one of which matches when all its tokens appear
+Term = namedtuple("Term", "label alternatives weight")
+
+
+def tokenize(text):
+    text = (text or "").lower()
+    if not text.isascii():
+        text = _COMBINING_RE.sub("", unicodedata.normalize("NFKD", text))
+    return TOKEN_RE.findall(_GENDER_RE.sub("", text))
+
+
+def build_terms(role="", seniority="", skills=""):
+    """Scoring terms for one search: one per role word, the seniority and each comma-separated skill."""
+    terms = []
+    seen = set()
+    for token in tokenize(role):
+        if token not in ROLE_STOPWORDS and token not in seen:
+            seen.add(token)
+            terms.append(Term(token, ((token,),), WEIGHTS["role"]))
+
+    if seniority and seniority != ANY_SENIORITY:
+        key = " ".join(tokenize(seniority))
+        spellings = SENIORITY_SYNONYMS.get(key, [key])
+        terms.append(Term(seniority, tuple(tuple(tokenize(s)) for s in spellings), WEIGHTS["seniority"]))
+
+    for skill in (skills or "").split(","):
+        tokens = tuple(tokenize(skill))
+        if tokens and tokens not in seen:
+            seen.add(tokens)
+            terms.append(Term(skill.strip(), (tokens,), WEIGHTS["skill"]))
+    return terms
+
+
+def _vocabulary(terms):
+    vocab = {}
+    for term in terms:
+        for alternative in term.alternatives:
+            for token in alternative:
+                vocab.setdefault(token, len(vocab))
+    return vocab
+
+
+def _documents(items):
+    return [tokenize(f"{item.get('Nome/Titulo') or ''} {item.get('Resumo') or ''}") for item in items]
+
+
+def _score_numpy(np, docs, terms, vocab):
+    n = len(docs)
+    lengths = np.fromiter((len(d) for d in docs), dtype=np.int64, count=n)
+    # One pass over every token of the batch: vocabulary ids, then a scatter-add into the tf matrix
+    ids = np.fromiter((vocab.get(t, -1) for d in docs for t in d), dtype=np.int64, count=int(lengths.sum()))
+    rows = np.repeat(np.arange(n), lengths)
+    known = ids >= 0
+    tf = np.zeros((n, len(vocab)), dtype=np.float64)
+    np.add.at(tf, (rows[known], ids[known]), 1.0)
+
+    df = (tf > 0).sum(axis=0)
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    avgdl = max(lengths.mean(), 1.0) if n else 1.0
+    norm = K1 * (1 - B + B * lengths / avgdl)
+    weights = idf * tf * (K1 + 1) / (tf + norm[:, None])
+
+    scores = np.zeros(n)
+    matched = np.zeros((n, len(terms)), dtype=bool)
+    for j, term in enumerate(terms):
+        best = np.zeros(n)
+        for alternative in term.alternatives:
+            cols = [vocab[t] for t in alternative]
+            present = (tf[:, cols] > 0).all(axis=1)
+            best = np.maximum(best, np.where(present, weights[:, cols].sum(axis=1), 0.0))
+        scores += term.weight * best
+        matched[:, j] = best > 0
+    return scores.tolist(), matched.tolist()
+
+
+def _score_python(docs, terms, vocab):
+    n = len(docs)
+    counts = []
+    for doc in docs:
+        row = {}
+        for token in doc:
+            if token in vocab:
+                row[token] = row.get(token, 0) + 1
+        counts.append(row)
+    df = {token: sum(1 for row in counts if token in row) for token in vocab}
+    idf = {token: math.log1p((n - df[token] + 0.5) / (df[token] + 0.5)) for token in vocab}
+    avgdl = max(sum(len(d) for d in docs) / n, 1.0) if n else 1.0
+
+    scores, matched = [], []
+    for doc, row in zip(docs, counts):
+        norm = K1 * (1 - B + B * len(doc) / avgdl)
+        total = 0.0
+        hits = []
+        for term in terms:
+            best = 0.0
+            for alternative in term.alternatives:
+                if all(row.get(t) for t in alternative):
+                    best = max(best, sum(idf[t] * row[t] * (K1 + 1) / (row[t] + norm) for t in alternative))
+            total += term.weight * best
+            hits.append(best > 0)
+        scores.append(total)
+        matched.append(hits)
+    return scores, matched
+
+
+def score(items, role="", seniority="", skills="", use_numpy=True):
+    """Sets "Relevancia" and "Termos" on every item (in place) and returns the scores."""
+    terms = build_terms(role, seniority, skills)
+    if not items:
+        return []
+    docs = _documents(items)
+    vocab = _vocabulary(terms)
+    np = None
+    if use_numpy and vocab:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+    if np is not None:
+        scores, matched = _score_numpy(np, docs, terms, vocab)
+    else:
+        scores, matched = _score_python(docs, terms, vocab)
+
+    for item, value, hits in zip(items, scores, matched):
+        item["Relevancia"] = round(value, 3)
+        item["Termos"] = ", ".join(term.label for term, hit in zip(terms, hits) if hit)
+    return scores
+
+
+def rank(items, role="", seniority="", skills="", use_numpy=True):
+    """
+    New list of `items`, best first (ties keep their original order). The
+    dicts themselves are annotated in place (see score), not copied.
+    """
+    with instrumentation.stage("rank"):
+        items = list(items)
+        scores = score(items, role, seniority, skills, use_numpy=use_numpy)
+        order = sorted(range(len(items)), key=lambda i: -scores[i])
+        return [items[i] for i in order]
@@ -0,0 +1,260 @@
+"""
+Outbound Search Scheduler - process-wide token bucket for search calls.
+Adapts its rate to what the engine tolerates (AIMD), backs off with jitter
+on rate-limit errors and opens a circuit breaker to shed load quickly while
+the engine keeps throttling us. Shared by every Streamlit session/thread.
+"""
+import os
+import random
+import threading
+import time
+
+
+# Defaults can be overridden through the environment
+DEFAULT_RATE = float(os.environ.get("XRAY_RATE", 1.0))         # searches per second
+DEFAULT_BURST = float(os.environ.get("XRAY_BURST", 3))         # bucket capacity
+DEFAULT_MIN_RATE = float(os.environ.get("XRAY_MIN_RATE", 0.1))
+DEFAULT_MAX_WAIT = float(os.environ.get("XRAY_MAX_WAIT", 30))  # max seconds queued for a slot
+
+
+class SearchThrottledError(Exception):
+    """The search engine is throttling us (or our own budget is exhausted)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(SearchThrottledError):
+    """Raised immediately while the circuit breaker is open."""
+
+
+def is_rate_limit_error(exc):
+    """Heuristic match for engine throttling (DDGS RatelimitException, HTTP 429/202...)."""
+    if isinstance(exc, SearchThrottledError):
+        return True
+    name = type(exc).__name__.lower()
+    text = str(exc).lower()
+    return (
+        "ratelimit" in name
+        or "ratelimit" in text
+        or "rate limit" in text
+        or "too many requests" in text
+        or "429" in text
+    )
+
+
+class SearchScheduler:
+    """
+    Token bucket + adaptive rate + exponential backoff + circuit breaker.
+
+    acquire() blocks until a slot is available (or raises when the circuit
+    is open / the queue wait would exceed max_wait). Callers report the
+    outcome with report_success(), report_rate_limited() or report_error(),
+    or call release_probe() when they abandon the search without one.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, min_rate=DEFAULT_MIN_RATE,
+                 max_wait=DEFAULT_MAX_WAIT, rate_step=0.05, backoff_base=2.0, backoff_cap=60.0,
+                 failure_threshold=3, cooldown=30.0, clock=time.monotonic, seed=None):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_wait = max_wait
+        self.rate_step = rate_step
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._random = random.Random(seed)
+        self._tokens = burst
+        self._last_refill = clock()
+        self._penalty_until = 0.0
+        self._consecutive_limits = 0
+        self._state = self.CLOSED
+        self._open_until = 0.0
+        self._probe_in_flight = False
+
+        # Metrics
+        self.calls = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.shed = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def _check_circuit(self, now):
+        if self._state == self.OPEN:
+            if now < self._open_until:
+                self.shed += 1
+                raise CircuitOpenError("Search circuit open (engine throttling)", retry_after=self._open_until - now)
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+        if self._state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                self.shed += 1
+                raise CircuitOpenError("Search circuit half-open (probe in flight)", retry_after=self.cooldown)
+            self._probe_in_flight = True
+
+    def acquire(self, timeout=None):
+        """Blocks until a search slot is available. Returns the time spent waiting."""
+        timeout = self.max_wait if timeout is None else timeout
+        start = self.clock()
+
+        with self._cond:
+            self._check_circuit(start)
+            while True:
+                now = self.clock()
+                self._refill(now)
+
+                wait = max(self._penalty_until - now, 0.0)
+                if not wait:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    wait = (1 - self._tokens) / self.rate
+
+                if now + wait - start > timeout:
+                    if self._state == self.HALF_OPEN:
+                        self._probe_in_flight = False
+                    self.shed += 1
+                    raise SearchThrottledError("Search budget exhausted, try again later", retry_after=wait)
+
+                self._cond.wait(wait)
+
+            waited = self.clock() - start
+            self.calls += 1
+            self.wait_count += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+        return waited
+
+    def try_acquire(self):
+        """Takes a slot only if one is free right now (closed circuit, no backoff). Returns True if taken."""
+        with self._cond:
+            now = self.clock()
+            if self._state != self.CLOSED or now < self._penalty_until:
+                return False
+            self._refill(now)
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.calls += 1
+        return True
+
+    def refund(self):
+        """Gives back a slot taken by acquire()/try_acquire() that was never used for a search."""
+        with self._cond:
+            self._tokens = min(self.burst, self._tokens + 1)
+            self.calls -= 1
+            self._cond.notify_all()
+
+    def report_success(self):
+        with self._cond:
+            self._consecutive_limits = 0
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._probe_in_flight = False
+            # Additive increase back towards the configured rate
+            self.rate = min(self.max_rate, self.rate + self.rate_step)
+
+    def report_rate_limited(self):
+        """Registers a throttling response. Returns the backoff delay applied (s)."""
+        with self._cond:
+            now = self.clock()
+            self.rate_limited += 1
+            self._consecutive_limits += 1
+
+            # Exponential backoff with jitter, shared by every caller
+            ceiling = min(self.backoff_cap, self.backoff_base * 2 ** (self._consecutive_limits - 1))
+            delay = self._random.uniform(ceiling / 2, ceiling)
+            self._penalty_until = max(self._penalty_until, now + delay)
+
+            # Multiplicative decrease
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+
+            if self._state == self.HALF_OPEN or self._consecutive_limits >= self.failure_threshold:
+                self._state = self.OPEN
+                self._open_until = now + max(self.cooldown, delay)
+                self._probe_in_flight = False
+
+            self._cond.notify_all()
+        return delay
+
+    def report_error(self):
+        """Non-throttling failure: counted, but does not affect pacing."""
+        with self._cond:
+            self.errors += 1
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def release_probe(self):
+        """Search abandoned before any outcome (consumer stopped early): the next caller may probe."""
+        with self._cond:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def retry_after(self):
+        """Seconds until a new search could start without waiting (approximate)."""
+        with self._cond:
+            now = self.clock()
+            if self._state == self.OPEN and now < self._open_until:
+                return self._open_until - now
+            self._refill(now)
+            wait = max(self._penalty_until - now, 0.0)
+            if not wait and self._tokens < 1:
+                wait = (1 - self._tokens) / self.rate
+            return wait
+
+    def metrics(self):
+        with self._cond:
+            return {
+                "state": self._state,
+                "rate": round(self.rate, 4),
+                "max_rate": self.max_rate,
+                "tokens": round(self._tokens, 3),
+                "calls": self.calls,
+                "rate_limited": self.rate_limited,
+                "errors": self.errors,
+                "shed": self.shed,
+                "wait_avg": (self.wait_total / self.wait_count) if self.wait_count else 0.0,
+                "wait_max": self.wait_max,
+                "wait_total": self.wait_total,
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler (shared across Streamlit sessions and worker threads)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = SearchScheduler()
+    return _scheduler
+
+
+def set_scheduler(scheduler):
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
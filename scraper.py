@@ -1,13 +1,27 @@
 """
 Candidate Search Scraper - Multi-Source X-Ray Search
-Uses ddgs library for reliable search results.
+Uses ddgs library (or any backends.SearchBackend) for search results.
 """
-import re
+import logging
+import queue
+import threading
 import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 
-from duckduckgo_search import DDGS
+import backends
+import candidate_index
+import classifier
+import contacts
+import dedupe
+import geo
+import instrumentation
+import query_ast
+import ratelimit
+import search_cache
+
+logger = logging.getLogger(__name__)
 
 # Global Site Configuration (Legacy + New Modes)
 # "base": The search operator
@@ -46,127 +60,127 @@ XRAY_MODES = {
 # Legacy mapping for compatibility if needed (can be removed later)
 SITE_CONFIG = XRAY_MODES 
 
+# Pseudo-mode used by the UI to fan out over every entry of XRAY_MODES
+ALL_SOURCES = "Todas as fontes"
 
-def generate_search_query(role, location, seniority="", skills="", exact_match=False,
-                          exclude_terms="", target_company="", use_intitle=False,
-                          open_to_work=False, site="LinkedIn"):
+# Upper bound on concurrent outbound searches for multi-mode runs
+MAX_PARALLEL_MODES = 5
+
+# Cap on cities searched when expanding a location to its neighbours
+MAX_NEARBY_CITIES = 8
+
+# Retries (with scheduler backoff) when the engine rate-limits a search
+MAX_RATE_LIMIT_RETRIES = 2
+
+# Seconds a speculative ladder rung holds its reserved slot before searching,
+# so a primary rung that answers quickly cancels it without a wasted request
+SPECULATIVE_DELAY = 0.5
+
+
+# Added to document searches so résumés win over price lists and reports
+RESUME_KEYWORDS = ["experiência", "formação", "educação", "contato"]
+# Keywords that suggest immediate availability
+OPEN_TO_WORK_KEYWORDS = ["open to work", "aberto a propostas", "disponível", "imediato", "cv"]
+
+
+def _phrases(text):
+    """Comma-separated input -> one phrase or an OR group of phrases (None when empty)."""
+    if "," in text:
+        items = [s.strip() for s in text.split(",") if s.strip()]
+        if len(items) > 1:
+            return query_ast.any_of(items)
+        return query_ast.phrase(items[0]) if items else None
+    return query_ast.phrase(text.strip())
+
+
+def build_search_query(role, location, seniority="", skills="", exact_match=False,
+                       exclude_terms="", target_company="", use_intitle=False,
+                       open_to_work=False, site="LinkedIn"):
     """
-    Generates a search query for different platforms/modes.
+    Structured (query_ast.Query) form of generate_search_query: one clause per
+    part, prioritized so a length budget drops skills before the role.
     """
-    
     # Get config for the selected mode, default to LinkedIn if not found
     config = XRAY_MODES.get(site, XRAY_MODES["LinkedIn"])
     base_dork = config['base']
-    
+
     # 1. Start with the Site/Filetype operator
-    query_parts = [base_dork]
+    query = query_ast.Query().add("base", query_ast.parse(base_dork))
 
     # 2. Add Role and Location
     # For filetypes, we ALWAYS want the role to be prominent
     # And we add "bio" keywords to ensure it's a person
     if "filetype" in base_dork and "Lista" not in site:
-         query_parts.append(f'"{role}"')
-         query_parts.append(f'"{location}"')
-         # FORCE resume keywords to avoid "price lists" or "reports"
-         query_parts.append('("experiência" OR "formação" OR "educação" OR "contato")')
+        query = query.add("role", [query_ast.phrase(role)])
+        query = query.add("location", [query_ast.phrase(location)])
+        # FORCE resume keywords to avoid "price lists" or "reports"
+        query = query.add("resume_keywords", [query_ast.any_of(RESUME_KEYWORDS)])
     else:
         # Standard site search
         if exact_match or config['use_intitle']:
-             if config.get('use_intitle'):
-                 query_parts.append(f'intitle:"{role}"')
-             else:
-                 query_parts.append(f'"{role}"')
-             query_parts.append(f'"{location}"')
+            if config.get('use_intitle'):
+                role_nodes = [query_ast.Node(query_ast.FIELD, "intitle", (query_ast.phrase(role),))]
+            else:
+                role_nodes = [query_ast.phrase(role)]
         else:
-             query_parts.append(role)
-             query_parts.append(f'"{location}"') # Keep location quoted for accuracy
+            role_nodes = query_ast.parse(role)
+        query = query.add("role", role_nodes)
+        query = query.add("location", [query_ast.phrase(location)])  # Keep location quoted for accuracy
 
     # 3. Add Seniority
     if seniority:
-        query_parts.append(f'"{seniority}"')
+        query = query.add("seniority", [query_ast.phrase(seniority)])
 
     # 4. Add Skills
-    if skills:
-        if "," in skills:
-            skills_list = [s.strip() for s in skills.split(",") if s.strip()]
-            query_parts.append('(' + " OR ".join([f'"{s}"' for s in skills_list]) + ')')
-        else:
-            query_parts.append(f'"{skills.strip()}"')
+    if skills and (node := _phrases(skills)):
+        query = query.add("skills", [node])
 
     # 5. Target Company
-    if target_company:
-        companies = [c.strip() for c in target_company.split(",") if c.strip()]
-        if len(companies) > 1:
-            query_parts.append('(' + " OR ".join([f'"{c}"' for c in companies]) + ')')
-        elif companies:
-            query_parts.append(f'"{companies[0]}"')
-
-    # 6. Exclude Terms
+    if target_company and (node := _phrases(target_company)):
+        query = query.add("company", [node])
+
+    # 6. Exclude Terms (one clause each, so a budget drops the last ones first)
     if exclude_terms:
         for term in exclude_terms.split(","):
             term = term.strip()
             if term:
-                query_parts.append(f'-{term}')
+                query = query.add("exclude", query_ast.parse(f"-{term}"))
 
     # 7. Open to Work / Availability
     if open_to_work:
-        # Keywords that suggest immediate availability
-        query_parts.append('("open to work" OR "aberto a propostas" OR "disponível" OR "imediato" OR "cv")')
+        query = query.add("open_to_work", [query_ast.any_of(OPEN_TO_WORK_KEYWORDS)])
+
+    return query
+
+
+@instrumentation.timed("query_build")
+def generate_search_query(role, location, seniority="", skills="", exact_match=False,
+                          exclude_terms="", target_company="", use_intitle=False,
+                          open_to_work=False, site="LinkedIn"):
+    """
+    Generates a search query for different platforms/modes, trimmed to the
+    default engine's length/operator budget.
+    """
+    query = build_search_query(role, location, seniority, skills, exact_match, exclude_terms, target_company,
+                               use_intitle, open_to_work, site)
+    return query.serialize(budget=query_ast.BUDGETS["ddg"])
 
-    return " ".join(query_parts).strip()
+
+def generate_queries(role, location, seniority="", skills="", modes=None, **kwargs):
+    """
+    Generates one query per mode. Returns an ordered dict of {mode: query}.
+    """
+    modes = list(modes) if modes else list(XRAY_MODES)
+    return {
+        mode: generate_search_query(role, location, seniority, skills, site=mode, **kwargs)
+        for mode in modes
+    }
 
 
 def _is_valid_result(url, site="LinkedIn"):
     """Checks if the URL matches the expected pattern for the selected mode."""
     if not url: return False
-    url = url.lower()
-
-    # 1. LinkedIn Mode
-    if site == "LinkedIn":
-        return "linkedin.com/in/" in url
-
-    # 2. Files Mode (PDF/DOCX)
-    if "PDF" in site or "Lista" in site:
-        valid_extensions = ['.pdf', '.doc', '.docx', '.txt', '.rtf', '.xls', '.xlsx', '.csv']
-        return any(url.endswith(ext) for ext in valid_extensions)
-
-    # 3. Portals Mode
-    if "Portais" in site:
-        # Strict Paths for Portals
-        # If url doesn't match one of these specific "candidate" patterns, kill it
-        portal_patterns = [
-            (r'trabalhabrasil\.com\.br/curriculo', 'TrabalhaBrasil'),
-            (r'bne\.com\.br/(curriculo|vagas-de-emprego)', 'BNE'), # BNE sometimes puts resumes under odd paths, but let's stick to curriculo if possible
-            (r'catho\.com\.br/(perfil|curriculo|profissional)', 'Catho'),
-            (r'infojobs\.com\.br/(candidato|cv|curriculo)', 'InfoJobs'),
-            (r'vagas\.com\.br/(perfil-de|curriculo/|profissionais)', 'Vagas.com'),
-        ]
-        
-        # Special BNE case: BNE often has 'vagas-de-emprego' in the title even for candidates? No, usually candidates are 'vip'.
-        # Let's be strict: if it's BNE, must be /curriculo/ or /vip/
-        if "bne.com.br" in url:
-             return "/curriculo/" in url or "/vip/" in url
-             
-        # General check for others
-        for pat, name in portal_patterns:
-            if name.lower().replace(".com", "").replace(".br", "") in url:
-                if re.search(pat, url, re.IGNORECASE):
-                    # Extra check for Vagas: 'curriculo' must be folder, not part of slug if possible
-                    if "vagas.com.br" in url and "curriculo" in url and "/curriculo/" not in url:
-                         # Reject 'curriculo-de-vendedor' (article) but accept 'curriculo/id'
-                         return False 
-                    return True
-                return False # Domain matched but path didn't -> Job posting or home page
-                
-        # If domain not in our specific list but was passed (e.g. indeed/glassdoor if we added them), default to False to be safe
-        return False
-
-    # 4. Social Mode
-    if "Redes" in site:
-        return "instagram.com" in url or "facebook.com" in url
-
-    # Default fallback (should catch most things if logic is sound)
-    return True
+    return classifier.get_rules(site).valid_url(url.lower())
 
 
 def _clean_title(title, site="LinkedIn"):
@@ -190,193 +204,647 @@ def _clean_title(title, site="LinkedIn"):
 
 
 def _extract_email(text):
-    if not text:
-        return "N/A"
-    match = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', text)
-    return match.group(0) if match else "N/A"
+    return contacts.first_email(text) or "N/A"
 
 
 def _is_job_posting(url, title, site="LinkedIn"):
     """
     Returns True if the result is likely a job posting, False if it's a candidate.
     """
+    return classifier.get_rules(site).job_posting(url, title.lower())
+
+
+def _to_candidate(item, site="LinkedIn", expected_location=None, trace=None):
+    """
+    Applies the candidate filters to one raw {href, title, body} hit.
+    Returns the result dict, or None if the hit is rejected.
+    With a SearchTrace, the classify and location stages are timed and the
+    rejection reason is counted.
+    """
+    # Bing/DDG/Google redirect wrappers hide the real target URL
+    url = dedupe.unwrap_redirect(item.get("href", ""))
+    title = item.get("title", "")
+    body = item.get("body", "")
+
+    # URL pattern, job posting and document title checks, then the location
+    start = time.perf_counter()
+    reason = classifier.get_rules(site).reason(url, title, body)
+    classified = time.perf_counter()
+    if reason == classifier.ACCEPTED and expected_location:
+        if not classifier.location_matches(expected_location, title, body):
+            reason = classifier.WRONG_LOCATION
+        if trace is not None:
+            trace.add("location_filter", time.perf_counter() - classified)
+    if trace is not None:
+        trace.add("classify", classified - start)
+
+    if reason != classifier.ACCEPTED:
+        if trace is not None:
+            trace.reject(reason)
+        logger.debug("[Filter][%s] %s: %s", site, reason, url)
+        return None
+
+    candidate = {
+        "Nome/Titulo": _clean_title(title, site),
+        "Link Perfil": url,
+        "Resumo": body,
+        "Email": "N/A",
+        "Fonte": site
+    }
+    return contacts.apply(candidate, contacts.extract(f"{title}\n{body}", url))
+
+
+def _close(stream):
+    close = getattr(stream, "close", None)
+    if close:
+        close()
+
+
+def iter_candidates(query, num_results=10, site="LinkedIn", expected_location=None, use_cache=True, backend=None,
+                    use_index=True, index=None, slot_reserved=False, cancel=None):
+    """
+    Streaming variant of search_candidates.
+    Yields accepted candidates as raw hits arrive and stops pulling from
+    the engine as soon as num_results valid profiles were found.
+    With the local candidate index, known matches are yielded first and only
+    the remainder is fetched; every result then carries "Status" (Novo/Conhecido).
+    slot_reserved: the caller already took a scheduler slot (try_acquire) for
+    this search; it is refunded if no request is made. cancel: threading.Event
+    checked after the slot is acquired and before the request goes out.
+    """
+    logger.info("[Search][%s] Query: %s...", site, query[:80])
+
+    backend = backend or backends.get_default_backend()
+    if index is None and use_index and backend.cacheable:
+        index = candidate_index.get_index()
+
+    trace = instrumentation.SearchTrace()
+    trace.inc("searches_total", site=site)
+
+    found = 0
+    local_urls = set()
+    if index:
+        for item in index.search(query, site=site, limit=num_results):
+            local_urls.add(dedupe.canonicalize_url(item["Link Perfil"]))
+            found += 1
+            yield item
+        if found:
+            trace.inc("index_hits_total", found, site=site)
+            logger.info("[Index] %d known %s profiles answered locally", found, site)
+        if found >= num_results:
+            if slot_reserved:
+                ratelimit.get_scheduler().refund()
+            trace.flush()
+            return
+
+    cache = search_cache.get_cache() if use_cache and backend.cacheable else None
+    # Keyed by the canonical form: reordered skills, case or spacing still hit
+    cache_key = query_ast.cache_key(query)
+    cached = cache.get(cache_key, site, num_results) if cache else None
+
+    scheduler = ratelimit.get_scheduler() if cached is None and backend.rate_limited else None
+    if slot_reserved and cached is not None:
+        ratelimit.get_scheduler().refund()
+
+    def open_stream(reserved=False):
+        if scheduler and not reserved:
+            # Blocks for a slot; raises SearchThrottledError while the circuit is open
+            scheduler.acquire()
+        if cancel is not None and cancel.is_set():
+            # Nobody wants the results any more: give the slot back unused
+            if scheduler:
+                scheduler.refund()
+                scheduler.release_probe()
+            return None
+        # Backends can be flaky, so iteration below is wrapped.
+        # Fetch a bit more to allow for valid url filtering
+        return iter(backend.text(query, max_results=min(num_results * 5, 60)))
+
+    if cached is not None:
+        trace.inc("cache_hits_total", site=site)
+        logger.info("[Cache] Hit for %s (%d raw results)", site, len(cached))
+        stream = iter(cached)
+    else:
+        stream = open_stream(slot_reserved)
+        if stream is None:
+            logger.info("[Search][%s] Cancelled before the request", site)
+            trace.flush()
+            return
+
+    pulled = []
+    accepted = 0
+    failed = False
+    exhausted = False
+    completed = False
+    # A half-open circuit waits for this search's outcome: one must be reported on every exit
+    reported = False
+    retries = 0
+    fetch_seconds = 0.0
+    try:
+        while found < num_results:
+            fetch_start = time.perf_counter()
+            try:
+                item = next(stream)
+            except StopIteration:
+                exhausted = True
+                break
+            except Exception as e:
+                if scheduler and ratelimit.is_rate_limit_error(e):
+                    delay = scheduler.report_rate_limited()
+                    reported = True
+                    trace.inc("rate_limited_total", backend=backend.name)
+                    logger.warning("[RateLimit] %s throttled the search, backing off %.1fs", backend.name, delay)
+                    # Retrying is only safe before any hit was consumed
+                    if not pulled and retries < MAX_RATE_LIMIT_RETRIES:
+                        retries += 1
+                        _close(stream)
+                        stream = open_stream()
+                        if stream is None:
+                            break
+                        reported = False
+                        continue
+                    if not pulled:
+                        raise ratelimit.SearchThrottledError(
+                            f"{backend.name} is rate limiting searches", retry_after=scheduler.retry_after()
+                        ) from e
+                elif scheduler:
+                    scheduler.report_error()
+                    reported = True
+                trace.inc("search_errors_total", backend=backend.name)
+                logger.error("[Results] Error during %s search: %s", backend.name, e)
+                failed = True
+                break
+            finally:
+                fetch_seconds += time.perf_counter() - fetch_start
+
+            pulled.append(item)
+            candidate = _to_candidate(item, site, expected_location, trace)
+            if candidate:
+                accepted += 1
+                if index:
+                    candidate["Status"] = index.upsert(candidate, query)
+                    # Already yielded from the local index
+                    if dedupe.canonicalize_url(candidate["Link Perfil"]) in local_urls:
+                        continue
+                found += 1
+                yield candidate
+        completed = True
+    finally:
+        _close(stream)
+        if scheduler and not reported:
+            if completed and not failed:
+                scheduler.report_success()
+            else:
+                # Closed early (ladder cancel, UI stop) or an unexpected error
+                scheduler.release_probe()
+        trace.add("fetch", fetch_seconds, len(pulled) or 1)
+        trace.inc("raw_results_total", len(pulled), site=site)
+        trace.inc("accepted_total", accepted, site=site)
+        trace.flush()
+
+    logger.info("[Search] Got %d raw results", len(pulled))
+
+    # Only a fully consumed (or target-reaching) stream is safe to replay later
+    # (a stream cut short because the index answered part of it is not)
+    if cache and cached is None and not failed and (exhausted or accepted >= num_results):
+        cache.set(cache_key, site, num_results, pulled)
+
+    logger.info("[Search] Found %d %s profiles", found, site)
+
+
+def search_candidates(query, num_results=10, site="LinkedIn", expected_location=None, use_cache=True, backend=None, use_index=True):
+    """
+    Search using DDG API (or the given backend) with retry/error handling.
+    Raw responses go through the persistent cache unless use_cache is False.
+    """
+    return list(iter_candidates(query, num_results=num_results, site=site,
+                                expected_location=expected_location, use_cache=use_cache, backend=backend, use_index=use_index))
+
+
+def deduplicate_results(results, near_duplicates=True):
+    """
+    Drops repeated candidates: same canonical URL (host/tracking/redirect
+    normalized) or near-identical title + snippet from another source.
+    """
+    with instrumentation.stage("dedupe"):
+        return dedupe.deduplicate(results, near_duplicates=near_duplicates)
+
+
+def _simplify_query(query, site):
+    """Builds the relaxed fallback query used when the primary one finds nothing."""
+    # 1. Remove specific dork patterns
+    simplified = query
+    if "site:" in simplified:
+         # Remove the specific site dork from config
+         for k, v in XRAY_MODES.items():
+             # Handle cases where base has OR logic
+             bases = v['base'].replace("(", "").replace(")", "").split(" OR ")
+             for b in bases:
+                 if b.strip() in simplified:
+                     simplified = simplified.replace(b.strip(), "").strip()
     
-    # 1. URL Path Checks (Jobs usually have specific paths)
-    job_paths = [
-        "/vaga/", "/vagas/", "/job/", "/jobs/", "/oportunidade/", "/oportunidades/",
-        "/empresa/", "/empresas/", "/company/", "/companies/",
-        "/login", "/signin", "/cadastro", "/home", "/search", "/busca",
-        "/trabalhe-conosco", "/carreiras", "/blog/", "/artigo/", "/noticia/"
-    ]
+    # 2. Append a simpler site restriction
+    if site == "LinkedIn":
+        simplified = f"{simplified} LinkedIn perfil"
+    elif site == "Portais de Emprego":
+        simplified = f"{simplified} (site:trabalhabrasil.com.br OR site:infojobs.com.br OR site:vagas.com.br) curriculo"
+    elif site == "PDF/DOCX - Currículos":
+         simplified = f"{simplified} (filetype:pdf OR filetype:docx) curriculo"
+    elif site == "Redes Sociais":
+         simplified = f"{simplified} (site:instagram.com OR site:facebook.com)"
+    elif site == "Listas de RH":
+         simplified = f"{simplified} (filetype:xls OR filetype:csv) lista candidatos"
+         
+    # 3. Remove complex operators that might confuse the engine, but keep quotes for multi-word terms
+    simplified = simplified.replace("intitle:", "")
     
-    # Exclude specific non-candidate subdomains/paths
-    if "profissoes.vagas.com.br" in url: return True
-    if "blog." in url: return True
+    # Only remove quotes if they are single words inside (e.g. "Python"), but complex locations need quotes.
+    # For now, let's just keep the quotes as DDG handles them better than loose words for cities.
+    # specific fix: ensure we don't have empty quotes
+    simplified = simplified.replace('""', "")
     
-    if any(p in url.lower() for p in job_paths):
-        return True
+    return simplified
 
-    # 2. Title Checks (Jobs usually start with "Vaga de..." or similar)
-    title_lower = title.lower()
-    
-    # Generic non-candidate titles
-    bad_starts = (
-        "vaga de", "vagas de", "oportunidade de", "estágio em", "trabalhe conosco",
-        "como criar", "modelo de", "dicas para", "o que faz", "quanto ganha"
-    )
-    if title_lower.startswith(bad_starts):
-        return True
-        
-    if "vagas.com.br" in url and ("| vagas.com" in title_lower or "- vagas.com" in title_lower):
-        if "vaga de" in title_lower or "oportunidade" in title_lower:
-            return True
 
-    return False
+# Fallback ladder: query relaxations tried (speculatively, in parallel) when the
+# primary query may not fill num_results. Order = decreasing precision.
+FALLBACK_LADDER = ["sem_intitle", "sem_skills", "sem_senioridade", "site_amplo"]
 
+# Value of the "Estrategia" field for each rung
+RUNG_LABELS = {
+    "original": "Original",
+    "sem_intitle": "Sem intitle",
+    "sem_skills": "Sem skills",
+    "sem_senioridade": "Sem senioridade",
+    "site_amplo": "Site amplo",
+}
 
 
-def search_candidates(query, num_results=10, site="LinkedIn", expected_location=None):
+def build_fallback_ladder(query, site="LinkedIn", query_params=None, ladder=None):
+    """
+    Returns [(rung, query)] starting with the original query. Relaxations are
+    cumulative. Without query_params (the generate_search_query arguments) the
+    skills/seniority rungs cannot be rebuilt and are skipped. Rungs that do not
+    change the query are dropped.
+    """
+    ladder = FALLBACK_LADDER if ladder is None else ladder
+    params = dict(query_params) if query_params else None
+    if params is not None:
+        params.setdefault("site", site)
+
+    rungs = [("original", query)]
+    seen = {query}
+    no_intitle = broad = False
+
+    for rung in ladder:
+        if rung == "sem_intitle":
+            no_intitle = True
+        elif rung == "sem_skills" and params is not None:
+            params["skills"] = ""
+        elif rung == "sem_senioridade" and params is not None:
+            params["seniority"] = ""
+        elif rung == "site_amplo":
+            broad = True
+        elif rung not in RUNG_LABELS:
+            raise ValueError(f"Unknown fallback rung: {rung}")
+
+        relaxed = generate_search_query(**params) if params is not None else query
+        if no_intitle:
+            relaxed = relaxed.replace("intitle:", "")
+        if broad:
+            relaxed = _simplify_query(relaxed, site)
+
+        if relaxed not in seen:
+            seen.add(relaxed)
+            rungs.append((rung, relaxed))
+    return rungs
+
+
+def iter_scrape_smart(query, num_results=10, site="LinkedIn", expected_location=None, use_cache=True, backend=None,
+                      use_index=True, query_params=None, ladder=None, speculative=True, **kwargs):
     """
-    Search using DDG API with retry/error handling.
+    Streaming variant of scrape_smart: yields unique candidates as they are
+    accepted, tagged with the ladder rung that found them ("Estrategia").
+
+    Relaxed rungs start alongside the primary query while the search budget has
+    a free slot: the slot is reserved up front and, for rate-limited backends,
+    used SPECULATIVE_DELAY later unless the rung was cancelled by then (without
+    a free slot they start only once needed). Results are emitted in
+    rung order, so lower rungs only fill what higher-precision rungs left, and
+    are cancelled as soon as num_results candidates were yielded.
     """
-    results = []
+    with instrumentation.profile(f"smart-{site}"):
+        yield from _iter_ladder(query, num_results, site, expected_location, use_cache, backend,
+                                use_index, query_params, ladder, speculative)
+
+
+def _iter_ladder(query, num_results, site, expected_location, use_cache, backend, use_index, query_params,
+                 ladder, speculative):
+    backend = backend or backends.get_default_backend()
+    scheduler = ratelimit.get_scheduler() if backend.rate_limited else None
+    rungs = build_fallback_ladder(query, site, query_params, ladder)
+    for rung, rung_query in rungs[1:]:
+        logger.info("[Fallback] Rung %s: %s", RUNG_LABELS[rung], rung_query)
+
+    out = queue.Queue()
+    done = object()
+    cancelled = [threading.Event() for _ in rungs]
+    finished = [False] * len(rungs)
+    buffers = [[] for _ in rungs]
+    launched = [False] * len(rungs)
+    throttled = []
+
+    def worker(i, rung_query, reserved, delay):
+        try:
+            if delay:
+                cancelled[i].wait(delay)
+            if cancelled[i].is_set():
+                if reserved:
+                    scheduler.refund()
+                return
+            stream = iter_candidates(rung_query, num_results=num_results, site=site, expected_location=expected_location,
+                                     use_cache=use_cache, backend=backend, use_index=use_index,
+                                     slot_reserved=reserved, cancel=cancelled[i])
+            try:
+                for item in stream:
+                    if cancelled[i].is_set():
+                        break
+                    out.put((i, item))
+            finally:
+                stream.close()
+        except Exception as e:
+            logger.error("[Fallback][%s] Error: %s", RUNG_LABELS[rungs[i][0]], e)
+            if isinstance(e, ratelimit.SearchThrottledError):
+                throttled.append(e)
+        finally:
+            out.put((i, done))
+
+    pool = ThreadPoolExecutor(max_workers=len(rungs), thread_name_prefix="xray-ladder")
+
+    reservations = []
+
+    def launch(i, reserved=False, delay=0.0):
+        launched[i] = True
+        future = pool.submit(worker, i, rungs[i][1], reserved, delay)
+        if reserved:
+            reservations.append(future)
+
+    # Single source: exact canonical-URL dedupe is enough (near-dup is for merges)
+    deduper = dedupe.ResultDeduper(near_duplicates=False)
+    dedupe_seconds = 0.0
+    deduped = 0
+    found = 0
+    current = 0
 
-    print(f"[Search][{site}] Query: {query[:80]}...")
-    
-    raw = []
     try:
-        # DDGS can be flaky, so we wrap it
-        with DDGS() as ddgs:
-            # Fetch a bit more to allow for valid url filtering
-            gen = ddgs.text(query, max_results=min(num_results * 5, 60))
-            raw = list(gen)
-            
-    except Exception as e:
-        print(f"[Results] Error during DDGS search: {e}")
-        return []
+        # Slots are reserved here, before any worker runs, so speculation only
+        # spends what the budget has right now; the other rungs wait until needed
+        launch(0, reserved=bool(scheduler and scheduler.try_acquire()))
+        if speculative:
+            for i in range(1, len(rungs)):
+                reserved = bool(scheduler and scheduler.try_acquire())
+                if scheduler and not reserved:
+                    break
+                launch(i, reserved=reserved, delay=SPECULATIVE_DELAY if scheduler else 0.0)
+
+        while current < len(rungs) and found < num_results:
+            if not launched[current]:
+                launch(current)
+            i, item = out.get()
+            if item is done:
+                finished[i] = True
+            else:
+                buffers[i].append(item)
+
+            # Emit everything the current rung (and finished rungs after it) produced
+            while current < len(rungs) and found < num_results:
+                for item in buffers[current]:
+                    if found >= num_results:
+                        break
+                    start = time.perf_counter()
+                    unique = deduper.add(item)
+                    dedupe_seconds += time.perf_counter() - start
+                    deduped += 1
+                    if unique:
+                        item["Estrategia"] = RUNG_LABELS[rungs[current][0]]
+                        found += 1
+                        yield item
+                buffers[current] = []
+                if not finished[current]:
+                    break
+                current += 1
+    finally:
+        # Enough candidates (or consumer stopped): cancel every rung still running
+        for event in cancelled:
+            event.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+        # Workers dropped before they ran never used (or refunded) their slot
+        for future in reservations:
+            if future.cancelled():
+                scheduler.refund()
+        if deduped:
+            instrumentation.get_metrics().observe("dedupe", dedupe_seconds, deduped)
+
+    if not found and throttled:
+        raise throttled[0]
+
+    logger.info("[Smart] Total: %d unique %s profiles", found, site)
+
+
+def scrape_smart(query, num_results=10, site="LinkedIn", expected_location=None, use_cache=True, backend=None,
+                 use_index=True, query_params=None, ladder=None, speculative=True, **kwargs):
+    """
+    Main search function with fallback strategies.
+    `backend` is any backends.SearchBackend (defaults to live DDGS).
+    `query_params` (the generate_search_query arguments) enables the skills and
+    seniority rungs of the fallback ladder.
+    """
+    return list(iter_scrape_smart(query, num_results=num_results, site=site,
+                                  expected_location=expected_location, use_cache=use_cache, backend=backend,
+                                  use_index=use_index, query_params=query_params, ladder=ladder,
+                                  speculative=speculative, **kwargs))
 
-    print(f"[Search] Got {len(raw)} raw results")
 
-    for item in raw:
-        url = item.get("href", "")
-        title = item.get("title", "")
-        body = item.get("body", "")
-        
-        # Determine if it is a VALID candidate profile
-        is_candidate = False
-        
-        # 1. Check if valid basic URL pattern matches
-        if _is_valid_result(url, site):
-             is_candidate = True
-        
-        # 2. Double check: Ensure it's NOT a job posting
-        if _is_job_posting(url, title, site):
-            is_candidate = False
-            
-        # 3. Document Title Check
-        if "PDF" in site or "Lista" in site:
-            # Filter out non-resume titles
-            bad_titles = ["relatório", "report", "ata de", "diário oficial", "edital", "manual", "preço", "cotação", "boleto", "invoice", "nota fiscal"]
-            if any(bt in title.lower() for bt in bad_titles):
-                is_candidate = False
-
-        # 4. Strict Location Check
-        if is_candidate and expected_location:
-            loc_lower = expected_location.lower().strip()
-            # Check if location is in title or body
-            # We must be careful not to filter out good results if snippet is short
-            # But the user specifically complained about wrong locations, so strict is better.
-            combined_text = (title + " " + body).lower()
-            
-            # Simple check
-            if loc_lower not in combined_text:
-                 # Try to be smart about "sao jose do rio preto" -> "s.j. do rio preto"
-                 # normalization mapping could go here, but for now exact match is safest request
-                 # Maybe allow partial match if location is long?
-                 # No, user wants SPECIFIC city.
-                 is_candidate = False
-            
-        if is_candidate:
-            results.append({
-                "Nome/Titulo": _clean_title(title, site),
-                "Link Perfil": url,
-                "Resumo": body,
-                "Email": _extract_email(body),
-                "Fonte": site
-            })
-
-        if len(results) >= num_results:
-            break
-
-    print(f"[Search] Found {len(results)} {site} profiles")
-    return results
-
-
-def deduplicate_results(results):
-    seen_urls = set()
-    unique = []
-
-    for item in results:
-        link = item.get("Link Perfil", "").lower()
-        if link not in seen_urls:
-            seen_urls.add(link)
-            unique.append(item)
-
-    return unique
-
-
-def scrape_smart(query, num_results=10, site="LinkedIn", expected_location=None, **kwargs):
+def scrape_multi(queries, num_results=10, expected_location=None, max_workers=MAX_PARALLEL_MODES, use_cache=True, backend=None, use_index=True):
     """
-    Main search function with fallback strategies.
+    Runs one search per mode concurrently and merges everything.
+    `queries` is a {mode: query} dict (see generate_queries).
+    Latency is bounded by the slowest mode instead of the sum of all of them.
     """
-    print("=" * 50)
+    if not queries:
+        return []
+    with instrumentation.profile("multi"):
+        return _scrape_multi(queries, num_results, expected_location, max_workers, use_cache, backend, use_index)
 
-    data = search_candidates(query, num_results=num_results, site=site, expected_location=expected_location)
 
-    # Fallback Logic
-    if not data:
-        print(f"[Fallback] No results for {site}. Trying simplified query...")
-        time.sleep(1.5) # Wait a bit to be polite
-        
-        # 1. Remove specific dork patterns
-        simplified = query
-        if "site:" in simplified:
-             # Remove the specific site dork from config
-             for k, v in XRAY_MODES.items():
-                 # Handle cases where base has OR logic
-                 bases = v['base'].replace("(", "").replace(")", "").split(" OR ")
-                 for b in bases:
-                     if b.strip() in simplified:
-                         simplified = simplified.replace(b.strip(), "").strip()
-        
-        # 2. Append a simpler site restriction
-        if site == "LinkedIn":
-            simplified = f"{simplified} LinkedIn perfil"
-        elif site == "Portais de Emprego":
-            simplified = f"{simplified} (site:trabalhabrasil.com.br OR site:infojobs.com.br OR site:vagas.com.br) curriculo"
-        elif site == "PDF/DOCX - Currículos":
-             simplified = f"{simplified} (filetype:pdf OR filetype:docx) curriculo"
-        elif site == "Redes Sociais":
-             simplified = f"{simplified} (site:instagram.com OR site:facebook.com)"
-        elif site == "Listas de RH":
-             simplified = f"{simplified} (filetype:xls OR filetype:csv) lista candidatos"
-             
-        # 3. Remove complex operators that might confuse the engine, but keep quotes for multi-word terms
-        simplified = simplified.replace("intitle:", "")
-        
-        # Only remove quotes if they are single words inside (e.g. "Python"), but complex locations need quotes.
-        # For now, let's just keep the quotes as DDG handles them better than loose words for cities.
-        # specific fix: ensure we don't have empty quotes
-        simplified = simplified.replace('""', "")
-        
-        print(f"[Fallback] Query: {simplified}")
-        
-        if simplified != query:     
-            data = search_candidates(simplified, num_results=num_results, site=site, expected_location=expected_location)
+def _scrape_multi(queries, num_results, expected_location, max_workers, use_cache, backend, use_index):
+
+    workers = max(1, min(max_workers, len(queries)))
+    per_mode = {}
+    throttled = []
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="xray") as pool:
+        futures = {
+            mode: pool.submit(search_candidates, query, num_results=num_results,
+                              site=mode, expected_location=expected_location, use_cache=use_cache, backend=backend, use_index=use_index)
+            for mode, query in queries.items()
+        }
+        for mode, future in futures.items():
+            try:
+                per_mode[mode] = future.result()
+            except Exception as e:
+                logger.error("[Multi][%s] Error: %s", mode, e)
+                per_mode[mode] = []
+                if isinstance(e, ratelimit.SearchThrottledError):
+                    throttled.append(e)
+
+    # Merge in mode order (not completion order) so output is deterministic
+    merged = []
+    for mode in queries:
+        merged.extend(per_mode.get(mode, []))
+
+    data = deduplicate_results(merged)
 
-    data = deduplicate_results(data)
+    # Don't turn "engine is throttling us" into a silent empty result
+    if not data and throttled:
+        raise throttled[0]
 
-    print("=" * 50)
-    print(f">> Total: {len(data)} unique {site} profiles")
+    logger.info("[Multi] Total: %d unique profiles from %d sources", len(data), len(queries))
+
+    return data
+
+
+def iter_scrape_multi(queries, num_results=10, expected_location=None, max_workers=MAX_PARALLEL_MODES, use_cache=True, backend=None, use_index=True):
+    """
+    Streaming variant of scrape_multi: yields unique candidates from any
+    mode as soon as they are accepted (arrival order, not mode order).
+    """
+    if not queries:
+        return
+    with instrumentation.profile("multi"):
+        yield from _iter_multi(queries, num_results, expected_location, max_workers, use_cache, backend, use_index)
+
+
+def _iter_multi(queries, num_results, expected_location, max_workers, use_cache, backend, use_index):
+
+    out = queue.Queue()
+    stop = threading.Event()
+    done = object()
+    throttled = []
+
+    def worker(mode, query):
+        stream = iter_candidates(query, num_results=num_results, site=mode,
+                                 expected_location=expected_location, use_cache=use_cache, backend=backend, use_index=use_index)
+        try:
+            for item in stream:
+                if stop.is_set():
+                    break
+                out.put(item)
+        except Exception as e:
+            logger.error("[Multi][%s] Error: %s", mode, e)
+            if isinstance(e, ratelimit.SearchThrottledError):
+                throttled.append(e)
+        finally:
+            # Not left to the garbage collector: closing runs the search's outcome reporting now
+            stream.close()
+            out.put(done)
+
+    workers = max(1, min(max_workers, len(queries)))
+    deduper = dedupe.ResultDeduper()
+    dedupe_seconds = 0.0
+    deduped = 0
+    found = 0
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="xray") as pool:
+        for mode, query in queries.items():
+            pool.submit(worker, mode, query)
+
+        pending = len(queries)
+        try:
+            while pending:
+                item = out.get()
+                if item is done:
+                    pending -= 1
+                    continue
+                start = time.perf_counter()
+                unique = deduper.add(item)
+                dedupe_seconds += time.perf_counter() - start
+                deduped += 1
+                if unique:
+                    found += 1
+                    yield item
+        finally:
+            # Consumer stopped early: let workers wind down after their current hit
+            stop.set()
+            if deduped:
+                instrumentation.get_metrics().observe("dedupe", dedupe_seconds, deduped)
+
+    if not found and throttled:
+        raise throttled[0]
+
+    logger.info("[Multi] Total: %d unique profiles from %d sources", found, len(queries))
+
+
+def expand_location(location, radius_km, max_cities=MAX_NEARBY_CITIES):
+    """
+    Returns [(city_name, distance_km)] for the location plus its neighbours,
+    nearest first. Unknown locations (or radius 0) are searched as-is; an
+    unknown one logs a warning, since the bundled table is not exhaustive.
+    """
+    nearby = geo.get_index().nearby(location, radius_km, limit=max_cities) if radius_km else []
+    if not nearby:
+        if radius_km:
+            logger.warning("[Geo] '%s' is not in the municipality table (%s): searching it without nearby cities",
+                           location, geo.MUNICIPALITIES_PATH)
+        return [(location, 0.0)]
+    return [(m.name, d) for m, d in nearby]
+
+
+def scrape_nearby(role, location, seniority="", skills="", site="LinkedIn", radius_km=50,
+                  num_results=10, max_cities=MAX_NEARBY_CITIES, max_workers=MAX_PARALLEL_MODES,
+                  use_cache=True, backend=None, use_index=True, **kwargs):
+    """
+    Searches the location and its surrounding municipalities concurrently
+    (one query per city) and merges the results ranked by distance.
+    Extra kwargs are passed to generate_search_query.
+    """
+    cities = expand_location(location, radius_km, max_cities)
+    logger.info("[Geo] Expanding '%s' to %d cities within %s km", location, len(cities), radius_km)
+
+    def run_city(city):
+        query = generate_search_query(role, city, seniority, skills, site=site, **kwargs)
+        return search_candidates(query, num_results=num_results, site=site,
+                                 expected_location=city, use_cache=use_cache, backend=backend, use_index=use_index)
+
+    workers = max(1, min(max_workers, len(cities)))
+    per_city = {}
+    throttled = []
+
+    with instrumentation.profile(f"nearby-{site}"), \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="xray-geo") as pool:
+        futures = {city: pool.submit(run_city, city) for city, _ in cities}
+        for city, future in futures.items():
+            try:
+                per_city[city] = future.result()
+            except Exception as e:
+                logger.error("[Geo][%s] Error: %s", city, e)
+                per_city[city] = []
+                if isinstance(e, ratelimit.SearchThrottledError):
+                    throttled.append(e)
+
+    # Nearest cities first; engine order within a city
+    merged = []
+    for city, distance in cities:
+        for item in per_city.get(city, []):
+            item["Cidade"] = city
+            item["Distancia (km)"] = round(distance, 1)
+            merged.append(item)
+
+    data = deduplicate_results(merged)[:num_results]
+
+    if not data and throttled:
+        raise throttled[0]
+
+    logger.info("[Geo] Total: %d unique %s profiles from %d cities", len(data), site, len(cities))
 
     return data
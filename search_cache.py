@@ -0,0 +1,149 @@
+"""
+Persistent Search Cache - SQLite store for raw search responses.
+Keyed by (query, mode, num_results), with TTL expiry and LRU eviction; the
+scraper passes the canonical query hash (query_ast.cache_key) as the query.
+Survives Streamlit restarts and is shared by every session on the server.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Defaults can be overridden through the environment (e.g. on the server)
+CACHE_PATH = os.environ.get("XRAY_CACHE_PATH", os.path.join(BASE_DIR, ".cache", "search_cache.sqlite3"))
+CACHE_TTL = int(os.environ.get("XRAY_CACHE_TTL", 6 * 60 * 60))  # seconds
+CACHE_MAX_ENTRIES = int(os.environ.get("XRAY_CACHE_MAX_ENTRIES", 2000))
+CACHE_ENABLED = os.environ.get("XRAY_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+
+
+class SearchCache:
+    """
+    Small SQLite-backed cache for raw `{href, title, body}` result lists.
+    Safe to share between threads; one connection guarded by a lock.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, enabled=CACHE_ENABLED):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    query TEXT NOT NULL,
+                    site TEXT NOT NULL,
+                    num_results INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (query, site, num_results)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_accessed ON search_cache (accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, query, site, num_results):
+        """Returns the cached raw list, or None on miss/expiry/bypass."""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT payload, created_at FROM search_cache WHERE query = ? AND site = ? AND num_results = ?",
+                (query, site, int(num_results))
+            ).fetchone()
+
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                if row is not None:
+                    conn.execute(
+                        "DELETE FROM search_cache WHERE query = ? AND site = ? AND num_results = ?",
+                        (query, site, int(num_results))
+                    )
+                    conn.commit()
+                self.misses += 1
+                return None
+
+            # Touch for LRU ordering
+            conn.execute(
+                "UPDATE search_cache SET accessed_at = ? WHERE query = ? AND site = ? AND num_results = ?",
+                (now, query, site, int(num_results))
+            )
+            conn.commit()
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def set(self, query, site, num_results, results):
+        """Stores a raw result list and evicts least-recently-used entries over the cap."""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        payload = json.dumps(list(results), ensure_ascii=False)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache (query, site, num_results, payload, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (query, site, int(num_results), payload, now, now)
+            )
+            if self.max_entries:
+                conn.execute("""
+                    DELETE FROM search_cache WHERE rowid IN (
+                        SELECT rowid FROM search_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_entries,))
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM search_cache")
+            conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            size = self._connect().execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": size,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "enabled": self.enabled,
+        }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache instance (shared across Streamlit sessions)."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = SearchCache()
+    return _default_cache
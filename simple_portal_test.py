@@ -1,7 +1,9 @@
+import argparse
+import backends
+import instrumentation
 from scraper import generate_search_query, search_candidates, XRAY_MODES
-from ddgs import DDGS
 
-def test_portal_query():
+def test_portal_query(output="debug_output.txt"):
     print("Testing Portal Query Generation...")
     role = "Vendedor"
     location = "São José do Rio Preto"
@@ -14,35 +16,34 @@ def test_portal_query():
     # Try searching
     print("\nAttempting Search...")
     try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=20))
-            print(f"Found {len(results)} raw results")
-            
-            with open("debug_output.txt", "w", encoding="utf-8") as f:
-                f.write(f"Query: {query}\n\n")
-                for i, r in enumerate(results):
-                    url = r['href']
-                    title = r['title']
-                    
-                    # Check filtering
-                    from scraper import _is_job_posting, _is_valid_result
-                    is_valid = _is_valid_result(url, site="Portais de Emprego")
-                    is_job_post = _is_job_posting(url, title, site="Portais de Emprego")
-                    
-                    status = "ACCEPTED" if is_valid and not is_job_post else "REJECTED"
-                    reason = []
-                    if not is_valid: reason.append("Invalid URL")
-                    if is_job_post: reason.append("Job Posting")
-                    
-                    log_entry = (
-                        f"[{i+1}] {title}\n"
-                        f"URL: {url}\n"
-                        f"Status: {status} ({', '.join(reason)})\n"
-                        f"{'-'*40}\n"
-                    )
-                    f.write(log_entry)
-                    
-            print("Debug output written to debug_output.txt")
+        results = list(backends.get_default_backend().text(query, max_results=20))
+        print(f"Found {len(results)} raw results")
+        
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(f"Query: {query}\n\n")
+            for i, r in enumerate(results):
+                url = r['href']
+                title = r['title']
+                
+                # Check filtering
+                from scraper import _is_job_posting, _is_valid_result
+                is_valid = _is_valid_result(url, site="Portais de Emprego")
+                is_job_post = _is_job_posting(url, title, site="Portais de Emprego")
+                
+                status = "ACCEPTED" if is_valid and not is_job_post else "REJECTED"
+                reason = []
+                if not is_valid: reason.append("Invalid URL")
+                if is_job_post: reason.append("Job Posting")
+                
+                log_entry = (
+                    f"[{i+1}] {title}\n"
+                    f"URL: {url}\n"
+                    f"Status: {status} ({', '.join(reason)})\n"
+                    f"{'-'*40}\n"
+                )
+                f.write(log_entry)
+                
+        print(f"Debug output written to {output}")
                 
     except Exception as e:
         print(f"Search Failed: {e}")
@@ -51,4 +52,10 @@ def test_portal_query():
         print(f"Search Failed: {e}")
 
 if __name__ == "__main__":
-    test_portal_query()
+    instrumentation.configure_logging()
+    parser = backends.add_backend_args(argparse.ArgumentParser(description="Portal filter debug capture"))
+    parser.add_argument("--output", default="debug_output.txt")
+    args = parser.parse_args()
+    backends.backend_from_args(args)
+
+    test_portal_query(args.output)
@@ -0,0 +1,314 @@
+"""
+Spreadsheet Ingestion - turns CSV/XLSX candidate lists found by the
+"Listas de RH" mode into one result per person.
+Files are streamed to a spooled temporary file (memory up to SPOOL_BYTES, disk
+beyond), CSV is read in chunks of rows and XLSX through openpyxl's read-only
+iterator, so sheet size never decides memory use. Name/email/phone/role/city
+columns are found from the header row (or, for email and phone, from the
+values), and at most MAX_ROWS_PER_FILE people are taken per file.
+"""
+import csv
+import io
+import itertools
+import logging
+import tempfile
+import time
+
+import classifier
+import contacts
+import dedupe
+import enrichment
+import geo
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+MAX_SHEET_BYTES = 50 * 1024 * 1024
+SPOOL_BYTES = 1024 * 1024
+CHUNK_ROWS = 1000
+# Rows scanned for the header
+HEADER_SCAN_ROWS = 20
+MAX_ROWS_PER_FILE = 500
+SHEET_EXTENSIONS = (".csv", ".xlsx", ".xls")
+CSV_DELIMITERS = [",", ";", "\t", "|"]
+
+# "Planilha" values besides the shared enrichment.STATUS_* ones
+STATUS_NO_COLUMNS = "Sem colunas de contato"
+STATUS_UNSUPPORTED = "Formato não suportado"
+
+# Normalized header (geo.normalize_name) prefixes per field
+HEADER_SYNONYMS = {
+    "name": ["nome", "candidato", "name", "colaborador", "profissional"],
+    "email": ["email", "e mail", "correio eletronico", "mail"],
+    "phone": ["telefone", "celular", "fone", "whatsapp", "tel", "contato", "phone"],
+    "role": ["cargo", "funcao", "vaga", "profissao", "ocupacao", "area", "role"],
+    "city": ["cidade", "municipio", "localidade", "local", "city"],
+    "link": ["linkedin", "perfil", "url", "link"],
+}
+# Share of sampled values that must look like an email/phone to adopt a headerless column
+VALUE_MATCH_RATIO = 0.6
+
+
+def is_spreadsheet(item):
+    path = (item.get("Link Perfil") or "").lower().split("?", 1)[0]
+    return path.endswith(SHEET_EXTENSIONS)
+
+
+def _field_for(header):
+    key = geo.normalize_name(str(header or ""))
+    if not key:
+        return None
+    for field, prefixes in HEADER_SYNONYMS.items():
+        if any(key == p or key.startswith(p + " ") for p in prefixes):
+            return field
+    return None
+
+
+def detect_columns(rows):
+    """
+    ({field: column index}, header row position) from the first rows.
+    The header is the first row naming at least two known fields; without one,
+    email/phone columns are recognized by their values.
+    """
+    for position, row in enumerate(rows[:HEADER_SCAN_ROWS]):
+        columns = {}
+        for i, cell in enumerate(row):
+            field = _field_for(cell)
+            if field and field not in columns:
+                columns[field] = i
+        if len(columns) >= 2:
+            return columns, position
+
+    columns = {}
+    width = max((len(row) for row in rows), default=0)
+    for i in range(width):
+        values = [str(row[i]).strip() for row in rows if i < len(row) and row[i] not in (None, "")]
+        if not values:
+            continue
+        for field, pattern in (("email", contacts.EMAIL_RE), ("phone", contacts.PHONE_RE)):
+            if field not in columns and sum(bool(pattern.search(v)) for v in values) >= VALUE_MATCH_RATIO * len(values):
+                columns[field] = i
+    return columns, -1
+
+
+# --- Row sources (bounded memory) ---
+
+def _csv_rows(file):
+    """Rows of a CSV file object (bytes), decoding and sniffing the delimiter from a sample."""
+    sample = file.read(64 * 1024)
+    file.seek(0)
+    # Cut at the last newline so a multi-byte character is never split
+    head = sample[:sample.rfind(b"\n") + 1] or sample
+    try:
+        head.decode("utf-8")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "cp1252"
+    # csv.Sniffer gives up on the title lines HR lists often start with:
+    # pick the separator present on the most sample lines instead
+    lines = head.decode(encoding, "replace").splitlines()[:50]
+    delimiter = max(CSV_DELIMITERS, key=lambda d: (sum(d in line for line in lines), sum(line.count(d) for line in lines)))
+    text = io.TextIOWrapper(file, encoding=encoding, errors="replace", newline="")
+    try:
+        yield from csv.reader(text, delimiter=delimiter)
+    finally:
+        text.detach()
+
+
+def _xlsx_rows(file):
+    try:
+        import openpyxl
+    except ImportError:
+        raise ValueError(STATUS_UNSUPPORTED)
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield from sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _xls_rows(file):
+    try:
+        import xlrd
+    except ImportError:
+        raise ValueError(STATUS_UNSUPPORTED)
+    # .xls tops out at 65k rows, and xlrd needs the whole file anyway
+    book = xlrd.open_workbook(file_contents=file.read(), on_demand=True)
+    for index in range(book.nsheets):
+        sheet = book.sheet_by_index(index)
+        for r in range(sheet.nrows):
+            yield sheet.row_values(r)
+        book.unload_sheet(index)
+
+
+def iter_rows(file):
+    """Rows of a CSV, XLSX or XLS file object, detected from its first bytes."""
+    magic = file.read(4)
+    file.seek(0)
+    if magic == b"PK\x03\x04":
+        return _xlsx_rows(file)
+    if magic == b"\xd0\xcf\x11\xe0":
+        return _xls_rows(file)
+    return _csv_rows(file)
+
+
+def _cell(row, columns, field):
+    i = columns.get(field)
+    if i is None or i >= len(row) or row[i] is None:
+        return ""
+    value = row[i]
+    # Phone numbers typed into Excel come back as floats
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _person(row, columns, url, number, source):
+    name = _cell(row, columns, "name")
+    email = contacts.first_email(_cell(row, columns, "email")) or ""
+    # A cell may hold several numbers ("(17) 99111-2222 / 3222-1111"); all are kept, in E.164
+    phones = contacts.extract(_cell(row, columns, "phone")).phones
+    if not (name or email):
+        return None
+
+    link = _cell(row, columns, "link")
+    if not link.lower().startswith(("http://", "https://")):
+        link = f"{url}{'&' if '?' in url else '?'}linha={number}"
+    role = _cell(row, columns, "role")
+    city = _cell(row, columns, "city")
+    person = {
+        "Nome/Titulo": name or email,
+        "Link Perfil": link,
+        "Resumo": " | ".join(part for part in (role, city) if part),
+        "Email": email or "N/A",
+        "Fonte": source,
+        "Origem": url,
+    }
+    if phones:
+        person["Telefone"] = ", ".join(phones)
+    return person
+
+
+def read_people(file, url, expected_location=None, source="Listas de RH", max_rows=MAX_ROWS_PER_FILE):
+    """
+    (people, status) from a spreadsheet file object. Rows are consumed in
+    chunks of CHUNK_ROWS; rows whose city column names another place are skipped.
+    """
+    rows = iter_rows(file)
+    first = [list(row) for row in itertools.islice(rows, CHUNK_ROWS)]
+    columns, header = detect_columns(first)
+    if "name" not in columns and "email" not in columns:
+        return [], STATUS_NO_COLUMNS
+
+    people = []
+    number = 0
+    chunk = first
+    while chunk and len(people) < max_rows:
+        for row in chunk:
+            number += 1
+            if number <= header + 1:
+                continue
+            person = _person(row, columns, url, number, source)
+            if person is None:
+                continue
+            city = _cell(row, columns, "city")
+            if expected_location and city and not classifier.location_matches(expected_location, city):
+                continue
+            people.append(person)
+            if len(people) >= max_rows:
+                break
+        chunk = list(itertools.islice(rows, CHUNK_ROWS))
+    close = getattr(rows, "close", None)
+    if close:
+        close()
+    return people, enrichment.STATUS_OK
+
+
+def read_spreadsheet(url, fetcher, expected_location=None, source="Listas de RH", until=None):
+    """Streams one file to a spooled temp file and reads it. Returns (people, status)."""
+    start = time.perf_counter()
+    try:
+        if not fetcher.allowed(url, until):
+            return [], enrichment.STATUS_ROBOTS
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as spool:
+            try:
+                result = fetcher.fetch(url, max_bytes=MAX_SHEET_BYTES, sink=spool, until=until)
+            except enrichment.HostBusyError as e:
+                logger.debug("[Sheets] %s: %s", url, e)
+                return [], enrichment.STATUS_BUSY
+            except enrichment.FetchError as e:
+                logger.debug("[Sheets] %s: %s", url, e)
+                return [], enrichment.STATUS_ERROR
+            if result.status >= 400:
+                return [], f"{enrichment.STATUS_ERROR} HTTP {result.status}"
+            if result.truncated:
+                return [], enrichment.STATUS_TOO_LARGE
+            spool.seek(0)
+            try:
+                return read_people(spool, url, expected_location, source)
+            except ValueError as e:
+                return [], str(e) if str(e) == STATUS_UNSUPPORTED else enrichment.STATUS_ERROR
+            except Exception as e:
+                # Corrupt workbooks raise anything from zipfile/openpyxl/csv
+                logger.warning("[Sheets] Could not read %s: %s", url, e)
+                return [], enrichment.STATUS_ERROR
+    finally:
+        instrumentation.get_metrics().observe("spreadsheet_read", time.perf_counter() - start)
+
+
+def iter_ingest(items, expected_location=None, fetcher=None, workers=enrichment.FILE_WORKERS,
+                deadline=enrichment.FILE_DEADLINE):
+    """
+    Reads every spreadsheet result, yielding (done, total, item, people) as each
+    file finishes. The item gets "Planilha" (status) and "Linhas" (people found).
+    """
+    items = [item for item in items if is_spreadsheet(item)]
+    total = len(items)
+    if not total:
+        return
+
+    own_fetcher = fetcher is None
+    fetcher = fetcher or enrichment.Fetcher(timeout=15.0)
+
+    sources = {item["Link Perfil"]: item.get("Fonte") or "Listas de RH" for item in items}
+    until = time.monotonic() + deadline
+
+    def task(url):
+        people, status = read_spreadsheet(url, fetcher, expected_location, sources[url], until)
+        return {"Planilha": status, "Linhas": len(people), "_people": people}
+
+    completed = enrichment.iter_completed(items, task, workers, deadline,
+                                          {"Planilha": enrichment.STATUS_ERROR, "Linhas": 0},
+                                          {"Planilha": enrichment.STATUS_TIMEOUT, "Linhas": 0}, name="sheets")
+    try:
+        for done, (item, fields) in enumerate(completed, 1):
+            people = fields.pop("_people", [])
+            item.update(fields)
+            instrumentation.get_metrics().inc("spreadsheet_rows_total", len(people))
+            yield done, total, item, people
+    finally:
+        completed.close()
+        if own_fetcher:
+            fetcher.close()
+
+
+def expand(items, people_by_link):
+    """
+    Replaces each spreadsheet hit that yielded people by those people (in
+    place of the hit), then drops duplicate links across the whole result set.
+    Rows are matched by link only: their "role | city" summary is shared by
+    many different people.
+    """
+    merged = []
+    for item in items:
+        people = people_by_link.get(item.get("Link Perfil"))
+        merged.extend(people if people else [item])
+    return dedupe.deduplicate(merged, near_duplicates=False)
+
+
+def ingest(items, expected_location=None, **kwargs):
+    """Blocking form: returns the expanded result list."""
+    people_by_link = {item["Link Perfil"]: people
+                      for _, _, item, people in iter_ingest(items, expected_location, **kwargs)}
+    return expand(items, people_by_link)
@@ -0,0 +1,98 @@
+import asyncio
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import api
+import backends
+
+
+RAW = [
+    {"href": "https://www.linkedin.com/in/joao", "title": "Joao Silva - LinkedIn", "body": "Dev em Curitiba"},
+    {"href": "https://www.linkedin.com/in/maria", "title": "Maria - LinkedIn", "body": "Curitiba"},
+]
+
+
+@pytest.fixture
+def server():
+    loop = asyncio.new_event_loop()
+    srv = api.ApiServer(port=0, workers=2, max_pending=4, use_cache=False, use_index=False,
+                        backend=backends.ReplayBackend(RAW, fallback_all=True, latency=0.05))
+    port = loop.run_until_complete(srv.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield srv, port
+    asyncio.run_coroutine_threadsafe(srv.close(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+def _request(port, method, path, payload=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    body = json.dumps(payload) if payload is not None else None
+    conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    data = json.loads(response.read())
+    conn.close()
+    return response.status, data, response
+
+
+def test_health_query_and_sync_search(server):
+    _, port = server
+    assert _request(port, "GET", "/health")[:2] == (200, {"status": "ok"})
+
+    status, data, _ = _request(port, "POST", "/query", {"role": "Dev", "location": "Curitiba"})
+    assert status == 200 and data["queries"]["LinkedIn"].startswith("site:linkedin.com/in")
+
+    status, data, _ = _request(port, "POST", "/search", {"role": "Dev", "location": "Curitiba", "num_results": 5})
+    assert status == 200 and data["count"] == 2
+    assert [r["Link Perfil"] for r in data["results"]] == [r["href"] for r in RAW]
+
+    assert _request(port, "POST", "/search", {"location": "Curitiba"})[0] == 400
+    assert _request(port, "GET", "/nope")[0] == 404
+
+
+def test_job_poll(server):
+    _, port = server
+    status, data, _ = _request(port, "POST", "/jobs", {"role": "Dev", "location": "Curitiba"})
+    assert status == 202
+    for _ in range(100):
+        status, record, _ = _request(port, "GET", data["poll"])
+        if record["status"] == "done":
+            break
+        time.sleep(0.02)
+    assert record["status"] == "done" and record["count"] == 2
+    assert _request(port, "GET", "/metrics")[1]["jobs"] == {"done": 1}
+
+
+def test_back_pressure_when_queue_full(server):
+    srv, port = server
+    srv.pending = srv.max_pending
+    status, data, response = _request(port, "POST", "/search", {"role": "Dev", "location": "Curitiba"})
+    assert status == 503 and response.getheader("Retry-After") == "5"
+    srv.pending = 0
+
+
+def _raw_request(port, head):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(head.encode("latin-1"))
+        return sock.recv(4096).decode("latin-1")
+
+
+def test_bad_content_length_is_rejected(server):
+    _, port = server
+    for length in ("abc", "-5"):
+        response = _raw_request(port, f"POST /search HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}")
+        assert response.startswith("HTTP/1.1 400 ") and "Invalid Content-Length" in response
+
+
+def test_non_text_params_are_rejected(server):
+    _, port = server
+    status, data, _ = _request(port, "POST", "/search", {"role": 5, "location": "Curitiba"})
+    assert status == 400 and "role" in data["error"]
+    assert _request(port, "POST", "/query", {"role": "Dev", "location": ["Curitiba"]})[0] == 400
+    assert _request(port, "POST", "/jobs", {"role": "Dev", "location": "Curitiba", "num_results": [5]})[0] == 400
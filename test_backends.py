@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+import urllib.parse
+
+import pytest
+
+import backends
+import ratelimit
+import scraper
+
+
+RAW = [
+    {"href": "https://www.linkedin.com/in/joao", "title": "Joao Silva - LinkedIn", "body": "Dev em Sao Paulo"},
+    {"href": "https://www.linkedin.com/jobs/view/1", "title": "Vaga de Dev", "body": "Sao Paulo"},
+    {"href": "https://www.linkedin.com/in/maria", "title": "Maria - LinkedIn", "body": "Sao Paulo"},
+]
+
+
+def test_record_then_replay(tmp_path):
+    capture = tmp_path / "capture.jsonl"
+    source = backends.ReplayBackend([dict(r, query="q") for r in RAW])
+    recorder = backends.RecordingBackend(source, str(capture))
+    assert list(recorder.text("q", max_results=10)) == RAW
+
+    replay = backends.ReplayBackend.from_jsonl(str(capture))
+    assert list(replay.text("q", max_results=2)) == RAW[:2]
+    assert list(replay.text("unknown")) == []
+
+
+def test_scrape_smart_with_replay_backend():
+    replay = backends.ReplayBackend([dict(r, query="q") for r in RAW])
+    data = scraper.scrape_smart("q", num_results=5, site="LinkedIn", expected_location="Sao Paulo", backend=replay)
+    assert [d["Link Perfil"] for d in data] == [RAW[0]["href"], RAW[2]["href"]]
+
+
+def test_replay_error_injection():
+    replay = backends.ReplayBackend([dict(r, query="q") for r in RAW], error_rate=1.0)
+    with pytest.raises(backends.ReplayError):
+        list(replay.text("q"))
+    # The pipeline swallows backend errors like it does for DDGS
+    assert scraper.search_candidates("q", backend=replay) == []
+
+
+def _searxng_search(handler):
+    params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(handler.path).query))
+    handler.server.queries.append(params["q"])
+    results = [] if params.get("pageno") != "1" else [
+        {"url": r["href"], "title": r["title"], "content": r["body"]} for r in RAW
+    ]
+    handler.send(json.dumps({"results": results}).encode("utf-8"), "application/json")
+
+
+@pytest.fixture
+def searxng(http_stub):
+    server = http_stub({"/search": _searxng_search})
+    server.queries = []
+    return server
+
+
+@pytest.fixture
+def searxng_url(searxng):
+    return searxng.url
+
+
+def test_searxng_backend_and_dialect(searxng):
+    backend = backends.get_backend(f"searxng:{searxng.url}")
+    query = 'site:linkedin.com/in intitle:"Dev" "Sao Paulo" (inurl:perfil OR inurl:cv)'
+    assert [r["href"] for r in backend.text(query)] == [r["href"] for r in RAW]
+    assert searxng.queries[-1] == 'site:linkedin.com/in "Dev" "Sao Paulo"'
+
+
+def test_federation_hedges_slow_engine(searxng_url):
+    slow = backends.ReplayBackend([dict(r, query="q") for r in RAW], latency=2.0)
+    federated = backends.FederatedBackend([slow, backends.SearxngBackend(searxng_url)], hedge_after=0.05)
+
+    start = time.monotonic()
+    data = scraper.search_candidates("q", num_results=2, site="LinkedIn", expected_location="Sao Paulo",
+                                     use_cache=False, backend=federated, use_index=False)
+    assert time.monotonic() - start < 1.0
+    assert [d["Link Perfil"] for d in data] == [RAW[0]["href"], RAW[2]["href"]]
+    assert federated.metrics() == {"searches": 1, "hedged": 1, "wins": {"searxng": 1}}
+
+
+def test_federation_falls_through_on_error():
+    failing = backends.ReplayBackend([], error_rate=1.0)
+    replay = backends.ReplayBackend([dict(r, query="q") for r in RAW])
+    federated = backends.FederatedBackend([failing, replay], hedge_after=5)
+    assert [r["href"] for r in federated.text("q")] == [r["href"] for r in RAW]
+
+    with pytest.raises(backends.ReplayError):
+        list(backends.FederatedBackend([backends.ReplayBackend([], error_rate=1.0)]).text("q"))
+
+
+class _TrackedBackend(backends.ReplayBackend):
+    def __init__(self, name, *args, **kwargs):
+        super().__init__(*args, rate_limited=True, **kwargs)
+        self.name = name
+        self.closed = threading.Event()
+
+    def text(self, query, max_results=10):
+        try:
+            yield from super().text(query, max_results=max_results)
+        finally:
+            self.closed.set()
+
+
+def test_federation_takes_a_slot_per_hedged_engine_and_closes_streams():
+    records = [dict(r, query="q") for r in RAW]
+    sched = ratelimit.SearchScheduler(rate=0.001, burst=2, max_wait=1, clock=lambda: 0.0)
+    ratelimit.set_scheduler(sched)
+    try:
+        slow = _TrackedBackend("slow", records, latency=0.3, item_latency=0.3)
+        fast = _TrackedBackend("fast", records)
+        federated = backends.FederatedBackend([slow, fast], hedge_after=0.05)
+        data = scraper.search_candidates("q", num_results=1, site="LinkedIn", expected_location="Sao Paulo",
+                                         use_cache=False, backend=federated, use_index=False)
+        assert len(data) == 1 and federated.metrics()["hedged"] == 1
+        # One slot for the caller (first engine) and one for the hedge
+        assert sched.metrics()["calls"] == 2
+        assert slow.closed.wait(2) and fast.closed.wait(2)
+
+        # Bucket empty: the hedge is skipped rather than fired outside the scheduler
+        blocked = _TrackedBackend("blocked", records)
+        federated = backends.FederatedBackend([_TrackedBackend("first", records, latency=0.2), blocked],
+                                              hedge_after=0.05)
+        assert [r["href"] for r in federated.text("q")] == [r["href"] for r in RAW]
+        assert federated.metrics()["hedged"] == 0 and not blocked.closed.is_set()
+    finally:
+        ratelimit.set_scheduler(None)
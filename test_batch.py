@@ -0,0 +1,53 @@
+import csv
+import json
+
+import backends
+import batch
+
+
+RAW = [
+    {"href": "https://www.linkedin.com/in/joao", "title": "Joao Silva - LinkedIn", "body": "Dev em São José do Rio Preto"},
+    {"href": "https://www.linkedin.com/in/maria", "title": "Maria - LinkedIn", "body": "Curitiba"},
+]
+
+
+def _write_jobs(path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["role", "location", "skills", "num_results"])
+        writer.writeheader()
+        writer.writerow({"role": "Desenvolvedor", "location": "São José do Rio Preto", "skills": "Python", "num_results": 5})
+        writer.writerow({"role": "Analista", "location": "Curitiba", "skills": "", "num_results": ""})
+
+
+def test_read_jobs_defaults(tmp_path):
+    jobs_path = tmp_path / "jobs.csv"
+    _write_jobs(jobs_path)
+    jobs = batch.read_jobs(str(jobs_path))
+    assert [j["mode"] for j in jobs] == ["LinkedIn", "LinkedIn"]
+    assert [j["num_results"] for j in jobs] == [5, batch.DEFAULT_NUM_RESULTS]
+    assert jobs[0]["id"] != jobs[1]["id"]
+    assert batch.read_jobs(str(jobs_path))[0]["id"] == jobs[0]["id"]
+
+
+def test_run_batch_streams_and_resumes(tmp_path):
+    jobs_path, out, checkpoint = tmp_path / "jobs.csv", tmp_path / "out.jsonl", tmp_path / "out.ckpt"
+    _write_jobs(jobs_path)
+    jobs = batch.read_jobs(str(jobs_path))
+    replay = backends.ReplayBackend(RAW, fallback_all=True)
+
+    sink = batch.open_sink(str(out))
+    summary = batch.run_batch(jobs[:1], sink, checkpoint=str(checkpoint), workers=2, backend=replay)
+    sink.close()
+    assert summary == {"done": 1, "skipped": 0, "failed": 0, "results": 1}
+
+    # Second run picks up only the remaining job and appends
+    sink = batch.open_sink(str(out), append=True)
+    summary = batch.run_batch(jobs, sink, checkpoint=str(checkpoint), workers=2, backend=replay)
+    sink.close()
+    assert summary["skipped"] == 1 and summary["done"] == 1
+
+    rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [(r["job_id"], r["Link Perfil"]) for r in rows] == [
+        (jobs[0]["id"], RAW[0]["href"]),
+        (jobs[1]["id"], RAW[1]["href"]),
+    ]
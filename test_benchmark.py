@@ -0,0 +1,10 @@
+import benchmark
+
+
+def test_benchmark_smoke(tmp_path):
+    results = benchmark.run(sizes=[200], micro_number=10)
+    assert set(results["micro"]) >= {"generate_search_query", "_is_valid_result", "deduplicate_results[10k]"}
+    assert results["end_to_end"]["200"]["accepted"] > 0
+
+    report = benchmark.compare(results, results)
+    assert all(change == 0 for *_, change in report)
@@ -0,0 +1,61 @@
+import backends
+import candidate_index
+import scraper
+
+
+QUERY = 'site:linkedin.com/in intitle:"Desenvolvedor Python" "São José do Rio Preto"'
+
+RAW = [
+    {"href": "https://br.linkedin.com/in/joao?trk=x", "title": "Joao Silva - Desenvolvedor Python - LinkedIn",
+     "body": "Desenvolvedor Python em São José do Rio Preto"},
+    {"href": "https://www.linkedin.com/in/maria", "title": "Maria Souza - Desenvolvedor Python - LinkedIn",
+     "body": "São José do Rio Preto, SP"},
+]
+
+
+def _item(url, title, summary, source="LinkedIn"):
+    return {"Nome/Titulo": title, "Link Perfil": url, "Resumo": summary, "Email": "N/A", "Fonte": source}
+
+
+def test_fts_query_from_search():
+    assert candidate_index.fts_query_from_search(QUERY) == '"Desenvolvedor Python" AND "São José do Rio Preto"'
+    query = 'site:github.com ("Python" OR "Django") "Recife" -intitle:"vaga" filetype:pdf'
+    assert candidate_index.fts_query_from_search(query) == '("Python" OR "Django") AND "Recife"'
+    assert candidate_index.fts_query_from_search("site:linkedin.com/in") is None
+
+
+def test_upsert_status_and_accent_insensitive_search():
+    index = candidate_index.CandidateIndex(":memory:")
+    item = _item("https://www.linkedin.com/in/joao/", "Joao Silva - Desenvolvedor Python",
+                 "Desenvolvedor Python em São José do Rio Preto")
+    assert index.upsert(item, QUERY) == candidate_index.STATUS_NEW
+    # Same person through another URL spelling
+    item["Link Perfil"] = "https://br.linkedin.com/in/joao?trk=public"
+    assert index.upsert(item, QUERY) == candidate_index.STATUS_KNOWN
+
+    found = index.search('"desenvolvedor python" "sao jose do rio preto"', site="LinkedIn")
+    assert [r["Nome/Titulo"] for r in found] == ["Joao Silva - Desenvolvedor Python"]
+    assert found[0]["Status"] == candidate_index.STATUS_KNOWN
+    assert index.search(QUERY, site="GitHub") == []
+    assert index.stats()["candidates"] == 1
+
+
+def test_iter_candidates_answers_locally_first():
+    index = candidate_index.CandidateIndex(":memory:")
+    replay = backends.ReplayBackend([dict(r, query=QUERY) for r in RAW])
+
+    first = list(scraper.iter_candidates(QUERY, num_results=5, expected_location="São José do Rio Preto",
+                                         backend=replay, index=index))
+    assert [r["Status"] for r in first] == ["Novo", "Novo"]
+
+    # Known profiles come back from the index, without duplicates from the network
+    second = list(scraper.iter_candidates(QUERY, num_results=5, expected_location="São José do Rio Preto",
+                                          backend=replay, index=index))
+    assert len(second) == 2
+    assert {r["Status"] for r in second} == {"Conhecido"}
+
+    # Enough local matches: the backend is not called at all
+    failing = backends.ReplayBackend([], error_rate=1.0)
+    third = list(scraper.iter_candidates(QUERY, num_results=2, expected_location="São José do Rio Preto",
+                                         backend=failing, index=index))
+    assert len(third) == 2
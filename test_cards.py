@@ -0,0 +1,24 @@
+import cards
+
+
+def test_card_values_are_escaped():
+    item = {
+        "Nome/Titulo": "<script>alert(1)</script> Joao",
+        "Link Perfil": 'javascript:alert("x")',
+        "Resumo": "Dev & Ops <b>",
+        "Fonte": "LinkedIn",
+    }
+    html = cards.card_html(item)
+    assert "<script>" not in html
+    assert "&lt;script&gt;alert(1)&lt;/script&gt; Joao" in html
+    assert 'href="#"' in html
+    assert "Dev &amp; Ops &lt;b&gt;" in html
+
+
+def test_single_document_with_every_card():
+    items = [{"Nome/Titulo": f"Pessoa {i}", "Link Perfil": f"https://www.linkedin.com/in/p{i}"} for i in range(57)]
+    page = cards.render_cards_html(items, page_size=25)
+    assert page.count('class="candidate-card"') == 57
+    assert '<option value="25" selected>' in page
+    assert cards.frame_height(57, 25) == cards.CONTROLS_HEIGHT + 25 * cards.CARD_HEIGHT
+    assert cards.frame_height(0) == cards.CONTROLS_HEIGHT + cards.CARD_HEIGHT
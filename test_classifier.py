@@ -0,0 +1,33 @@
+import classifier
+
+
+def test_classify_batch_reasons():
+    raw = [
+        {"href": "https://www.linkedin.com/in/joao", "title": "Joao Silva - LinkedIn", "body": "Dev em Sao Paulo"},
+        {"href": "https://www.google.com", "title": "Google", "body": ""},
+        {"href": "https://www.linkedin.com/jobs/view/123", "title": "Vaga de Dev", "body": ""},
+        {"href": "https://www.linkedin.com/in/maria", "title": "Maria - LinkedIn", "body": "Curitiba"},
+    ]
+    labels = classifier.classify(raw, site="LinkedIn", expected_location="Sao Paulo")
+    assert labels == [
+        (True, classifier.ACCEPTED),
+        (False, classifier.INVALID_URL),
+        (False, classifier.INVALID_URL),
+        (False, classifier.WRONG_LOCATION),
+    ]
+
+
+def test_portal_rules_from_debug_output():
+    site = "Portais de Emprego"
+    assert classifier.classify_one("https://www.infojobs.com.br/vagas-de-vendedor.aspx", "Vagas de Emprego de Vendedor - Infojobs", site=site) == classifier.INVALID_URL
+    assert classifier.classify_one("https://profissoes.vagas.com.br/curriculo-de-vendedor/", "Como criar currículo de vendedor", site=site) == classifier.INVALID_URL
+    assert classifier.classify_one("https://www.vagas.com.br/perfil-de/maria-123", "Maria", site=site) == classifier.ACCEPTED
+    assert classifier.classify_one("https://www.bne.com.br/vip/jose", "Jose", site=site) == classifier.ACCEPTED
+    assert classifier.classify_one("https://www.catho.com.br/vagas/vendedor", "Vendedor", site=site) == classifier.INVALID_URL
+
+
+def test_document_title_rules():
+    site = "PDF/DOCX - Currículos"
+    assert classifier.classify_one("https://x.org/cv-joao.pdf", "Currículo Joao", site=site) == classifier.ACCEPTED
+    assert classifier.classify_one("https://x.org/rel.pdf", "Relatório de Gestão", site=site) == classifier.BAD_TITLE
+    assert classifier.classify_one("https://x.org/page.html", "Currículo Joao", site=site) == classifier.INVALID_URL
@@ -0,0 +1,58 @@
+import pytest
+
+import backends
+import contacts
+import scraper
+
+TEXTS = [
+    "Ana Souza - Dev | ana.souza [at] Gmail [dot] com, WhatsApp: (17) 99123-4567, fixo 017 3222-1111",
+    "joao arroba empresa ponto com ponto br / tel +55 11 3456-7890 / wa.me/5521987654321",
+    "Trabalha at Google dot com. CPF 123.456.789-00, logo@2x.png, linkedin.com/in/Bia%C3%A7a-Dev",
+    "",
+]
+
+
+def test_extract_normalizes():
+    ana, joao, noise, empty = (contacts.extract(t) for t in TEXTS)
+    assert ana.emails == ["ana.souza@gmail.com"]
+    assert ana.phones == ["+5517991234567", "+551732221111"]
+    assert ana.whatsapp == ["+5517991234567"]
+    assert joao.emails == ["joao@empresa.com.br"]
+    assert joao.phones == ["+551134567890"] and joao.whatsapp == ["+5521987654321"]
+    assert noise.emails == [] and noise.phones == [] and noise.linkedin == ["biaça-dev"]
+    assert empty == contacts.Contacts([], [], [], [])
+    assert contacts.extract(float("nan"), float("nan")) == empty
+
+
+def test_normalize_phone():
+    assert contacts.normalize_phone("0 15 17 99123 4567") == "+5517991234567"
+    assert contacts.normalize_phone("5517991234567") == "+5517991234567"
+    assert contacts.normalize_phone("(17) 1234-5678") is None
+    assert contacts.normalize_phone("9123-4567") is None
+
+
+def test_search_candidates_fills_contacts():
+    raw = [{"query": "q", "href": "https://br.linkedin.com/in/Ana-Souza", "title": "Ana Souza - Dev | LinkedIn",
+            "body": "Contato: ANA [at] example [dot] com - (17) 99123-4567"}]
+    [item] = scraper.search_candidates("q", use_cache=False, use_index=False, backend=backends.ReplayBackend(raw))
+    assert item["Email"] == "ana@example.com"
+    assert item["Telefone"] == "+5517991234567"
+    assert item["LinkedIn"] == "ana-souza"
+    assert "WhatsApp" not in item
+
+
+def test_extract_frame_matches_extract():
+    pd = pytest.importorskip("pandas")
+    frame = pd.DataFrame({"Nome/Titulo": ["Ana", "João", None, "Vazio"], "Resumo": TEXTS,
+                          "Link Perfil": ["https://www.linkedin.com/in/ana", "", "", ""]})
+    found = contacts.extract_frame(frame)
+    for row, text, link in zip(found.itertuples(index=False, name=None), TEXTS, frame["Link Perfil"]):
+        assert contacts.Contacts(*row) == contacts.extract(text, link or "")
+
+
+def test_phones_from_every_source_share_one_field():
+    item = contacts.apply({"Email": "N/A"}, contacts.extract("Fone (17) 99123-4567"))
+    # e.g. the same number from a résumé plus another from the profile page
+    contacts.merge_phones(item, ["+5517991234567", "+551132221111"])
+    assert item["Telefone"] == "+5517991234567, +551132221111"
+    assert "Telefones" not in item
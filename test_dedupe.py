@@ -0,0 +1,46 @@
+import dedupe
+import scraper
+
+
+def test_canonicalize_linkedin_variants():
+    variants = [
+        "https://br.linkedin.com/in/joao-silva",
+        "https://www.linkedin.com/in/joao-silva/",
+        "https://linkedin.com/in/Joao-Silva?trk=public_profile&originalSubdomain=br",
+        "https://duckduckgo.com/l/?uddg=https%3A%2F%2Fbr.linkedin.com%2Fin%2Fjoao-silva%2F",
+    ]
+    assert {dedupe.canonicalize_url(v) for v in variants} == {"https://linkedin.com/in/joao-silva"}
+
+
+def test_unwrap_bing_aclick_from_debug_output():
+    url = ("https://www.bing.com/aclick?ld=e8Ov&u=aHR0cHMlM2ElMmYlMmZ3d3cuam9ic2Vla2VyLmNvbSUyZnB0JTNmdGl0bGUlM2RD"
+           "cmllJTJidW0lMmJDdXJyJWMzJWFkY3VsbyUyYmRlJTJiVmVuZGVkb3I&rlid=1")
+    assert dedupe.unwrap_redirect(url).startswith("https://www.jobseeker.com/pt?title=")
+
+
+def test_near_duplicates_collapse_across_sources():
+    snippet = "Vendedor com 10 anos de experiência em varejo e atendimento em São José do Rio Preto"
+    results = [
+        {"Nome/Titulo": "Joao Silva - Vendedor", "Resumo": snippet, "Link Perfil": "https://linkedin.com/in/joao", "Fonte": "LinkedIn"},
+        {"Nome/Titulo": "Joao Silva - Vendedor", "Resumo": snippet, "Link Perfil": "https://instagram.com/joao.vendas", "Fonte": "Redes Sociais"},
+        {"Nome/Titulo": "Maria Souza - Analista", "Resumo": "Analista de dados com Python e SQL em Campinas", "Link Perfil": "https://linkedin.com/in/maria", "Fonte": "LinkedIn"},
+        {"Nome/Titulo": "Maria", "Resumo": "", "Link Perfil": "https://www.linkedin.com/in/maria/", "Fonte": "LinkedIn"},
+    ]
+    unique = scraper.deduplicate_results(results)
+    assert [r["Link Perfil"] for r in unique] == ["https://linkedin.com/in/joao", "https://linkedin.com/in/maria"]
+    assert unique[0]["Fontes"] == "LinkedIn, Redes Sociais"
+
+    # URL-only mode keeps the second Joao
+    assert len(scraper.deduplicate_results(results, near_duplicates=False)) == 3
+
+
+def test_templated_profiles_on_one_host_stay_apart():
+    title = "Auxiliar Administrativo - Prefeitura de São José do Rio Preto"
+    snippet = "Auxiliar administrativo na Prefeitura de São José do Rio Preto. Atendimento ao público e protocolo."
+    ana, bia = ({"Nome/Titulo": title, "Resumo": snippet, "Link Perfil": f"https://br.linkedin.com/in/{name}",
+                 "Fonte": "LinkedIn", "Email": "N/A"} for name in ("ana", "bia"))
+    assert dedupe.deduplicate([ana, bia]) == [ana, bia]
+
+    # Same host, but one email: still one person
+    twin = dict(bia, Email="ana@example.com")
+    assert dedupe.deduplicate([dict(ana, Email="ana@example.com"), twin])[1:] == []
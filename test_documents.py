@@ -0,0 +1,86 @@
+import io
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import documents
+import enrichment
+
+W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def _docx(lines):
+    body = "".join(f"<w:p><w:r><w:t>{line}</w:t></w:r></w:p>" for line in lines)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", f'<w:document xmlns:w="{W}"><w:body>{body}</w:body></w:document>')
+    return buffer.getvalue()
+
+
+RESUME = _docx(["Maria Lima", "maria.lima@example.com - (17) 99123-4567", "Objetivo: Analista de Dados",
+                "Experiência Profissional", "Empresa X (2019-2024)", "Habilidades: Python, SQL; Power BI",
+                "Idiomas", "Inglês avançado"])
+PRICE_LIST = _docx(["Tabela de preços 2024", "Item | Preço unitário | Valor total", "CNPJ 00.000.000/0001-00"])
+
+
+FILES = {"/cv/maria.docx": RESUME, "/copia/maria.docx": RESUME, "/precos.docx": PRICE_LIST,
+         "/grande.pdf": b"%PDF-1.4" + b"0" * 5000}
+
+
+def test_docx_text_and_resume_fields():
+    text = documents.extract_text(RESUME, documents.detect_kind(RESUME))
+    fields = documents.document_fields(text)
+    assert fields["Curriculo"] == "Sim"
+    assert fields["Email"] == "maria.lima@example.com"
+    assert fields["Skills"] == "Python, SQL, Power BI"
+
+    price_text = documents.extract_text(PRICE_LIST, documents.KIND_DOCX)
+    assert documents.document_fields(price_text)["Curriculo"] == "Não"
+
+
+def test_pipeline_parses_in_process_pool_once(http_stub, monkeypatch):
+    server = http_stub({path: (body, "application/octet-stream") for path, body in FILES.items()})
+    files_url = server.url
+    monkeypatch.setattr(documents, "MAX_DOCUMENT_BYTES", 4096)
+    # grande.pdf stops at the size cap, before pypdf would be needed
+    monkeypatch.setattr(documents, "pdf_available", lambda: True)
+    cache = documents.DocumentCache(":memory:")
+    items = [{"Link Perfil": files_url + path, "Email": "N/A"}
+             for path in ("/cv/maria.docx", "/precos.docx", "/grande.pdf")]
+    items.append({"Link Perfil": "https://www.linkedin.com/in/ana"})
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        progress = [done for done, _, _ in documents.iter_documents(items, cache=cache, pool=pool)]
+        assert progress == [1, 2, 3]
+        maria, precos, grande, profile = items
+        assert maria["Curriculo"] == "Sim" and maria["Telefone"] == "+5517991234567"
+        assert precos["Curriculo"] == "Não"
+        assert grande["Documento"] == enrichment.STATUS_TOO_LARGE
+        assert "Documento" not in profile
+        assert documents.drop_non_resumes(items) == [maria, grande, profile]
+
+        # Known URL: no download; same bytes under a new URL: downloaded, not parsed again
+        server.hits.clear()
+        again = [{"Link Perfil": files_url + "/cv/maria.docx"}, {"Link Perfil": files_url + "/copia/maria.docx"}]
+        documents.read_documents(again, cache=cache, pool=pool)
+    assert [path for path in server.hits if path != "/robots.txt"] == ["/copia/maria.docx"]
+    assert again[0]["Curriculo"] == again[1]["Curriculo"] == "Sim"
+    assert cache.stats()["documents"] == 2
+
+
+def test_pdf_without_pypdf_is_skipped_and_not_cached(http_stub, monkeypatch):
+    server = http_stub({path: (FILES["/grande.pdf"], "application/pdf") for path in ("/cv.pdf", "/baixar.docx")})
+    cache = documents.DocumentCache(":memory:")
+    links = [server.url + "/cv.pdf", server.url + "/baixar.docx"]
+
+    monkeypatch.setattr(documents, "pdf_available", lambda: False)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        items = documents.read_documents([{"Link Perfil": link} for link in links], cache=cache, pool=pool)
+    assert [item["Documento"] for item in items] == [documents.STATUS_NO_PYPDF] * 2
+    # A .pdf link is not even downloaded; a PDF behind another extension is read but not cached
+    assert "/cv.pdf" not in server.hits and cache.stats()["documents"] == 0
+
+    # Once pypdf is there, both are fetched and parsed again
+    monkeypatch.setattr(documents, "pdf_available", lambda: True)
+    server.hits.clear()
+    documents.read_documents([{"Link Perfil": link} for link in links], cache=cache)
+    assert {"/cv.pdf", "/baixar.docx"} <= set(server.hits)
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+import enrichment
+
+PROFILE_HTML = """<html><head><title>Ana Souza - Desenvolvedora Python | Portal</title>
+<script>var x = "fake@tracker.io";</script></head>
+<body><h1>Ana Souza</h1><h2>Desenvolvedora Python em Recife</h2>
+<p>Contato: <a href="mailto:ana.souza@example.com">email</a> - (81) 99876-5432</p>
+<img src="logo@2x.png"></body></html>"""
+
+
+def _slow(handler):
+    time.sleep(1.0)
+    handler.send(PROFILE_HTML.encode("utf-8"), "text/html")
+
+
+ROUTES = {
+    "/robots.txt": (b"User-agent: *\nDisallow: /private\n", "text/plain"),
+    "/p/ana": (PROFILE_HTML.encode("utf-8"), "text/html; charset=utf-8"),
+    "/old": (b"", "text/html", 301, {"Location": "/p/ana"}),
+    "/big": (b"<html>" + b"x" * 300_000 + b"</html>", "text/html"),
+    "/slow": _slow,
+}
+
+
+@pytest.fixture
+def site_url(http_stub):
+    return http_stub(ROUTES).url
+
+
+def test_fetcher_pooling_robots_and_caps(site_url):
+    fetcher = enrichment.Fetcher(max_bytes=100_000)
+    try:
+        assert not fetcher.allowed(site_url + "/private/x")
+        first = fetcher.fetch(site_url + "/p/ana")
+        redirected = fetcher.fetch(site_url + "/old")
+        assert first.status == 200 and redirected.url == site_url + "/p/ana"
+        # robots.txt, page and redirect all went over one keep-alive connection
+        assert fetcher.pool.opened == 1 and fetcher.pool.reused >= 2
+
+        big = fetcher.fetch(site_url + "/big")
+        assert big.truncated and len(big.body) == 100_000
+    finally:
+        fetcher.close()
+
+
+def test_enrich_fills_contact_fields(site_url):
+    pytest.importorskip("bs4")
+    items = [
+        {"Link Perfil": site_url + "/p/ana", "Email": "N/A"},
+        {"Link Perfil": site_url + "/private/joao", "Email": "N/A"},
+    ]
+    progress = [done for done, total, _ in enrichment.iter_enrich(items, deadline=5)]
+    assert progress == [1, 2]
+
+    ana, joao = items
+    assert ana["Nome Completo"] == "Ana Souza"
+    assert ana["Headline"] == "Desenvolvedora Python em Recife"
+    assert ana["Email"] == "ana.souza@example.com"
+    assert ana["Telefone"] == "+5581998765432"
+    assert joao["Enriquecimento"] == enrichment.STATUS_ROBOTS
+
+
+def test_enrich_deadline(site_url):
+    pytest.importorskip("bs4")
+    items = [{"Link Perfil": site_url + "/slow"}]
+    start = time.monotonic()
+    enrichment.enrich(items, deadline=0.3)
+    assert time.monotonic() - start < 0.9
+    assert items[0]["Enriquecimento"] == enrichment.STATUS_TIMEOUT
+
+
+def test_host_slot_wait_is_bounded_by_the_deadline():
+    pool = enrichment.ConnectionPool(max_per_host=1, timeout=0.05)
+    key = ("http", "example.com", 80)
+    conn, _ = pool.acquire(key)
+    threading.Timer(0.2, pool.release, (key, conn, False)).start()
+    # Queued longer than the connection timeout, but within the pass deadline
+    second, _ = pool.acquire(key, until=time.monotonic() + 2)
+    with pytest.raises(enrichment.HostBusyError):
+        pool.acquire(key, until=time.monotonic() + 0.05)
+    pool.release(key, second, False)
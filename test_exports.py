@@ -0,0 +1,42 @@
+import csv
+import io
+import json
+
+import pytest
+
+import exports
+
+
+RESULTS = [
+    {"Nome/Titulo": "João Silva", "Link Perfil": "https://www.linkedin.com/in/joao", "Email": "N/A",
+     "Fonte": "LinkedIn", "Cidade": "Mirassol", "Distancia (km)": 15.1},
+    {"Nome/Titulo": "Maria", "Link Perfil": "https://www.linkedin.com/in/maria", "Fonte": "LinkedIn", "Status": "Novo"},
+]
+
+
+def test_columns_order():
+    assert exports.columns(RESULTS) == ["Nome/Titulo", "Link Perfil", "Email", "Fonte", "Status",
+                                        "Cidade", "Distancia (km)"]
+
+
+def test_csv_and_jsonl():
+    data = exports.export_bytes("csv", RESULTS)
+    assert data.startswith("\ufeff".encode("utf-8"))
+    rows = list(csv.DictReader(io.StringIO(data.decode("utf-8-sig"))))
+    assert rows[0]["Nome/Titulo"] == "João Silva" and rows[1]["Cidade"] == ""
+
+    lines = exports.export_bytes("jsonl", RESULTS).decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == RESULTS
+
+
+def test_excel_write_only():
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.load_workbook(io.BytesIO(exports.export_bytes("xlsx", RESULTS)), read_only=True)
+    rows = list(workbook.active.iter_rows(values_only=True))
+    assert rows[0][0] == "Nome/Titulo" and rows[1][0] == "João Silva"
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        exports.export_bytes("pdf", RESULTS)
+    assert "csv" in exports.available_formats()
@@ -0,0 +1,35 @@
+import backends
+import geo
+import scraper
+
+
+def test_find_and_nearby():
+    index = geo.get_index()
+    origin = index.find("Sao Jose do Rio Preto - SP")
+    assert origin.name == "São José do Rio Preto"
+
+    nearby = index.nearby("São José do Rio Preto", 20)
+    names = [m.name for m, _ in nearby]
+    assert names[0] == "São José do Rio Preto"
+    assert "Mirassol" in names and "Catanduva" not in names
+    distances = [d for _, d in nearby]
+    assert distances == sorted(distances)
+
+
+def test_unknown_location_is_not_expanded(caplog):
+    assert scraper.expand_location("Cidade Inexistente", 50) == [("Cidade Inexistente", 0.0)]
+    assert "'Cidade Inexistente' is not in the municipality table" in caplog.text
+    caplog.clear()
+    assert scraper.expand_location("Cidade Inexistente", 0) == [("Cidade Inexistente", 0.0)]
+    assert not caplog.text
+
+
+def test_scrape_nearby_ranks_by_distance():
+    raw = [
+        {"href": "https://www.linkedin.com/in/a", "title": "A - LinkedIn", "body": "Dev em Mirassol"},
+        {"href": "https://www.linkedin.com/in/b", "title": "B - LinkedIn", "body": "Dev em São José do Rio Preto"},
+    ]
+    replay = backends.ReplayBackend(raw, fallback_all=True)
+    data = scraper.scrape_nearby("Dev", "São José do Rio Preto", radius_km=20, num_results=5, backend=replay)
+    assert [d["Link Perfil"] for d in data] == ["https://www.linkedin.com/in/b", "https://www.linkedin.com/in/a"]
+    assert data[0]["Distancia (km)"] == 0.0 and data[1]["Cidade"] == "Mirassol"
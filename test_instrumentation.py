@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+import tracemalloc
+
+import backends
+import classifier
+import instrumentation
+import scraper
+
+RAW = [
+    {"query": "q", "href": "https://www.linkedin.com/in/ana", "title": "Ana - Dev - Recife | LinkedIn", "body": "Recife"},
+    {"query": "q", "href": "https://www.linkedin.com/in/vaga", "title": "Vaga Dev Recife", "body": "Recife"},
+    {"query": "q", "href": "https://www.linkedin.com/in/bia", "title": "Bia - Dev - Natal | LinkedIn", "body": "Natal"},
+    {"query": "q", "href": "https://example.com/x", "title": "Dev Recife", "body": ""},
+]
+
+
+def test_search_stages_and_rejections():
+    metrics = instrumentation.Metrics()
+    instrumentation.set_metrics(metrics)
+    try:
+        results = scraper.search_candidates("q", num_results=5, expected_location="Recife", use_cache=False,
+                                            use_index=False, backend=backends.ReplayBackend(RAW))
+    finally:
+        instrumentation.set_metrics(None)
+
+    assert [r["Link Perfil"] for r in results] == ["https://www.linkedin.com/in/ana"]
+    snapshot = metrics.snapshot()
+    assert snapshot["stages"]["fetch"]["count"] == 4
+    assert snapshot["stages"]["classify"]["count"] == 4
+    # Only hits that passed the other checks reach the location filter
+    assert snapshot["stages"]["location_filter"]["count"] == 2
+    rejections = snapshot["counters"]["rejections_total"]
+    assert rejections == {f"reason={classifier.JOB_POSTING}": 1, f"reason={classifier.WRONG_LOCATION}": 1,
+                          f"reason={classifier.INVALID_URL}": 1}
+    assert snapshot["counters"]["accepted_total"] == {"site=LinkedIn": 1}
+
+
+def test_prometheus_text():
+    metrics = instrumentation.Metrics()
+    with instrumentation.stage("render", metrics):
+        pass
+    metrics.inc("rejections_total", 2, reason='bad "title"')
+    text = metrics.to_prometheus()
+    assert "# TYPE xray_stage_seconds summary" in text
+    assert 'xray_stage_seconds_count{stage="render"} 1' in text
+    assert 'xray_rejections_total{reason="bad \\"title\\""} 2' in text
+
+
+def test_profile_is_opt_in(tmp_path):
+    with instrumentation.profile("off", mode="", directory=str(tmp_path)):
+        pass
+    assert not os.listdir(tmp_path)
+
+    with instrumentation.profile("busca/LinkedIn", mode="all", directory=str(tmp_path)):
+        with instrumentation.profile("nested", mode="all", directory=str(tmp_path)):
+            sum(range(1000))
+    files = sorted(os.listdir(tmp_path))
+    assert len(files) == 2
+    assert "-busca_LinkedIn-" in files[0] and files[0].endswith(".prof") and files[1].endswith(".tracemalloc.txt")
+
+
+def test_concurrent_profiles_share_tracemalloc(tmp_path):
+    barrier = threading.Barrier(2)
+    errors = []
+
+    def search(wait_first):
+        try:
+            with instrumentation.profile("busca", mode="tracemalloc", directory=str(tmp_path)):
+                barrier.wait()
+                # The other search finishes (and, before the fix, stopped tracing) first
+                time.sleep(0.2 if wait_first else 0)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=search, args=(flag,)) for flag in (True, False)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert errors == [] and not tracemalloc.is_tracing()
+    assert len(os.listdir(tmp_path)) == 2
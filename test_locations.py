@@ -0,0 +1,41 @@
+import classifier
+import geo
+import locations
+
+
+SJRP = "São José do Rio Preto"
+
+
+def test_match_spellings_and_aliases():
+    matcher = locations.get_matcher()
+    for text in ["Dev em Sao Jose do Rio Preto", "S.J. do Rio Preto", "Rio Preto - SP", "SJRP/SP",
+                 "SÃO JOSÉ DO RIO PRETO"]:
+        match = matcher.match(SJRP, text)
+        assert match is not None, text
+        assert match.municipalities[0].name == SJRP
+
+    assert matcher.match(SJRP, "Mirassol, SP") is None
+    # Longest match wins: a different São José is not Rio Preto
+    assert matcher.match(SJRP, "São José dos Campos") is None
+    # Typed aliases resolve too
+    assert matcher.match("SJRP", "Analista em São José do Rio Preto") is not None
+    assert matcher.match("Rio Preto - SP", "sao jose do rio preto") is not None
+
+
+def test_find_reports_every_location():
+    matcher = locations.get_matcher()
+    found = matcher.find("Campinas/SP, antes em Floripa e BH")
+    assert [m.municipalities[0].name for m in found] == ["Campinas", "Florianópolis", "Belo Horizonte"]
+
+
+def test_unknown_location_falls_back_to_words():
+    matcher = locations.LocationMatcher([geo.Municipality("Campinas", "SP", -22.9, -47.06)])
+    assert matcher.match("Remoto", "Trabalho 100% remoto") is not None
+    assert matcher.match("Home Office", "home-office") is not None
+    assert matcher.match("Remoto", "Presencial") is None
+
+
+def test_classifier_uses_matcher():
+    url = "https://www.linkedin.com/in/joao"
+    assert classifier.classify_one(url, "Joao - Dev", "S.J. do Rio Preto", expected_location=SJRP) == classifier.ACCEPTED
+    assert classifier.classify_one(url, "Joao - Dev", "Curitiba", expected_location=SJRP) == classifier.WRONG_LOCATION
@@ -0,0 +1,40 @@
+import query_ast
+import scraper
+
+
+def test_parse_round_trips_every_mode():
+    for config in scraper.XRAY_MODES.values():
+        assert query_ast.Query.from_string(config["base"]).serialize() == config["base"]
+    nodes = query_ast.parse('site:instagram.com OR site:facebook.com -"a b" (x (y OR z))')
+    assert [n.kind for n in nodes] == [query_ast.OR, query_ast.NOT, query_ast.AND]
+    assert nodes[0].children[1] == query_ast.Node(query_ast.FIELD, "site", (query_ast.Node(query_ast.WORD, "facebook.com"),))
+
+
+def test_equivalent_searches_share_a_key():
+    a = scraper.generate_search_query("Desenvolvedor Python", "Recife", "Senior", "React, Node.js,AWS")
+    b = scraper.generate_search_query("desenvolvedor  python", "recife", "senior", " AWS ,react, NODE.JS")
+    assert a != b
+    assert query_ast.cache_key(a) == query_ast.cache_key(b)
+    c = scraper.generate_search_query("Desenvolvedor Python", "Recife", "Senior", "React, Vue")
+    assert query_ast.cache_key(c) != query_ast.cache_key(a)
+
+
+def test_budget_drops_lowest_priority_first():
+    skills = ", ".join(f"Skill{i}" for i in range(30))
+    query = scraper.build_search_query("Dev", "Recife", "Senior", skills, exclude_terms="recruiter, rh",
+                                       open_to_work=True)
+    fitted = query.fit(query_ast.Budget(max_length=200, max_operators=None))
+    text = fitted.serialize()
+    assert len(text) <= 200
+    assert fitted.dropped[:3] == ("open_to_work", "exclude", "exclude")
+    assert 'intitle:"Dev" "Recife" "Senior" ("Skill0" OR "Skill1"' in text
+    assert '"Skill29"' not in text
+
+    # Required clauses stay even when nothing else is left to drop
+    tiny = query.fit(query_ast.Budget(max_length=10, max_operators=0))
+    assert [c.label for c in tiny.clauses] == ["base", "role", "location"]
+
+
+def test_searxng_dialect():
+    text = '(site:a.com OR site:b.com) (inurl:cv OR inurl:perfil) intitle:"Dev" -inurl:jobs python'
+    assert query_ast.adapt(text, "searxng") == '(site:a.com OR site:b.com) "Dev" python'
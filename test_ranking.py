@@ -0,0 +1,35 @@
+import pytest
+
+import ranking
+
+ITEMS = [
+    {"Nome/Titulo": "Carlos Lima - Analista de Suporte", "Resumo": "Recife. Atendimento e infraestrutura."},
+    {"Nome/Titulo": "Ana Souza - Desenvolvedora Python Sênior", "Resumo": "Django, AWS e Machine Learning em Recife."},
+    {"Nome/Titulo": "Bia Reis - Desenvolvedor Jr", "Resumo": "Python e React."},
+    {"Nome/Titulo": "Davi - Dev", "Resumo": None},
+]
+
+
+def test_rank_orders_and_explains():
+    ranked = ranking.rank(ITEMS, "Desenvolvedor Python", "Senior", "Django, Machine Learning, Node.js")
+    assert [r["Nome/Titulo"][:3] for r in ranked] == ["Ana", "Bia", "Car", "Dav"]
+    assert ranked[0]["Termos"] == "desenvolvedor, python, Senior, Django, Machine Learning"
+    assert ranked[1]["Termos"] == "desenvolvedor, python"
+    assert ranked[-1]["Relevancia"] == 0 and ranked[-1]["Termos"] == ""
+    # rank() returns a new list; the input order is untouched but the dicts are annotated
+    assert ITEMS[0]["Nome/Titulo"].startswith("Carlos") and "Relevancia" in ITEMS[0]
+
+
+def test_terms_and_tokens():
+    assert ranking.tokenize("C++, C#, Node.js e Desenvolvedoras") == ["c++", "c#", "node.js", "e", "desenvolvedor"]
+    labels = [t.label for t in ranking.build_terms("Engenheiro de Dados", ranking.ANY_SENIORITY, "SQL, , sql")]
+    assert labels == ["engenheiro", "dados", "SQL"]
+    assert ranking.score([], "Dev") == []
+
+
+def test_numpy_matches_python():
+    pytest.importorskip("numpy")
+    args = ("Desenvolvedor Python", "Junior", "Django, React")
+    python_scores = ranking.score([dict(i) for i in ITEMS], *args, use_numpy=False)
+    numpy_scores = ranking.score([dict(i) for i in ITEMS], *args, use_numpy=True)
+    assert numpy_scores == pytest.approx(python_scores)
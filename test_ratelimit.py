@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+import backends
+import ratelimit
+import scraper
+
+
+def test_token_bucket_paces_after_burst():
+    sched = ratelimit.SearchScheduler(rate=50, burst=2, max_wait=1)
+    start = time.monotonic()
+    for _ in range(4):
+        sched.acquire()
+    # 2 immediate + 2 paced at 50/s
+    assert time.monotonic() - start >= 0.03
+    assert sched.metrics()["calls"] == 4
+
+
+def test_backoff_and_circuit_breaker():
+    sched = ratelimit.SearchScheduler(rate=10, burst=1, backoff_base=0.01, backoff_cap=0.05,
+                                      failure_threshold=2, cooldown=60, seed=1)
+    sched.report_rate_limited()
+    assert sched.rate == 5
+    sched.report_rate_limited()
+    assert sched.metrics()["state"] == "open"
+    with pytest.raises(ratelimit.CircuitOpenError):
+        sched.acquire()
+
+
+def test_rate_limited_search_is_surfaced():
+    ratelimit.set_scheduler(ratelimit.SearchScheduler(rate=100, burst=5, backoff_base=0.001,
+                                                      backoff_cap=0.002, failure_threshold=10))
+    try:
+        throttling = backends.ReplayBackend([], error_rate=1.0, error_message="202 Ratelimit", rate_limited=True)
+        with pytest.raises(ratelimit.SearchThrottledError):
+            scraper.search_candidates("q", backend=throttling)
+        assert ratelimit.get_scheduler().metrics()["rate_limited"] == scraper.MAX_RATE_LIMIT_RETRIES + 1
+    finally:
+        ratelimit.set_scheduler(None)
+
+
+def test_closing_the_probe_search_early_releases_the_circuit():
+    now = [0.0]
+    sched = ratelimit.SearchScheduler(rate=10, burst=3, failure_threshold=1, cooldown=5, clock=lambda: now[0], seed=1)
+    ratelimit.set_scheduler(sched)
+    try:
+        sched.report_rate_limited()
+        now[0] += 120
+        raw = [{"query": "q", "href": f"https://www.linkedin.com/in/p{i}", "title": f"P{i} - Dev | LinkedIn", "body": ""}
+               for i in range(3)]
+        stream = scraper.iter_candidates("q", num_results=3, use_cache=False, use_index=False,
+                                         backend=backends.ReplayBackend(raw, rate_limited=True))
+        next(stream)
+        # The probe search is abandoned (ladder cancel, UI stop) before reporting an outcome
+        stream.close()
+        assert sched.metrics()["state"] == "half_open"
+        sched.acquire()
+    finally:
+        ratelimit.set_scheduler(None)
@@ -1,5 +1,8 @@
+import threading
+import time
 import warnings
 warnings.filterwarnings("ignore")
+import backends
 import scraper
 
 def test_query_generation_linkedin():
@@ -8,20 +11,23 @@ def test_query_generation_linkedin():
     assert 'site:linkedin.com/in' in query
     assert 'Python Developer' in query
 
-def test_query_generation_vagas():
-    query = scraper.generate_search_query("Analista", "Rio de Janeiro", site="Vagas.com")
-    print(f"Vagas.com Query: {query}")
-    assert 'site:vagas.com.br/perfil-de' in query
+def test_query_generation_portals():
+    query = scraper.generate_search_query("Analista", "Rio de Janeiro", site="Portais de Emprego")
+    print(f"Portais Query: {query}")
+    assert 'site:vagas.com.br' in query
+    assert 'site:infojobs.com.br' in query
     assert 'Analista' in query
 
-def test_query_generation_infojobs():
-    query = scraper.generate_search_query("Gerente", "Curitiba", site="InfoJobs")
-    print(f"InfoJobs Query: {query}")
-    assert 'site:infojobs.com.br/candidato' in query
-    assert 'Gerente' in query
+def test_query_generation_files():
+    query = scraper.generate_search_query("Gerente", "Curitiba", site="PDF/DOCX - Currículos")
+    print(f"PDF/DOCX Query: {query}")
+    assert 'filetype:pdf' in query
+    assert '"Gerente"' in query and '"Curitiba"' in query
 
 def test_valid_urls():
     assert scraper._is_valid_result("https://www.linkedin.com/in/joao", site="LinkedIn")
+    assert scraper._is_valid_result("https://www.vagas.com.br/perfil-de/maria-123", site="Portais de Emprego")
+    assert scraper._is_valid_result("https://www.infojobs.com.br/candidato/jose-456.aspx", site="Portais de Emprego")
     assert scraper._is_valid_result("https://www.vagas.com.br/perfil-de/maria-123", site="Vagas.com")
     assert scraper._is_valid_result("https://www.infojobs.com.br/candidato/jose-456.aspx", site="InfoJobs")
     assert not scraper._is_valid_result("https://google.com", site="LinkedIn")
@@ -33,10 +39,145 @@ def test_clean_title():
     t2 = "Curriculum de Maria | Vagas.com.br"
     assert scraper._clean_title(t2, "Vagas.com") == "Maria"
 
+def test_fallback_ladder_rungs():
+    params = dict(role="Dev", location="Recife", seniority="Senior", skills="Python, Go")
+    query = scraper.generate_search_query(**params)
+    rungs = scraper.build_fallback_ladder(query, "LinkedIn", params)
+    assert [r for r, _ in rungs] == ["original", "sem_intitle", "sem_skills", "sem_senioridade", "site_amplo"]
+    assert 'intitle:' not in rungs[1][1] and '"Python"' in rungs[1][1]
+    assert '"Python"' not in rungs[2][1] and '"Senior"' in rungs[2][1]
+    assert rungs[3][1] == 'site:linkedin.com/in "Dev" "Recife"'
+    assert rungs[4][1].endswith("LinkedIn perfil")
+
+    # Without the query parameters only the text relaxations apply
+    assert [r for r, _ in scraper.build_fallback_ladder(query, "LinkedIn")] == ["original", "sem_intitle", "site_amplo"]
+
+
+def test_ladder_fills_from_lower_rungs():
+    import backends
+
+    params = dict(role="Dev", location="Recife", skills="Python")
+    rungs = dict(scraper.build_fallback_ladder(scraper.generate_search_query(**params), "LinkedIn", params))
+    hit = lambda name: {"href": f"https://www.linkedin.com/in/{name}", "title": f"{name} - LinkedIn", "body": "Recife"}
+    replay = backends.ReplayBackend([
+        dict(hit("ana"), query=rungs["original"]),
+        dict(hit("bia"), query=rungs["sem_intitle"]),
+        dict(hit("ana"), query=rungs["sem_skills"]),
+        dict(hit("caio"), query=rungs["sem_skills"]),
+        dict(hit("duda"), query=rungs["site_amplo"]),
+    ])
+
+    data = scraper.scrape_smart(rungs["original"], num_results=3, site="LinkedIn", expected_location="Recife",
+                                backend=replay, query_params=params)
+    assert [(d["Nome/Titulo"], d["Estrategia"]) for d in data] == [
+        ("ana", "Original"), ("bia", "Sem intitle"), ("caio", "Sem skills")
+    ]
+
+    # A full primary rung never pulls in relaxed results
+    data = scraper.scrape_smart(rungs["original"], num_results=1, site="LinkedIn", expected_location="Recife",
+                                backend=replay, query_params=params)
+    assert [d["Estrategia"] for d in data] == ["Original"]
+
+
+def test_speculative_rungs_spend_nothing_when_primary_fills():
+    import time
+
+    import backends
+    import ratelimit
+
+    class CountingReplay(backends.ReplayBackend):
+        calls = 0
+
+        def text(self, query, max_results=10):
+            # Counted on first pull: the point where a live backend sends the request
+            type(self).calls += 1
+            yield from super().text(query, max_results)
+
+    params = dict(role="Dev", location="Recife", seniority="Senior", skills="Python")
+    query = scraper.generate_search_query(**params)
+    replay = CountingReplay([{"query": query, "href": "https://www.linkedin.com/in/ana", "title": "Ana - LinkedIn",
+                              "body": "Recife"}], rate_limited=True)
+    sched = ratelimit.SearchScheduler(rate=1, burst=3)
+    ratelimit.set_scheduler(sched)
+    try:
+        data = scraper.scrape_smart(query, num_results=1, site="LinkedIn", expected_location="Recife",
+                                    use_cache=False, use_index=False, backend=replay, query_params=params)
+        assert [d["Estrategia"] for d in data] == ["Original"]
+        # Cancelled rungs hand their reserved slots back from their own threads
+        deadline = time.monotonic() + 2
+        while sched.metrics()["calls"] > 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert CountingReplay.calls == 1
+        assert sched.metrics()["calls"] == 1
+    finally:
+        ratelimit.set_scheduler(None)
+
+
+class _TrackedReplay(backends.ReplayBackend):
+    """Counts concurrent and closed calls; the query "boom" fails, `slow` queries answer late."""
+
+    def __init__(self, *args, slow=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slow = set(slow)
+        self.active = self.peak = self.calls = self.closed = 0
+        self.counter_lock = threading.Lock()
+
+    def text(self, query, max_results=10):
+        with self.counter_lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            if query == "boom":
+                raise backends.ReplayError("boom")
+            if query in self.slow:
+                time.sleep(0.2)
+            yield from super().text(query, max_results)
+        finally:
+            with self.counter_lock:
+                self.active -= 1
+                self.closed += 1
+
+
+MULTI_RECORDS = [
+    {"query": "q-li", "href": "https://www.linkedin.com/in/ana", "title": "Ana - LinkedIn", "body": "Recife"},
+    {"query": "q-li", "href": "https://www.linkedin.com/in/bia", "title": "Bia - LinkedIn", "body": "Recife"},
+    {"query": "q-portal", "href": "https://www.vagas.com.br/perfil-de/caio-1", "title": "Caio", "body": "Recife"},
+]
+
+
+def test_scrape_multi_merge_order_failures_and_workers():
+    queries = {"LinkedIn": "q-li", "Portais de Emprego": "q-portal", "Redes Sociais": "boom"}
+    options = dict(expected_location="Recife", use_cache=False, use_index=False)
+
+    # LinkedIn answers last, yet scrape_multi keeps mode order; the failing mode just adds nothing
+    data = scraper.scrape_multi(queries, backend=_TrackedReplay(MULTI_RECORDS, slow={"q-li"}), **options)
+    assert [d["Nome/Titulo"] for d in data] == ["Ana", "Bia", "Caio"]
+    # The stream yields in arrival order instead
+    streamed = scraper.iter_scrape_multi(queries, backend=_TrackedReplay(MULTI_RECORDS, slow={"q-li"}), **options)
+    assert [d["Nome/Titulo"] for d in streamed] == ["Caio", "Ana", "Bia"]
+
+    for max_workers, peak in ((1, 1), (3, 3)):
+        replay = _TrackedReplay(MULTI_RECORDS, latency=0.1)
+        scraper.scrape_multi(queries, max_workers=max_workers, backend=replay, **options)
+        assert replay.calls == 3 and replay.peak == peak
+
+
+def test_closing_multi_stream_closes_worker_generators():
+    replay = _TrackedReplay(MULTI_RECORDS, item_latency=0.05)
+    queries = {"LinkedIn": "q-li", "Portais de Emprego": "q-portal"}
+    stream = scraper.iter_scrape_multi(queries, expected_location="Recife", use_cache=False, use_index=False,
+                                       backend=replay)
+    next(stream)
+    stream.close()
+    # close() waits for the workers, which close their searches and the backend streams
+    assert replay.calls == replay.closed == 2 and replay.active == 0
+
+
 if __name__ == "__main__":
     test_query_generation_linkedin()
-    test_query_generation_vagas()
-    test_query_generation_infojobs()
+    test_query_generation_portals()
+    test_query_generation_files()
     test_valid_urls()
     test_clean_title()
     print("\nAll multi-source tests passed!")
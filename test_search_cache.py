@@ -0,0 +1,42 @@
+import time
+import search_cache
+
+
+def test_cache_roundtrip_and_stats():
+    cache = search_cache.SearchCache(path=":memory:", ttl=60, max_entries=10)
+    assert cache.get("q", "LinkedIn", 10) is None
+
+    raw = [{"href": "https://www.linkedin.com/in/joao", "title": "Joao", "body": "Dev"}]
+    cache.set("q", "LinkedIn", 10, raw)
+    assert cache.get("q", "LinkedIn", 10) == raw
+    # num_results is part of the key
+    assert cache.get("q", "LinkedIn", 20) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+
+def test_cache_lru_eviction():
+    cache = search_cache.SearchCache(path=":memory:", ttl=60, max_entries=2)
+    cache.set("a", "LinkedIn", 10, [])
+    time.sleep(0.01)
+    cache.set("b", "LinkedIn", 10, [])
+    time.sleep(0.01)
+    cache.get("a", "LinkedIn", 10)  # 'a' becomes most recently used
+    time.sleep(0.01)
+    cache.set("c", "LinkedIn", 10, [])
+
+    assert cache.get("b", "LinkedIn", 10) is None
+    assert cache.get("a", "LinkedIn", 10) == []
+    assert cache.get("c", "LinkedIn", 10) == []
+
+
+def test_cache_ttl_and_bypass():
+    cache = search_cache.SearchCache(path=":memory:", ttl=0.05, max_entries=10)
+    cache.set("q", "LinkedIn", 10, [])
+    time.sleep(0.1)
+    assert cache.get("q", "LinkedIn", 10) is None
+
+    disabled = search_cache.SearchCache(path=":memory:", enabled=False)
+    disabled.set("q", "LinkedIn", 10, [])
+    assert disabled.get("q", "LinkedIn", 10) is None
@@ -0,0 +1,67 @@
+import io
+
+import pytest
+
+import enrichment
+import spreadsheets
+
+CSV = (
+    "Lista de candidatos - Banco de talentos\n"
+    "Nome Completo;E-mail;Celular;Cargo;Cidade\n"
+    "Ana Souza;ana@example.com;(17) 99111-2222;Analista;São José do Rio Preto\n"
+    "Bruno Lima;bruno@example.com;;Analista;Campinas\n"
+    "Carla Dias;carla@example.com;(17) 3222-1111;Assistente;Rio Preto\n"
+).encode("cp1252")
+
+
+def test_header_detection_and_location():
+    people, status = spreadsheets.read_people(io.BytesIO(CSV), "https://rh.example.com/lista.csv",
+                                              expected_location="São José do Rio Preto")
+    assert status == enrichment.STATUS_OK
+    assert [p["Nome/Titulo"] for p in people] == ["Ana Souza", "Carla Dias"]
+    assert people[0]["Email"] == "ana@example.com" and people[0]["Telefone"] == "+5517991112222"
+    assert people[0]["Resumo"] == "Analista | São José do Rio Preto"
+    assert people[1]["Link Perfil"] == "https://rh.example.com/lista.csv?linha=5"
+
+
+def test_headerless_columns_from_values():
+    rows = [["Ana", "ana@example.com", "17991112222"], ["Bia", "bia@example.com", "17988887777"]]
+    columns, header = spreadsheets.detect_columns(rows)
+    assert columns == {"email": 1, "phone": 2} and header == -1
+
+
+def test_xlsx_read_only():
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Nome", "Email", "Telefone"])
+    sheet.append(["Ana", "ana@example.com", 17991112222])
+    data = io.BytesIO()
+    workbook.save(data)
+    data.seek(0)
+    people, _ = spreadsheets.read_people(data, "https://rh.example.com/l.xlsx")
+    assert people[0]["Telefone"] == "+5517991112222"
+
+
+def test_ingest_streams_and_expands(http_stub):
+    rows = "".join(f"Pessoa {i},p{i}@example.com\n" for i in range(20_000)).encode()
+    url = http_stub({"/grande.csv": (b"nome,email\n" + rows, "text/csv")}).url
+    items = [{"Nome/Titulo": "Lista", "Link Perfil": url + "/grande.csv", "Fonte": "Listas de RH"},
+             {"Nome/Titulo": "Perfil", "Link Perfil": "https://www.linkedin.com/in/ana", "Fonte": "LinkedIn"},
+             {"Nome/Titulo": "Sumiu", "Link Perfil": url + "/sumiu.xlsx", "Fonte": "Listas de RH"}]
+    results = spreadsheets.ingest(items)
+
+    assert len(results) == spreadsheets.MAX_ROWS_PER_FILE + 2
+    assert results[0]["Nome/Titulo"] == "Pessoa 0" and results[0]["Email"] == "p0@example.com"
+    assert items[0]["Planilha"] == enrichment.STATUS_OK and items[0]["Linhas"] == spreadsheets.MAX_ROWS_PER_FILE
+    assert items[2]["Planilha"].startswith(enrichment.STATUS_ERROR)
+
+
+def test_expand_keeps_people_sharing_role_and_city():
+    # Row links on different hosts would otherwise pass as one person found through several sites
+    rows = "".join(f"{name} Silva;{name.lower()}@example.com;Auxiliar de Serviços Gerais;São José do Rio Preto;"
+                   f"https://{name.lower()}.example.net/cv\n" for name in ("Ana", "Bia", "Carla", "Davi"))
+    url = "https://rh.example.com/lista.csv"
+    people, _ = spreadsheets.read_people(io.BytesIO(("Nome;Email;Cargo;Cidade;Link\n" + rows).encode()), url)
+    expanded = spreadsheets.expand([{"Link Perfil": url}], {url: people})
+    assert [p["Nome/Titulo"] for p in expanded] == ["Ana Silva", "Bia Silva", "Carla Silva", "Davi Silva"]